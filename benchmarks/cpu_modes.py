@@ -0,0 +1,111 @@
+"""
+Compare CPU inference modes on real recordings.
+
+    python -m benchmarks.cpu_modes calls/*.wav --models base.en tiny.en --threads 4
+
+Every model is run with fp32 and int8 weights. For each mode the report
+lists model load time, resident size, real-time factor and word error rate.
+WER is measured against a reference transcript next to each recording
+(same name with a .txt extension) when present, otherwise against the
+output of the first model in fp32.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from src.services.audio_loader import SAMPLE_RATE, load_audio
+from src.services.model_registry import ModelRegistry, configure_threads
+from src.services.transcription import _run_whisper
+
+WORD_PATTERN = re.compile(r"[a-z0-9']+")
+
+def word_error_rate(reference: str, hypothesis: str) -> float:
+    """
+    Word-level Levenshtein distance divided by the reference length
+    """
+    ref = WORD_PATTERN.findall(reference.lower())
+    hyp = WORD_PATTERN.findall(hypothesis.lower())
+    if not ref:
+        return float(bool(hyp))
+    # One row of the edit distance table at a time
+    previous = np.arange(len(hyp) + 1)
+    for i, word in enumerate(ref, start=1):
+        current = np.empty_like(previous)
+        current[0] = i
+        for j in range(1, len(hyp) + 1):
+            current[j] = min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (word != hyp[j - 1])
+            )
+        previous = current
+    return float(previous[-1]) / len(ref)
+
+def run_mode(model_name: str, quantize: bool, audios: Dict[str, np.ndarray]) -> Dict:
+    registry = ModelRegistry(memory_budget_mb=0, device="cpu", quantize=quantize)
+    start = time.perf_counter()
+    with registry.acquire(model_name):
+        pass
+    load_seconds = time.perf_counter() - start
+
+    texts = {}
+    elapsed = 0.0
+    with registry.acquire(model_name) as model:
+        for path, audio in audios.items():
+            start = time.perf_counter()
+            texts[path] = _run_whisper(model, audio)["text"]
+            elapsed += time.perf_counter() - start
+
+    audio_seconds = sum(len(audio) for audio in audios.values()) / SAMPLE_RATE
+    return {
+        "model": model_name,
+        "quantized": quantize,
+        "load_seconds": load_seconds,
+        "size_mb": registry.stats()["models"][model_name]["size_mb"],
+        "rtf": elapsed / audio_seconds,
+        "texts": texts
+    }
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare accuracy and speed of CPU inference modes")
+    parser.add_argument("audio", nargs="+", help="Recordings to transcribe")
+    parser.add_argument("--models", nargs="+", default=["base.en"], help="First model is the default reference")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1, help="Intra-op threads")
+    parser.add_argument("--inter-op-threads", type=int, default=1)
+    args = parser.parse_args()
+
+    configure_threads(args.threads, args.inter_op_threads)
+    audios = {path: load_audio(path) for path in args.audio}
+    references = {}
+    for path in args.audio:
+        reference_path = os.path.splitext(path)[0] + ".txt"
+        if os.path.exists(reference_path):
+            with open(reference_path) as f:
+                references[path] = f.read()
+
+    results = [
+        run_mode(model_name, quantize, audios)
+        for model_name in args.models
+        for quantize in (False, True)
+    ]
+
+    for path in args.audio:
+        # Without a reference transcript, the first fp32 model is the reference
+        references.setdefault(path, results[0]["texts"][path])
+    report = []
+    for result in results:
+        texts = result.pop("texts")
+        result["wer"] = float(np.mean([word_error_rate(references[path], texts[path]) for path in args.audio]))
+        report.append(result)
+
+    print(json.dumps({"threads": args.threads, "modes": report}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+End-to-end pipeline benchmark.
+
+    python -m benchmarks.run --duration 600 --speakers 2 --conversations 1000
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json --tolerance 0.2
+
+Each stage is timed separately and reported with its real-time factor
+(processing seconds per audio second), throughput and peak RSS. With
+--baseline the run fails when any stage is slower than the stored timing
+by more than the tolerance.
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.models.database import Conversation, init_db
+from src.services.audio_processing import process_audio_file
+from src.services.audio_loader import load_audio
+from src.services.speaker_identification import SpeakerIdentifier
+from src.services.turn_taking import analyze_turn_taking
+from src.services.classification import classify_dialogue, dialogue_classifier
+from src.services.conversation_store import save_results
+from src.services.search import SearchService
+
+from .synthetic import SAMPLE_RATE, generate_conversation, write_wav
+
+SEARCH_QUERIES = ["expensive", '"next steps"', "integrat*", "budget competitor"]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is reported in KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class StageTimer:
+    def __init__(self):
+        self.results: Dict[str, Dict] = {}
+
+    @contextmanager
+    def stage(self, name: str, audio_seconds: Optional[float] = None, items: Optional[int] = None):
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        result = {"seconds": elapsed, "peak_rss_mb": peak_rss_mb()}
+        if audio_seconds:
+            result["rtf"] = elapsed / audio_seconds
+        if items:
+            result["throughput_per_s"] = items / elapsed if elapsed else float("inf")
+        self.results[name] = result
+
+def run_audio_stages(timer: StageTimer, args) -> None:
+    audio, segments = generate_conversation(args.duration, args.speakers, seed=args.seed)
+    audio_seconds = len(audio) / SAMPLE_RATE
+
+    with tempfile.TemporaryDirectory() as tmp:
+        wav_path = os.path.join(tmp, "synthetic.wav")
+        write_wav(wav_path, audio)
+
+        with open(wav_path, "rb") as f, timer.stage("ingest", audio_seconds=audio_seconds):
+            stored = asyncio.run(process_audio_file(UploadFile(filename="synthetic.wav", file=f)))
+
+        try:
+            with timer.stage("decode", audio_seconds=audio_seconds):
+                decoded = load_audio(stored.path)
+        finally:
+            os.remove(stored.path)
+
+    if not args.skip_transcription:
+        from src.services.transcription import TranscriptionService
+        service = TranscriptionService()
+        with service.registry.acquire(service.model_name):
+            pass  # load outside the timed stage; model load time is not pipeline time
+        with timer.stage("transcribe", audio_seconds=audio_seconds):
+            transcript = asyncio.run(service.transcribe_audio(decoded))
+        if transcript["segments"]:
+            segments = transcript["segments"]
+
+    identifier = SpeakerIdentifier()
+    with timer.stage("identify_speakers", audio_seconds=audio_seconds, items=len(segments)):
+        speakers = identifier.identify_speakers(segments, decoded)
+    with timer.stage("turn_taking", items=len(segments)):
+        analyze_turn_taking(speakers, segments)
+    with timer.stage("classify", items=len(segments)):
+        asyncio.run(classify_dialogue({"segments": segments, "speakers": speakers}))
+
+def run_search_stages(timer: StageTimer, args) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        init_db(engine)
+        db = sessionmaker(bind=engine)()
+
+        transcripts = []
+        for index in range(args.conversations):
+            _, segments = generate_conversation(args.seed_call_seconds, args.speakers, seed=index)
+            transcripts.append({
+                "text": "".join(segment["text"] for segment in segments),
+                "segments": segments,
+                "speakers": [segment["speaker"] for segment in segments]
+            })
+
+        with timer.stage("db_seed", items=args.conversations):
+            analyses = dialogue_classifier.classify_batch(transcripts)
+            for index, (transcript, analysis) in enumerate(zip(transcripts, analyses)):
+                conversation = Conversation(file_path=f"seed-{index}.wav", user_id=index % 10)
+                db.add(conversation)
+                db.flush()
+                save_results(db, conversation, transcript, analysis)
+            db.commit()
+
+        search = SearchService(db)
+        with timer.stage("search_text", items=len(SEARCH_QUERIES)):
+            for query in SEARCH_QUERIES:
+                search.search_conversations(None, query=query)
+        with timer.stage("search_segments"):
+            search.search_segments(None, phase="objection_handling", sentiment="negative")
+        with timer.stage("stats"):
+            search.get_conversation_stats(1, period="day")
+        db.close()
+        engine.dispose()
+
+# Differences below this are timer noise, whatever the relative change
+MIN_REGRESSION_SECONDS = 0.005
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> list:
+    regressions = []
+    for name, stage in baseline.get("stages", {}).items():
+        current = results.get(name)
+        if not current:
+            continue
+        slower = current["seconds"] - stage["seconds"]
+        if slower > MIN_REGRESSION_SECONDS and current["seconds"] > stage["seconds"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {current['seconds']:.3f}s vs baseline {stage['seconds']:.3f}s"
+            )
+    return regressions
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the transcription and analysis pipeline")
+    parser.add_argument("--duration", type=float, default=300, help="Synthetic call length in seconds")
+    parser.add_argument("--speakers", type=int, default=2)
+    parser.add_argument("--conversations", type=int, default=200, help="Conversations seeded for search")
+    parser.add_argument("--seed-call-seconds", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-transcription", action="store_true", help="Skip the Whisper stage")
+    parser.add_argument("--baseline", help="Fail if a stage regresses past this baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--save-baseline", help="Write this run's timings as the new baseline")
+    args = parser.parse_args()
+
+    timer = StageTimer()
+    run_audio_stages(timer, args)
+    run_search_stages(timer, args)
+
+    params = {key: getattr(args, key) for key in ("duration", "speakers", "conversations", "seed_call_seconds")}
+    report = {"params": params, "stages": timer.results}
+    print(json.dumps(report, indent=2))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print("warning: baseline was recorded with different parameters", file=sys.stderr)
+        regressions = compare(timer.results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import argparse
+import json
+
+from .models.database import session_scope
+from .services.audio_storage import archive_pending
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Convert the recordings of completed conversations to AUDIO_STORAGE_FORMAT. "
+                    "Workers do this after analysis; run it for files stored before, or uploads "
+                    "answered from the transcript cache."
+    )
+    parser.parse_args()
+
+    with session_scope() as db:
+        result = {"archived": archive_pending(db)}
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,124 @@
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+### Database ###
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./sales_conversations.db")
+# Connections kept open per process, and how many more may be opened under load
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+# How long a write waits for another process's write to finish before
+# failing with "database is locked"
+DATABASE_BUSY_TIMEOUT_SECONDS = float(os.getenv("DATABASE_BUSY_TIMEOUT_SECONDS", "30"))
+# Page cache and memory-mapped I/O per connection
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+
+### Storage ###
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
+MAX_FILE_SIZE_MB = int(os.getenv("MAX_FILE_SIZE_MB", "100"))
+# Limit for a whole /upload/batch request, including zip archives
+MAX_BATCH_UPLOAD_MB = int(os.getenv("MAX_BATCH_UPLOAD_MB", "4096"))
+# Size of the pieces uploads are streamed to disk in
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Decoded 16 kHz PCM kept on disk for memory-mapped reuse (about 230 MB per hour of audio)
+PCM_CACHE_MAX_MB = int(os.getenv("PCM_CACHE_MAX_MB", "2048"))
+# Format recordings are converted to once analyzed: flac (lossless), opus
+# (smallest, lossy) or original to keep uploads as they are
+AUDIO_STORAGE_FORMAT = os.getenv("AUDIO_STORAGE_FORMAT", "flac")
+AUDIO_OPUS_BITRATE = os.getenv("AUDIO_OPUS_BITRATE", "24k")
+
+### Processing ###
+WHISPER_MODEL = os.getenv("WHISPER_MODEL", "base.en")
+USE_GPU = _get_bool("USE_GPU", True)
+# Most conversations a worker claims and runs through the batched stages at once
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", "16"))
+# Options passed to every Whisper call; part of the transcript cache key
+TRANSCRIBE_OPTIONS = {
+    "language": os.getenv("WHISPER_LANGUAGE", "en"),
+    "detect_speech_segments": True
+}
+
+# CPU inference: int8 dynamic quantization of the Whisper linear layers and
+# torch thread pools per worker process. 0 intra-op threads splits the cores
+# evenly between the workers.
+WHISPER_QUANTIZE = _get_bool("WHISPER_QUANTIZE", False)
+TORCH_INTRA_OP_THREADS = int(os.getenv("TORCH_INTRA_OP_THREADS", "0"))
+TORCH_INTER_OP_THREADS = int(os.getenv("TORCH_INTER_OP_THREADS", "1"))
+
+# Optional smaller or distilled models for bulk jobs and for long recordings;
+# empty means WHISPER_MODEL is used
+WHISPER_BULK_MODEL = os.getenv("WHISPER_BULK_MODEL", "")
+WHISPER_LONG_AUDIO_MODEL = os.getenv("WHISPER_LONG_AUDIO_MODEL", "")
+LONG_AUDIO_MODEL_SECONDS = float(os.getenv("LONG_AUDIO_MODEL_SECONDS", "1800"))
+
+# Maximum memory (in MB) the model registry may keep resident before it
+# starts evicting idle models. 0 disables the budget.
+MODEL_MEMORY_BUDGET_MB = int(os.getenv("MODEL_MEMORY_BUDGET_MB", "4096"))
+# Comma separated list of models to load at application startup
+WHISPER_PRELOAD_MODELS = [
+    name.strip() for name in os.getenv("WHISPER_PRELOAD_MODELS", "").split(",") if name.strip()
+]
+
+# Recordings longer than this are split into overlapping chunks that are
+# transcribed in parallel. Each worker runs the chunks in at most
+# LONG_AUDIO_PROCESSES processes (0: one per core of the worker's share)
+# with MODEL_MEMORY_BUDGET_MB split between them.
+LONG_AUDIO_THRESHOLD_SECONDS = float(os.getenv("LONG_AUDIO_THRESHOLD_SECONDS", "600"))
+LONG_AUDIO_CHUNK_SECONDS = float(os.getenv("LONG_AUDIO_CHUNK_SECONDS", "300"))
+LONG_AUDIO_OVERLAP_SECONDS = float(os.getenv("LONG_AUDIO_OVERLAP_SECONDS", "2"))
+LONG_AUDIO_PROCESSES = int(os.getenv("LONG_AUDIO_PROCESSES", "0"))
+# Shorter recordings are transcribed in the worker itself, in pieces of this
+# length cut at quiet points, reporting progress after each; 0 transcribes
+# them in one pass
+PROGRESS_CHUNK_SECONDS = float(os.getenv("PROGRESS_CHUNK_SECONDS", "60"))
+
+# Largest pitch difference, in semitones, between a speaker of a call and an
+# enrolled voiceprint for the speaker to be labeled with that rep
+VOICEPRINT_MAX_PITCH_SEMITONES = float(os.getenv("VOICEPRINT_MAX_PITCH_SEMITONES", "1.5"))
+
+# Semantic search: a local sentence-transformers model (e.g. all-MiniLM-L6-v2).
+# Empty disables semantic search; segments are then not embedded
+SEMANTIC_MODEL = os.getenv("SEMANTIC_MODEL", "")
+SEMANTIC_INDEX_DIR = os.getenv("SEMANTIC_INDEX_DIR", "semantic_index")
+# float32, or int8 for a quarter of the size at a small loss of precision
+SEMANTIC_INDEX_DTYPE = os.getenv("SEMANTIC_INDEX_DTYPE", "float32")
+# From this many segments a rebuild adds a coarse clustering index; queries
+# then only score the segments of the SEMANTIC_PROBES closest clusters
+SEMANTIC_IVF_MIN_ROWS = int(os.getenv("SEMANTIC_IVF_MIN_ROWS", "200000"))
+SEMANTIC_PROBES = int(os.getenv("SEMANTIC_PROBES", "16"))
+# Semantic matches less similar than this are left out of search results
+SEMANTIC_MIN_SCORE = float(os.getenv("SEMANTIC_MIN_SCORE", "0.25"))
+# Conversations read per query by bulk exports; bounds their memory use
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "200"))
+
+# Upper bound for the transcript cache; least recently used entries are evicted
+TRANSCRIPT_CACHE_MAX_MB = int(os.getenv("TRANSCRIPT_CACHE_MAX_MB", "1024"))
+
+### Workers ###
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", str(os.cpu_count() or 1)))
+WORKER_POLL_INTERVAL = float(os.getenv("WORKER_POLL_INTERVAL", "1.0"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "30"))
+# A running job whose lease hasn't been renewed for this long is considered
+# abandoned by a crashed worker and is handed out again
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+
+### Observability ###
+# Worker processes serve their metrics on this port plus the worker index; 0 disables it
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+# Conversations whose processing is always profiled (comma separated ids)
+PROFILE_CONVERSATION_IDS = {
+    int(value) for value in os.getenv("PROFILE_CONVERSATION_IDS", "").split(",") if value.strip()
+}
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_INTERVAL_SECONDS = float(os.getenv("PROFILE_INTERVAL_SECONDS", "0.01"))
@@ -0,0 +1,28 @@
+import argparse
+import sys
+from datetime import datetime
+
+from .models.database import session_scope
+from .services.export import export_segments
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Export every segment of the completed conversations, one row per segment. "
+                    "Conversations are read and written in batches, so memory use stays flat."
+    )
+    parser.add_argument("output", help="File to write, or - for stdout")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--user-id", type=int)
+    parser.add_argument("--start-date", type=datetime.fromisoformat)
+    parser.add_argument("--end-date", type=datetime.fromisoformat)
+    args = parser.parse_args()
+
+    with session_scope() as db:
+        chunks = export_segments(db, args.format, args.user_id, args.start_date, args.end_date)
+        output = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
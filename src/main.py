@@ -1,21 +1,77 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks, status, Response
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, Form, Query, Request, status, Response
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, load_only
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from datetime import date, datetime
+from pathlib import Path
+import asyncio
+import base64
+import json
 import uvicorn
-import uuid
-
-from .models.database import get_db, Conversation
-from .services.audio_processing import process_audio_file
-from .services.transcription import transcribe_audio
-from .services.classification import classify_dialogue
-from .services.speaker_identification import SpeakerIdentifier
-from .services.progress import progress_tracker
+
+from .models.database import get_db, Conversation, Voiceprint
+from .services.audio_processing import (
+    StoredAudio, receive_upload, save_upload, save_archive, MAX_FILE_SIZE, MAX_BATCH_UPLOAD_SIZE
+)
+from .services.jobs import job_queue, PRIORITY_BULK, PRIORITY_NORMAL, PRIORITY_HIGH
+from .services.transcript_cache import transcript_cache
+from .services.progress import progress_tracker, progress_broadcaster, clean_old_tasks_periodically
 from .services.search import SearchService
-from .schemas.conversation import ConversationCreate, ConversationResponse
+from .services.word_store import conversation_words
+from .services.audio_storage import media_type, parse_range, iter_file, clip_command, stream_clip
+from .services.turn_taking import turn_taking_report
+from .services.export import export_segments, MEDIA_TYPES as EXPORT_MEDIA_TYPES
+from .services.voiceprints import enroll
+from .services.audio_loader import decode_audio
+from .services.reanalysis import enqueue_stale, reanalysis_status
+from .services.metrics import registry as metrics_registry, JOB_QUEUE_DEPTH, JOBS_IN_FLIGHT
+from .services.conversation_store import save_results, delete_conversation as delete_conversation_record
+from .services.semantic_search import embedding_required, find_embeddings
+from .schemas.conversation import ConversationCreate, ConversationResponse, ConversationPage, BatchUploadResponse
+from .schemas.voiceprint import VoiceprintResponse
 
 app = FastAPI(title="Sales Conversation Analysis System")
 
+# Idle time after which an SSE keep-alive comment is sent
+SSE_KEEPALIVE_SECONDS = 15
+
+# Allowance for multipart boundaries and headers around the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# /upload/single reads its multipart body itself (see receive_upload), so
+# the form is described for the API docs here
+SINGLE_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                    "required": ["file"]
+                }
+            }
+        }
+    }
+}
+
+# Lightweight columns always returned; the large JSON columns are opt-in
+SUMMARY_FIELDS = ["id", "file_path", "status", "duration", "segment_count", "summary", "created_at"]
+DETAIL_FIELDS = ["transcript", "analysis"]
+# Word-level timestamps are only decoded when asked for explicitly
+OPTIONAL_FIELDS = DETAIL_FIELDS + ["words"]
+
+def encode_cursor(conversation_id: int) -> str:
+    return base64.urlsafe_b64encode(str(conversation_id).encode()).decode()
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 # CORS middleware for web interface
 app.add_middleware(
     CORSMiddleware,
@@ -25,104 +81,430 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-speaker_identifier = SpeakerIdentifier()
+@app.on_event("startup")
+async def start_progress_cleanup():
+    asyncio.get_running_loop().create_task(clean_old_tasks_periodically())
+
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    # Reject oversized uploads from the declared length, before the body is read
+    if request.url.path.startswith("/upload"):
+        limit = MAX_BATCH_UPLOAD_SIZE if request.url.path == "/upload/batch" else MAX_FILE_SIZE
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit + MULTIPART_OVERHEAD:
+            return JSONResponse(status_code=413, content={"detail": "File too large"})
+    return await call_next(request)
 
-@app.post("/upload/single", response_model=ConversationResponse)
+def register_upload(
+    db: Session,
+    stored: StoredAudio,
+    profile: bool = False,
+    priority: int = PRIORITY_NORMAL
+) -> Conversation:
+    """
+    Create the conversation for a stored recording. Identical audio processed
+    before reuses the stored results and segment vectors; otherwise a job is
+    queued for the worker pool, which also encodes cached results that have
+    no vectors yet. Committed together with the caller's transaction.
+    """
+    cached = transcript_cache.get(db, stored.sha256)
+    if cached is not None:
+        segments = cached.transcript.get("segments", [])
+        embedding = find_embeddings(db, stored.sha256, segments)
+        if embedding is not None or not embedding_required(segments):
+            conversation = Conversation(
+                file_path=stored.path,
+                audio_hash=stored.sha256
+            )
+            db.add(conversation)
+            db.flush()
+            save_results(db, conversation, cached.transcript, cached.analysis, cached.words, embedding)
+            return conversation
+    
+    conversation = Conversation(
+        file_path=stored.path,
+        audio_hash=stored.sha256,
+        status="processing"
+    )
+    db.add(conversation)
+    db.flush()
+    job_queue.enqueue(db, conversation.id, profile=profile, priority=priority)
+    return conversation
+
+def register_uploads(
+    db: Session,
+    stored: List[StoredAudio],
+    profile: bool = False,
+    priority: int = PRIORITY_NORMAL
+) -> List[Conversation]:
+    """
+    Register stored recordings and commit them. Saving cached results writes
+    the stats, search index and segments, so upload handlers run this in the
+    thread pool rather than on the event loop.
+    """
+    conversations = [register_upload(db, audio, profile, priority) for audio in stored]
+    db.commit()
+    return conversations
+
+@app.post("/upload/single", response_model=ConversationResponse, openapi_extra=SINGLE_UPLOAD_BODY)
 async def upload_single_audio(
-    background_tasks: BackgroundTasks,
-    file: UploadFile = File(...),
+    request: Request,
+    profile: bool = Query(False, description="Record a sampling profile of this conversation's processing"),
+    priority: int = Query(PRIORITY_NORMAL, ge=PRIORITY_BULK, le=PRIORITY_HIGH),
     db: Session = Depends(get_db)
 ):
+    # Validate and stream the upload to disk as the request body arrives
+    stored = await receive_upload(request)
+    
     try:
-        # Generate unique filename
-        filename = f"{uuid.uuid4()}{file.filename}"
-        
-        # Save file
-        file_location = f"uploads/{filename}"
-        with open(file_location, "wb+") as file_object:
-            file_object.write(await file.read())
-        
-        # Create conversation record
-        conversation = Conversation(
-            audio_path=file_location,
-            status="processing"
-        )
-        db.add(conversation)
-        db.commit()
-        
-        # Start background transcription task
-        background_tasks.add_task(transcribe_and_analyze, conversation.id, file_location, db)
-        
-        return {"id": conversation.id, "status": "processing"}
-        
-        
-        # Start background processing
-        background_tasks.add_task(
-            transcribe_and_analyze,
-            conversation.id,
-            file_location,
-            db
-        )
+        conversation, = await run_in_threadpool(register_uploads, db, [stored], profile, priority)
+        if conversation.status == "processing":
+            progress_tracker.create_task(str(conversation.id), conversation_id=conversation.id)
         
         return conversation
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-async def transcribe_and_analyze(
-    conversation_id: int,
-    file_path: str,
-    db: Session
+@app.post("/upload/batch", response_model=BatchUploadResponse)
+async def upload_batch(
+    files: List[UploadFile] = File(...),
+    priority: int = Query(PRIORITY_BULK, ge=PRIORITY_BULK, le=PRIORITY_HIGH),
+    db: Session = Depends(get_db)
 ):
+    """
+    Upload many recordings at once, as individual files and/or zip archives.
+    Each recording is stored and queued like /upload/single; files that can't
+    be stored are listed in `rejected` instead of failing the whole batch.
+    """
+    stored = []
+    rejected = []
+    for file in files:
+        try:
+            if Path(file.filename or "").suffix.lower() == ".zip":
+                members, skipped = await save_archive(file)
+                stored.extend(audio for _, audio in members)
+                rejected.extend(skipped)
+            else:
+                stored.append(await save_upload(file))
+        except HTTPException as e:
+            rejected.append({"filename": file.filename or "", "detail": e.detail})
+    
     try:
-        # Get conversation from database
-        conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
-        if not conversation:
-            raise ValueError(f"Conversation {conversation_id} not found")
-
-        # Transcribe audio
-        transcript = await transcribe_audio(file_path)
-        
-        # Update conversation with transcript
-        conversation.transcript = transcript["text"]
-        conversation.segments = transcript["segments"]
-        conversation.status = "completed"
-        db.commit()
-        
-        # Identify speakers
-        speakers = speaker_identifier.identify_speakers(transcript["segments"])
-        transcript["speakers"] = speakers
-        
-        # Analyze turn-taking patterns
-        turn_analysis = speaker_identifier.analyze_turn_taking(speakers, transcript["segments"])
-        
-        # Classify dialogue
-        analysis = await classify_dialogue(transcript)
-        analysis["turn_taking"] = turn_analysis
-        
-        # Update conversation
-        conversation.transcript = transcript
-        conversation.analysis = analysis
-        db.commit()
-        
+        conversations = await run_in_threadpool(register_uploads, db, stored, priority=priority)
     except Exception as e:
-        print(f"Error processing conversation {conversation_id}: {str(e)}")
-        raise e
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    progress_tracker.create_tasks({
+        str(conversation.id): conversation.id
+        for conversation in conversations if conversation.status == "processing"
+    })
+    return {"items": conversations, "rejected": rejected}
 
-@app.get("/conversations/{conversation_id}", response_model=ConversationResponse)
+@app.get(
+    "/conversations/{conversation_id}",
+    response_model=ConversationResponse,
+    response_model_exclude_unset=True
+)
 async def get_conversation(
+    conversation_id: int,
+    fields: Optional[str] = Query(None, description="Comma separated subset of: transcript, analysis, words"),
+    db: Session = Depends(get_db)
+):
+    if fields is None:
+        selected = list(DETAIL_FIELDS)
+    else:
+        selected = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = set(selected) - set(OPTIONAL_FIELDS)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    columns = [getattr(Conversation, name) for name in SUMMARY_FIELDS + selected if name != "words"]
+    if "words" in selected:
+        columns.append(Conversation.packed_words)
+    conversation = db.query(Conversation).options(load_only(*columns)).filter(
+        Conversation.id == conversation_id
+    ).first()
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    response = {name: getattr(conversation, name) for name in SUMMARY_FIELDS + selected if name != "words"}
+    if "words" in selected:
+        response["words"] = conversation_words(conversation)
+    return response
+
+@app.delete("/conversations/{conversation_id}", status_code=204)
+async def delete_conversation(
     conversation_id: int,
     db: Session = Depends(get_db)
 ):
     conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    return conversation
+    
+    delete_conversation_record(db, conversation)
+    return Response(status_code=204)
 
-@app.get("/conversations", response_model=list[ConversationResponse])
+@app.get("/conversations/{conversation_id}/audio")
+def get_conversation_audio(
+    conversation_id: int,
+    request: Request,
+    start: Optional[float] = Query(None, ge=0, description="Clip start in seconds"),
+    end: Optional[float] = Query(None, gt=0, description="Clip end in seconds"),
+    segment: Optional[int] = Query(None, ge=0, description="Play the time range of this transcript segment"),
+    db: Session = Depends(get_db)
+):
+    """
+    Play a conversation's recording. Without a time range the stored file
+    is served with support for HTTP Range requests, so players can seek.
+    With `start`/`end` or `segment` only that part is decoded and streamed.
+    """
+    columns = [Conversation.file_path] + ([Conversation.transcript] if segment is not None else [])
+    conversation = db.query(Conversation).options(load_only(*columns)).filter(
+        Conversation.id == conversation_id
+    ).first()
+    if not conversation:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    path = conversation.file_path
+    if not path or not Path(path).exists():
+        raise HTTPException(status_code=404, detail="Audio not found")
+
+    if segment is not None:
+        segments = (conversation.transcript or {}).get("segments", [])
+        if segment >= len(segments):
+            raise HTTPException(status_code=404, detail="Segment not found")
+        start, end = segments[segment]["start"], segments[segment]["end"]
+    if start is not None or end is not None:
+        start = start or 0.0
+        if end is not None and end <= start:
+            raise HTTPException(status_code=400, detail="end must be after start")
+        cmd, clip_type = clip_command(path, start, end)
+        return StreamingResponse(stream_clip(cmd), media_type=clip_type)
+
+    size = Path(path).stat().st_size
+    try:
+        byte_range = parse_range(request.headers.get("range"), size)
+    except ValueError:
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    headers = {"Accept-Ranges": "bytes"}
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(iter_file(path, 0, size - 1), media_type=media_type(path), headers=headers)
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    headers["Content-Length"] = str(last - first + 1)
+    return StreamingResponse(
+        iter_file(path, first, last), status_code=206, media_type=media_type(path), headers=headers
+    )
+
+@app.get("/conversations", response_model=ConversationPage)
 async def list_conversations(
-    skip: int = 0,
-    limit: int = 10,
+    cursor: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """
+    Newest conversations first, without transcript or analysis.
+    Pass the returned next_cursor to get the following page.
+    """
+    query = db.query(Conversation).options(
+        load_only(*[getattr(Conversation, name) for name in SUMMARY_FIELDS])
+    )
+    if cursor:
+        query = query.filter(Conversation.id < decode_cursor(cursor))
+    conversations = query.order_by(Conversation.id.desc()).limit(limit + 1).all()
+    
+    next_cursor = None
+    if len(conversations) > limit:
+        conversations = conversations[:limit]
+        next_cursor = encode_cursor(conversations[-1].id)
+    return {"items": conversations, "next_cursor": next_cursor}
+
+@app.post("/voiceprints", response_model=VoiceprintResponse)
+async def enroll_voiceprint(
+    name: str = Form(...),
+    user_id: Optional[int] = Form(None),
+    files: List[UploadFile] = File(...),
+    db: Session = Depends(get_db)
+):
+    """
+    Enroll a rep from one or more recordings of them speaking alone. Their
+    segments in calls processed from now on are labeled with `name`.
+    Enrolling an existing name replaces its voiceprint.
+    """
+    stored = [await save_upload(file) for file in files]
+    try:
+        audios = await run_in_threadpool(lambda: [decode_audio(audio.path) for audio in stored])
+        return await run_in_threadpool(enroll, db, name, audios, user_id)
+    except (ValueError, RuntimeError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        for audio in stored:
+            Path(audio.path).unlink(missing_ok=True)
+
+@app.get("/voiceprints", response_model=List[VoiceprintResponse])
+def list_voiceprints(db: Session = Depends(get_db)):
+    return db.query(Voiceprint).order_by(Voiceprint.name).all()
+
+@app.delete("/voiceprints/{voiceprint_id}", status_code=204)
+def delete_voiceprint(voiceprint_id: int, db: Session = Depends(get_db)):
+    voiceprint = db.query(Voiceprint).filter(Voiceprint.id == voiceprint_id).first()
+    if not voiceprint:
+        raise HTTPException(status_code=404, detail="Voiceprint not found")
+    db.delete(voiceprint)
+    db.commit()
+    return Response(status_code=204)
+
+@app.get("/search")
+async def search_conversations(
+    q: Optional[str] = None,
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    phase: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    limit: int = 20,
+    mode: str = Query("keyword", regex="^(keyword|semantic)$"),
+    db: Session = Depends(get_db)
+):
+    try:
+        return SearchService(db).search_conversations(
+            user_id,
+            query=q,
+            start_date=start_date,
+            end_date=end_date,
+            phase=phase,
+            sentiment=sentiment,
+            limit=limit,
+            mode=mode
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+
+@app.get("/stats")
+async def get_stats(
+    user_id: Optional[int] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    period: Optional[str] = Query(None, regex="^(day|week|month)$"),
+    db: Session = Depends(get_db)
+):
+    return SearchService(db).get_conversation_stats(user_id, start_date, end_date, period)
+
+@app.get("/stats/turn-taking")
+def get_turn_taking_report(
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Talk ratio, monologues, questions, interruptions and response latency
+    per speaker role, for the team and for each user
+    """
+    return turn_taking_report(db, user_id, start_date, end_date)
+
+@app.get("/export")
+def export_conversations(
+    format: str = Query("csv", regex="^(csv|parquet)$"),
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
     db: Session = Depends(get_db)
 ):
-    conversations = db.query(Conversation).offset(skip).limit(limit).all()
-    return conversations
\ No newline at end of file
+    """
+    Every segment of the completed conversations as CSV or Parquet, one row
+    per segment, streamed as it is read
+    """
+    try:
+        chunks = export_segments(db, format, user_id, start_date, end_date)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_501_NOT_IMPLEMENTED, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="conversations.{format}"'}
+    )
+
+@app.get("/segments")
+async def search_segments(
+    user_id: Optional[int] = None,
+    phase: Optional[str] = None,
+    sentiment: Optional[str] = None,
+    speaker: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    limit: int = 100,
+    db: Session = Depends(get_db)
+):
+    return SearchService(db).search_segments(
+        user_id,
+        phase=phase,
+        sentiment=sentiment,
+        speaker=speaker,
+        start_date=start_date,
+        end_date=end_date,
+        limit=limit
+    )
+
+@app.post("/reanalyze")
+def start_reanalysis(db: Session = Depends(get_db)):
+    """
+    Queue re-analysis of every conversation with outdated stage versions.
+    Conversations that are already queued are skipped, so calling this
+    again resumes an interrupted backfill.
+    """
+    result = enqueue_stale(db)
+    result.update(reanalysis_status(db))
+    return result
+
+@app.get("/reanalyze")
+def get_reanalysis_status(db: Session = Depends(get_db)):
+    return reanalysis_status(db)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics(db: Session = Depends(get_db)):
+    """
+    Prometheus metrics for this API process plus the shared job queue.
+    Pipeline stage timings are served by each worker on WORKER_METRICS_PORT.
+    """
+    JOB_QUEUE_DEPTH.set(job_queue.pending_count(db))
+    JOBS_IN_FLIGHT.set(job_queue.running_count(db))
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/progress/{task_id}")
+async def get_progress(task_id: str):
+    progress = await run_in_threadpool(progress_tracker.get_progress, task_id)
+    if "task_id" not in progress:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return progress
+
+@app.get("/progress/{task_id}/events")
+async def stream_progress(task_id: str, request: Request):
+    """
+    Server-Sent Events stream of progress updates until the task finishes
+    """
+    progress = await run_in_threadpool(progress_tracker.get_progress, task_id)
+    if "task_id" not in progress:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    async def events():
+        queue = progress_broadcaster.subscribe(task_id)
+        try:
+            current = progress
+            last_sent = current["updated_at"]
+            yield f"data: {json.dumps(current)}\n\n"
+            while current["status"] not in ("completed", "error"):
+                try:
+                    current = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ": keep-alive\n\n"
+                    continue
+                if current["updated_at"] != last_sent:
+                    last_sent = current["updated_at"]
+                    yield f"data: {json.dumps(current)}\n\n"
+        finally:
+            progress_broadcaster.unsubscribe(task_id, queue)
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
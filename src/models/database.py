@@ -1,11 +1,42 @@
-from sqlalchemy import create_engine, Column, Integer, String, JSON, DateTime
+from contextlib import contextmanager
+from typing import Iterator
+from sqlalchemy import create_engine, event, Column, Integer, Float, Boolean, String, JSON, Date, DateTime, Text, LargeBinary, ForeignKey, Index, UniqueConstraint, text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker, deferred
+from sqlalchemy.pool import QueuePool
 import datetime
 
-SQLALCHEMY_DATABASE_URL = "sqlite:///./sales_conversations.db"
+from ..config import (
+    DATABASE_URL, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_BUSY_TIMEOUT_SECONDS,
+    SQLITE_CACHE_MB, SQLITE_MMAP_MB
+)
+
+engine = create_engine(
+    DATABASE_URL,
+    # FastAPI runs dependencies and endpoints on different threads
+    connect_args={"check_same_thread": False, "timeout": DATABASE_BUSY_TIMEOUT_SECONDS},
+    # SQLAlchemy 1.4 opens a new SQLite connection per session by default,
+    # which re-reads the schema and drops the page cache every time
+    poolclass=QueuePool,
+    pool_size=DATABASE_POOL_SIZE,
+    max_overflow=DATABASE_MAX_OVERFLOW
+)
+
+@event.listens_for(engine, "connect")
+def _configure_sqlite(dbapi_connection, connection_record):
+    """
+    WAL lets reads run alongside the one writer instead of waiting for it,
+    and readers never block writes. With WAL, synchronous=NORMAL stays
+    consistent after a crash and only fsyncs at checkpoints.
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -14,9 +45,190 @@ class Conversation(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     file_path = Column(String)
+    audio_hash = Column(String, index=True)
+    user_id = Column(Integer, index=True)
+    status = Column(String, default="processing", index=True)
+    # Small list-view columns, so listings never touch transcript/analysis
+    duration = Column(Float)
+    segment_count = Column(Integer)
+    summary = Column(JSON)
+    transcript = Column(JSON)
+    analysis = Column(JSON)
+    # Word-level timestamps packed by services.word_store; only loaded on access
+    packed_words = deferred(Column("words", LargeBinary))
+    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "file_path": self.file_path,
+            "user_id": self.user_id,
+            "status": self.status,
+            "transcript": self.transcript,
+            "analysis": self.analysis,
+            "created_at": self.created_at.isoformat() if self.created_at else None
+        }
+
+class Job(Base):
+    """
+    Durable unit of pipeline work, claimed and executed by the worker pool
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), index=True)
+    kind = Column(String, default="transcribe")
+    status = Column(String, default="pending")
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    run_after = Column(DateTime, default=datetime.datetime.utcnow)
+    locked_by = Column(String)
+    locked_at = Column(DateTime)
+    error = Column(Text)
+    # Run under the sampling profiler
+    profile = Column(Boolean, default=False)
+    # Higher runs first, see services.jobs
+    priority = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+class Segment(Base):
+    """
+    One classified transcript segment, normalized out of the analysis JSON
+    so phase/sentiment/speaker queries can use indexes
+    """
+    __tablename__ = "segments"
+
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False)
+    segment_index = Column(Integer, nullable=False)
+    start = Column(Float)
+    end = Column(Float)
+    speaker = Column(String)
+    phase = Column(String)
+    sentiment = Column(String)
+    # Position of the segment's text within the transcript text
+    text_offset = Column(Integer)
+    text_length = Column(Integer)
+    # Speech within the segment from word timestamps, for turn-taking reports
+    speech_start = Column(Float)
+    speech_end = Column(Float)
+    questions = Column(Integer)
+    # Copied from the conversation so common filters need no join
+    user_id = Column(Integer)
+    created_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_segments_conversation", "conversation_id", "segment_index"),
+        Index("ix_segments_phase_sentiment", "phase", "sentiment", "speaker", "created_at"),
+        Index("ix_segments_sentiment_speaker", "sentiment", "speaker", "created_at"),
+        Index("ix_segments_user_created", "user_id", "created_at"),
+    )
+
+class StageVersion(Base):
+    """
+    Version of the code that produced one pipeline stage's output for a
+    conversation. The outputs themselves are the conversation's transcript
+    (transcript, speakers) and analysis (turn_taking, classification).
+    """
+    __tablename__ = "stage_versions"
+
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), primary_key=True)
+    stage = Column(String, primary_key=True)
+    version = Column(String, nullable=False)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow)
+
+class ConversationEmbedding(Base):
+    """
+    Embeddings of a conversation's transcript segments for semantic search.
+    Replaced as a whole, under a new id, whenever the conversation is saved;
+    services.semantic_search indexes rows incrementally in id order.
+    """
+    __tablename__ = "conversation_embeddings"
+
+    id = Column(Integer, primary_key=True)
+    conversation_id = Column(Integer, ForeignKey("conversations.id"), nullable=False, unique=True)
+    model = Column(String, nullable=False, index=True)
+    # float32 arrays: (segments, dimensions) vectors and (segments, 2) start/end
+    vectors = Column(LargeBinary, nullable=False)
+    spans = Column(LargeBinary, nullable=False)
+
+    # Ids are never reused, so the highest indexed id marks what is indexed
+    __table_args__ = {"sqlite_autoincrement": True}
+
+class Voiceprint(Base):
+    """
+    Enrolled voice of a sales rep: the mean segment feature vector of
+    recordings of the rep speaking alone
+    """
+    __tablename__ = "voiceprints"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+    user_id = Column(Integer, index=True)
+    # float32 vector of FEATURE_DIM values, see services.audio_features
+    embedding = Column(LargeBinary, nullable=False)
+    # Speech windows the embedding was averaged over
+    windows = Column(Integer, default=0)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class ProcessingTask(Base):
+    """
+    Progress of one conversation through the pipeline, shared by all
+    API and worker processes
+    """
+    __tablename__ = "processing_tasks"
+
+    task_id = Column(String, primary_key=True)
+    conversation_id = Column(Integer, index=True)
+    current_step = Column(Integer, default=0)
+    total_steps = Column(Integer, default=4)
+    # Completed fraction of the current step, e.g. audio transcribed so far
+    step_fraction = Column(Float, default=0)
+    status = Column(String, default="processing")
+    error = Column(Text)
+    started_at = Column(DateTime, default=datetime.datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class TranscriptCacheEntry(Base):
+    """
+    Transcript and analysis of previously processed audio, keyed by content
+    hash, model and pipeline options
+    """
+    __tablename__ = "transcript_cache"
+
+    key = Column(String, primary_key=True)
+    audio_hash = Column(String, index=True)
+    model_name = Column(String)
+    pipeline_version = Column(String)
     transcript = Column(JSON)
     analysis = Column(JSON)
+    words = Column(LargeBinary)
+    size_bytes = Column(Integer, default=0)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+
+class UserDailyStat(Base):
+    """
+    Running totals of one metric for a user's conversations on one day.
+    Conversations without an owner are counted under user_id 0.
+    """
+    __tablename__ = "user_daily_stats"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    metric = Column(String, nullable=False)
+    value = Column(Float, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "day", "metric", name="uq_user_daily_stats"),
+    )
 
 def get_db():
     db = SessionLocal()
@@ -25,5 +237,43 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """
+    A session for work outside a request, such as workers and commands:
+    committed if the block succeeds, rolled back if it raises, and closed
+    either way
+    """
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def init_db(bind=engine):
+    """
+    Create all tables and the full-text index
+    """
+    Base.metadata.create_all(bind=bind)
+
+    # Full-text index over transcript segments, maintained by SearchService.
+    # Only the text is tokenized; the other columns locate the hit.
+    with bind.begin() as connection:
+        connection.execute(text("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS segments_fts USING fts5(
+                text,
+                conversation_id UNINDEXED,
+                segment_index UNINDEXED,
+                start UNINDEXED,
+                "end" UNINDEXED,
+                speaker UNINDEXED,
+                tokenize = 'porter unicode61'
+            )
+        """))
+
 # Create all tables
-Base.metadata.create_all(bind=engine)
\ No newline at end of file
+init_db()
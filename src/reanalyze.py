@@ -0,0 +1,18 @@
+import argparse
+import json
+
+from .models.database import session_scope
+from .services.reanalysis import enqueue_stale, reanalysis_status
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Queue re-analysis of conversations whose stage versions are out of date. "
+                    "The worker pool processes the queue; run again to resume an interrupted backfill."
+    )
+    parser.add_argument("--status", action="store_true", help="Only show the progress of queued re-analysis")
+    args = parser.parse_args()
+
+    with session_scope() as db:
+        result = {} if args.status else enqueue_stale(db)
+        result.update(reanalysis_status(db))
+    print(json.dumps(result, indent=2))
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 class ConversationBase(BaseModel):
@@ -12,7 +12,36 @@ class ConversationCreate(ConversationBase):
 
 class ConversationResponse(ConversationBase):
     id: int
+    status: Optional[str] = None
+    duration: Optional[float] = None
+    segment_count: Optional[int] = None
+    summary: Optional[Dict] = None
+    # Word timestamps per segment, only when requested
+    words: Optional[List[List[Dict]]] = None
     created_at: datetime
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+class ConversationSummary(BaseModel):
+    id: int
+    status: Optional[str] = None
+    duration: Optional[float] = None
+    segment_count: Optional[int] = None
+    summary: Optional[Dict] = None
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+class ConversationPage(BaseModel):
+    items: List[ConversationSummary]
+    next_cursor: Optional[str] = None
+
+class RejectedUpload(BaseModel):
+    filename: str
+    detail: str
+
+class BatchUploadResponse(BaseModel):
+    items: List[ConversationSummary]
+    rejected: List[RejectedUpload] = []
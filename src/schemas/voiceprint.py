@@ -0,0 +1,14 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class VoiceprintResponse(BaseModel):
+    id: int
+    name: str
+    user_id: Optional[int] = None
+    windows: int
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        orm_mode = True
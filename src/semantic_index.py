@@ -0,0 +1,23 @@
+import argparse
+import json
+
+from .models.database import session_scope
+from .services.semantic_search import semantic_index
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Bring the semantic search index up to date. Queries do this incrementally; "
+                    "a rebuild also drops replaced segments and clusters large indexes."
+    )
+    parser.add_argument("--rebuild", action="store_true", help="Rewrite the index from the database")
+    args = parser.parse_args()
+
+    with session_scope() as db:
+        try:
+            if args.rebuild:
+                semantic_index.rebuild(db)
+            semantic_index.sync(db)
+        except RuntimeError as e:
+            parser.error(str(e))
+        result = semantic_index.stats()
+    print(json.dumps(result, indent=2))
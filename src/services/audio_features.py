@@ -0,0 +1,140 @@
+from functools import lru_cache
+from typing import Dict, List, Tuple
+import numpy as np
+
+SAMPLE_RATE = 16000
+FRAME_LENGTH = 400  # 25 ms
+HOP_LENGTH = 160  # 10 ms
+N_FFT = 512
+N_MELS = 40
+N_MFCC = 13
+PITCH_RANGE_HZ = (60, 400)
+VOICING_THRESHOLD = 0.3
+# Frames are processed in blocks to keep the FFT buffers small on long calls
+BLOCK_FRAMES = 8192
+
+# mean/std MFCC, mean/std log energy, mean pitch, voiced ratio
+FEATURE_DIM = 2 * N_MFCC + 4
+PITCH_FEATURE = 2 * N_MFCC + 2
+
+@lru_cache(maxsize=4)
+def mel_filterbank(sample_rate: int = SAMPLE_RATE, n_fft: int = N_FFT, n_mels: int = N_MELS) -> np.ndarray:
+    """
+    Triangular mel filters, shape (n_mels, n_fft // 2 + 1)
+    """
+    def hz_to_mel(hz):
+        return 2595.0 * np.log10(1.0 + hz / 700.0)
+
+    def mel_to_hz(mel):
+        return 700.0 * (10 ** (mel / 2595.0) - 1.0)
+
+    mel_points = np.linspace(hz_to_mel(0), hz_to_mel(sample_rate / 2), n_mels + 2)
+    bins = np.floor((n_fft + 1) * mel_to_hz(mel_points) / sample_rate).astype(int)
+    filters = np.zeros((n_mels, n_fft // 2 + 1), dtype=np.float32)
+    for m in range(1, n_mels + 1):
+        left, center, right = bins[m - 1], bins[m], bins[m + 1]
+        if center > left:
+            filters[m - 1, left:center] = (np.arange(left, center) - left) / (center - left)
+        if right > center:
+            filters[m - 1, center:right] = (right - np.arange(center, right)) / (right - center)
+    return filters
+
+@lru_cache(maxsize=4)
+def dct_matrix(n_mfcc: int = N_MFCC, n_mels: int = N_MELS) -> np.ndarray:
+    """
+    Orthonormal DCT-II basis, shape (n_mels, n_mfcc)
+    """
+    n = np.arange(n_mels)
+    k = np.arange(n_mfcc)[:, None]
+    basis = np.cos(np.pi / n_mels * (n + 0.5) * k) * np.sqrt(2.0 / n_mels)
+    basis[0] /= np.sqrt(2.0)
+    return basis.T.astype(np.float32)
+
+def frame_features(audio: np.ndarray, sample_rate: int = SAMPLE_RATE) -> Dict[str, np.ndarray]:
+    """
+    Per-frame MFCC, log energy and pitch for the whole signal.
+
+    Returns arrays indexed by frame: "mfcc" (n, N_MFCC), "log_energy" (n,),
+    "pitch" (n,) in Hz with 0 for unvoiced frames.
+    """
+    audio = np.asarray(audio, dtype=np.float32)
+    if len(audio) < FRAME_LENGTH:
+        audio = np.pad(audio, (0, FRAME_LENGTH - len(audio)))
+    frames = np.lib.stride_tricks.sliding_window_view(audio, FRAME_LENGTH)[::HOP_LENGTH]
+    n_frames = len(frames)
+
+    window = np.hanning(FRAME_LENGTH).astype(np.float32)
+    filters = mel_filterbank(sample_rate)
+    dct = dct_matrix()
+    min_lag = int(sample_rate / PITCH_RANGE_HZ[1])
+    max_lag = int(sample_rate / PITCH_RANGE_HZ[0])
+
+    mfcc = np.empty((n_frames, N_MFCC), dtype=np.float32)
+    log_energy = np.empty(n_frames, dtype=np.float32)
+    pitch = np.empty(n_frames, dtype=np.float32)
+
+    for start in range(0, n_frames, BLOCK_FRAMES):
+        block = frames[start:start + BLOCK_FRAMES]
+        block = block - block.mean(axis=1, keepdims=True)
+        end = start + len(block)
+
+        log_energy[start:end] = np.log(np.mean(block ** 2, axis=1) + 1e-10)
+
+        power = np.abs(np.fft.rfft(block * window, n=N_FFT)) ** 2
+        log_mel = np.log(power @ filters.T + 1e-10)
+        mfcc[start:end] = log_mel @ dct
+
+        # Autocorrelation via the power spectrum, padded to avoid wrap-around
+        spectrum = np.fft.rfft(block, n=2 * FRAME_LENGTH)
+        autocorr = np.fft.irfft(np.abs(spectrum) ** 2)[:, :max_lag + 1]
+        lags = min_lag + np.argmax(autocorr[:, min_lag:], axis=1)
+        peak = autocorr[np.arange(len(block)), lags]
+        voiced = peak > VOICING_THRESHOLD * (autocorr[:, 0] + 1e-10)
+        pitch[start:end] = np.where(voiced, sample_rate / lags, 0.0)
+
+    return {"mfcc": mfcc, "log_energy": log_energy, "pitch": pitch}
+
+def segment_features(
+    frames: Dict[str, np.ndarray],
+    spans: List[Tuple[float, float]],
+    sample_rate: int = SAMPLE_RATE
+) -> np.ndarray:
+    """
+    Summarize frame features over each (start, end) span in seconds.
+
+    Span statistics are computed from cumulative sums, so the cost is one
+    pass over the frames plus O(1) per segment. Returns (len(spans), FEATURE_DIM).
+    """
+    n_frames = len(frames["log_energy"])
+    if not spans:
+        return np.zeros((0, FEATURE_DIM), dtype=np.float32)
+
+    times = np.asarray(spans, dtype=np.float64)
+    first = np.clip((times[:, 0] * sample_rate / HOP_LENGTH).astype(int), 0, n_frames - 1)
+    last = np.clip((times[:, 1] * sample_rate / HOP_LENGTH).astype(int), first + 1, n_frames)
+    count = (last - first)[:, None].astype(np.float64)
+
+    def span_sums(values: np.ndarray) -> np.ndarray:
+        values = values.reshape(n_frames, -1).astype(np.float64)
+        cumulative = np.vstack([np.zeros((1, values.shape[1])), np.cumsum(values, axis=0)])
+        return cumulative[last] - cumulative[first]
+
+    stacked = np.hstack([frames["mfcc"], frames["log_energy"][:, None]])
+    sums = span_sums(stacked)
+    squares = span_sums(stacked ** 2)
+    mean = sums / count
+    std = np.sqrt(np.maximum(squares / count - mean ** 2, 0.0))
+
+    voiced = (frames["pitch"] > 0).astype(np.float64)
+    voiced_count = span_sums(voiced)
+    pitch_sum = span_sums(frames["pitch"])
+    mean_pitch = np.where(voiced_count > 0, pitch_sum / np.maximum(voiced_count, 1), 0.0)
+
+    return np.hstack([
+        mean[:, :N_MFCC],
+        std[:, :N_MFCC],
+        mean[:, N_MFCC:],
+        std[:, N_MFCC:],
+        mean_pitch,
+        voiced_count / count
+    ]).astype(np.float32)
@@ -0,0 +1,75 @@
+import os
+import subprocess
+import uuid
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+from ..config import UPLOAD_DIR, PCM_CACHE_MAX_MB
+
+SAMPLE_RATE = 16000
+PCM_CACHE_DIR = Path(UPLOAD_DIR) / "pcm"
+
+def decode_audio(path: str, sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    Decode any ffmpeg-readable file straight to mono float32 at the given rate.
+    No intermediate file is written.
+    """
+    cmd = [
+        "ffmpeg", "-nostdin", "-threads", "0",
+        "-i", path,
+        "-f", "f32le", "-ac", "1", "-ar", str(sample_rate),
+        "-"
+    ]
+    try:
+        out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"Failed to decode audio: {e.stderr.decode(errors='ignore')}") from e
+    return np.frombuffer(out, dtype=np.float32).copy()
+
+def pcm_cache_path(audio_hash: str) -> Path:
+    return PCM_CACHE_DIR / f"{audio_hash}.f32"
+
+def load_audio(path: str, audio_hash: Optional[str] = None) -> np.ndarray:
+    """
+    Return 16 kHz mono float32 samples for the file.
+
+    When the content hash is known the decoded samples are kept as raw PCM
+    and later calls memory-map that file instead of decoding again.
+    """
+    if audio_hash is None:
+        return decode_audio(path)
+
+    cached = pcm_cache_path(audio_hash)
+    try:
+        size = cached.stat().st_size
+    except FileNotFoundError:
+        size = None
+    if size and size % np.dtype(np.float32).itemsize == 0:
+        os.utime(cached)
+        # Copy-on-write keeps the pages shared but gives consumers a writable array
+        return np.memmap(cached, dtype=np.float32, mode="c")
+    if size is not None:
+        # Empty or cut short: memmap can't open it, so decode again
+        cached.unlink(missing_ok=True)
+
+    audio = decode_audio(path)
+    if len(audio) == 0:
+        return audio
+    PCM_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    partial = cached.with_suffix(f".{uuid.uuid4().hex}.part")
+    audio.tofile(partial)
+    os.replace(partial, cached)
+    _trim_pcm_cache()
+    return audio
+
+def _trim_pcm_cache(max_bytes: int = PCM_CACHE_MAX_MB * 1024 * 1024) -> None:
+    """
+    Delete the least recently used PCM files above the size cap
+    """
+    files = sorted(PCM_CACHE_DIR.glob("*.f32"), key=lambda f: f.stat().st_mtime, reverse=True)
+    total = 0
+    for f in files:
+        total += f.stat().st_size
+        if total > max_bytes:
+            f.unlink(missing_ok=True)
@@ -1,58 +1,209 @@
 import os
+import hashlib
+import zipfile
 from pathlib import Path
-from pydub import AudioSegment
-from fastapi import UploadFile, HTTPException
+from typing import Callable, Dict, List, NamedTuple, Tuple
+from fastapi import UploadFile, HTTPException, Request
+from multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
 import uuid
 
-UPLOAD_DIR = Path("uploads")
+from ..config import UPLOAD_DIR as UPLOAD_DIR_NAME, MAX_FILE_SIZE_MB, MAX_BATCH_UPLOAD_MB, UPLOAD_CHUNK_SIZE
+
+UPLOAD_DIR = Path(UPLOAD_DIR_NAME)
 ALLOWED_EXTENSIONS = {".wav", ".mp3", ".m4a"}
-MAX_FILE_SIZE = 100 * 1024 * 1024  # 100MB
+MAX_FILE_SIZE = MAX_FILE_SIZE_MB * 1024 * 1024
+MAX_BATCH_UPLOAD_SIZE = MAX_BATCH_UPLOAD_MB * 1024 * 1024
 
 # Create uploads directory if it doesn't exist
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-async def process_audio_file(file: UploadFile) -> str:
+class StoredAudio(NamedTuple):
+    path: str
+    sha256: str
+    size: int
+
+def validate_extension(filename: str) -> str:
     """
-    Process uploaded audio file:
-    1. Validate file
-    2. Save to disk
-    3. Convert to WAV if necessary
-    4. Return path to processed file
-    """
-    # Validate file size
-    file.file.seek(0, 2)
-    size = file.file.tell()
-    file.file.seek(0)
-    
-    if size > MAX_FILE_SIZE:
-        raise HTTPException(status_code=400, detail="File too large")
-    
-    # Get file extension
-    ext = Path(file.filename).suffix.lower()
+    Return the lower-cased extension, rejecting unsupported formats
+    """
+    ext = Path(filename or "").suffix.lower()
     if ext not in ALLOWED_EXTENSIONS:
         raise HTTPException(status_code=400, detail="Invalid file format")
-    
-    # Generate unique filename
-    filename = f"{uuid.uuid4()}{ext}"
-    file_path = UPLOAD_DIR / filename
-    
-    # Save file
+    return ext
+
+class _UploadWriter:
+    """
+    A new file in UPLOAD_DIR written chunk by chunk. The SHA-256 of the
+    content is computed while writing and the file is discarded as soon as
+    it grows past `max_size`.
+    """
+    def __init__(self, ext: str, max_size: int = MAX_FILE_SIZE):
+        self.path = UPLOAD_DIR / f"{uuid.uuid4()}{ext}"
+        self.partial_path = self.path.with_suffix(ext + ".part")
+        self.max_size = max_size
+        self.hasher = hashlib.sha256()
+        self.size = 0
+        self.file = open(self.partial_path, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        try:
+            self.size += len(chunk)
+            if self.size > self.max_size:
+                raise HTTPException(status_code=413, detail="File too large")
+            self.hasher.update(chunk)
+            self.file.write(chunk)
+        except HTTPException:
+            self.abort()
+            raise
+        except Exception as e:
+            self.abort()
+            raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+
+    def finish(self) -> StoredAudio:
+        self.file.close()
+        if self.size == 0:
+            self.abort()
+            raise HTTPException(status_code=400, detail="Empty file")
+        os.replace(self.partial_path, self.path)
+        return StoredAudio(path=str(self.path), sha256=self.hasher.hexdigest(), size=self.size)
+
+    def abort(self) -> None:
+        self.file.close()
+        self.partial_path.unlink(missing_ok=True)
+
+def _write_stream(read: Callable[[int], bytes], ext: str, max_size: int = MAX_FILE_SIZE) -> StoredAudio:
+    """
+    Copy a readable stream to a new file in UPLOAD_DIR in fixed-size chunks,
+    so memory use stays at one chunk regardless of the file size
+    """
+    writer = _UploadWriter(ext, max_size)
     try:
-        with open(file_path, "wb") as f:
-            while chunk := await file.read(8192):
-                f.write(chunk)
+        while chunk := read(UPLOAD_CHUNK_SIZE):
+            writer.write(chunk)
+    except HTTPException:
+        raise
     except Exception as e:
+        writer.abort()
         raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
-    
-    # Convert to WAV if necessary
-    if ext != ".wav":
-        wav_path = file_path.with_suffix(".wav")
-        try:
-            audio = AudioSegment.from_file(file_path)
-            audio.export(wav_path, format="wav")
-            os.remove(file_path)  # Remove original file
-            file_path = wav_path
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error converting file: {str(e)}")
-    
-    return str(file_path)
\ No newline at end of file
+    return writer.finish()
+
+async def save_upload(file: UploadFile) -> StoredAudio:
+    """
+    Stream an upload to disk, see _write_stream
+    """
+    ext = validate_extension(file.filename)
+    return await run_in_threadpool(_write_stream, file.file.read, ext)
+
+def _extract_archive(archive_path: Path) -> Tuple[List[Tuple[str, StoredAudio]], List[Dict]]:
+    stored = []
+    rejected = []
+    with zipfile.ZipFile(archive_path) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            if info.is_dir() or name.startswith("__MACOSX/") or Path(name).name.startswith("."):
+                continue
+            try:
+                ext = validate_extension(name)
+                # The declared size can lie, so _write_stream enforces the limit too
+                if info.file_size > MAX_FILE_SIZE:
+                    raise HTTPException(status_code=413, detail="File too large")
+                with archive.open(info) as member:
+                    stored.append((name, _write_stream(member.read, ext)))
+            except HTTPException as e:
+                rejected.append({"filename": name, "detail": e.detail})
+    return stored, rejected
+
+async def save_archive(file: UploadFile) -> Tuple[List[Tuple[str, StoredAudio]], List[Dict]]:
+    """
+    Stream a zip archive to disk and store every audio file inside it.
+    Returns (member name, stored audio) pairs and the members that were
+    rejected, with the reason.
+    """
+    archive = await run_in_threadpool(_write_stream, file.file.read, ".zip", MAX_BATCH_UPLOAD_SIZE)
+    archive_path = Path(archive.path)
+    try:
+        return await run_in_threadpool(_extract_archive, archive_path)
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Invalid zip archive")
+    finally:
+        archive_path.unlink(missing_ok=True)
+
+async def receive_upload(request: Request, field: str = "file") -> StoredAudio:
+    """
+    Store the `field` file of a multipart request body as it arrives,
+    without letting Starlette spool the whole body to a temporary file
+    first. The extension is checked as soon as the part's headers are in
+    and the size limit while the body streams, so rejected uploads are
+    not read to the end.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data upload")
+
+    events: List[Tuple[str, bytes]] = []
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": lambda: events.append(("begin", b"")),
+        "on_header_field": lambda data, start, end: events.append(("field", data[start:end])),
+        "on_header_value": lambda data, start, end: events.append(("value", data[start:end])),
+        "on_header_end": lambda: events.append(("header", b"")),
+        "on_headers_finished": lambda: events.append(("headers", b"")),
+        "on_part_data": lambda data, start, end: events.append(("data", data[start:end])),
+        "on_part_end": lambda: events.append(("end", b""))
+    })
+    writer = None
+    stored = None
+    headers: Dict[bytes, bytes] = {}
+    header_field = header_value = b""
+    buffer = bytearray()
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for event, data in events:
+                if event == "begin":
+                    headers = {}
+                elif event == "field":
+                    header_field += data
+                elif event == "value":
+                    header_value += data
+                elif event == "header":
+                    headers[header_field.lower()] = header_value
+                    header_field = header_value = b""
+                elif event == "headers":
+                    _, options = parse_options_header(headers.get(b"content-disposition", b""))
+                    if stored is None and options.get(b"name") == field.encode() and b"filename" in options:
+                        ext = validate_extension(options[b"filename"].decode("utf-8", "replace"))
+                        writer = await run_in_threadpool(_UploadWriter, ext)
+                elif event == "data" and writer is not None:
+                    buffer += data
+                    if len(buffer) >= UPLOAD_CHUNK_SIZE:
+                        await run_in_threadpool(writer.write, bytes(buffer))
+                        buffer.clear()
+                elif event == "end" and writer is not None:
+                    await run_in_threadpool(writer.write, bytes(buffer))
+                    buffer.clear()
+                    stored = await run_in_threadpool(writer.finish)
+                    writer = None
+            events.clear()
+    except BaseException:
+        if writer is not None:
+            writer.abort()
+        raise
+    if writer is not None:
+        # The body ended in the middle of the file
+        writer.abort()
+        raise HTTPException(status_code=400, detail="Incomplete upload")
+    if stored is None:
+        raise HTTPException(status_code=400, detail=f"No file in the '{field}' field")
+    return stored
+
+async def process_audio_file(file: UploadFile) -> StoredAudio:
+    """
+    Process uploaded audio file:
+    1. Validate and stream the file to disk
+    2. Return the stored file with the hash of its content
+
+    The file is kept in its original format; workers decode it once,
+    directly to 16 kHz mono samples (see audio_loader).
+    """
+    return await save_upload(file)
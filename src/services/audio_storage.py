@@ -0,0 +1,179 @@
+import os
+import re
+import subprocess
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+
+from ..config import AUDIO_STORAGE_FORMAT, AUDIO_OPUS_BITRATE, UPLOAD_CHUNK_SIZE
+from ..models.database import Conversation
+
+# Extension, ffmpeg muxer and codec options for each storage format
+STORAGE_FORMATS = {
+    "flac": (".flac", "flac", ["-c:a", "flac", "-compression_level", "8"]),
+    "opus": (".opus", "ogg", ["-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip"])
+}
+# Already compressed uploads would only grow as FLAC
+LOSSY_EXTENSIONS = {".mp3", ".m4a"}
+
+MEDIA_TYPES = {
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+    ".flac": "audio/flac",
+    ".opus": "audio/ogg"
+}
+# Clips of formats without a cheap re-encoder are served as 16-bit WAV
+CLIP_FORMATS = {
+    ".flac": ("flac", ["-c:a", "flac"]),
+    ".opus": ("ogg", ["-c:a", "libopus", "-b:a", AUDIO_OPUS_BITRATE, "-application", "voip"])
+}
+DEFAULT_CLIP_FORMAT = ("wav", ["-c:a", "pcm_s16le"])
+CLIP_MEDIA_TYPES = {"flac": "audio/flac", "ogg": "audio/ogg", "wav": "audio/wav"}
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+def media_type(path: str) -> str:
+    return MEDIA_TYPES.get(Path(path).suffix.lower(), "application/octet-stream")
+
+def transcode(path: str, storage_format: str = AUDIO_STORAGE_FORMAT) -> str:
+    """
+    Write a copy of the recording in the storage format next to it and
+    return its path. Returns the original path when the recording is
+    already stored that way, or when converting it would not save space.
+    The original file is left in place.
+    """
+    if storage_format not in STORAGE_FORMATS:
+        return path
+    ext, muxer, codec_args = STORAGE_FORMATS[storage_format]
+    source = Path(path)
+    if source.suffix.lower() == ext or (storage_format == "flac" and source.suffix.lower() in LOSSY_EXTENSIONS):
+        return path
+
+    target = source.with_suffix(ext)
+    partial = source.with_suffix(ext + ".part")
+    cmd = ["ffmpeg", "-nostdin", "-y", "-i", str(source), "-map", "0:a:0", *codec_args, "-f", muxer, str(partial)]
+    try:
+        subprocess.run(cmd, capture_output=True, check=True)
+    except subprocess.CalledProcessError as e:
+        partial.unlink(missing_ok=True)
+        raise RuntimeError(f"Failed to transcode audio: {e.stderr.decode(errors='ignore')}") from e
+
+    if partial.stat().st_size >= source.stat().st_size:
+        partial.unlink()
+        return path
+    os.replace(partial, target)
+    return str(target)
+
+def archive_audio(db: Session, conversation: Conversation) -> bool:
+    """
+    Replace a conversation's uploaded recording with its compact storage
+    copy once analysis is done. The original is only deleted after the new
+    path is committed. Returns whether the file was replaced.
+    """
+    source = conversation.file_path
+    if not source or not os.path.exists(source):
+        return False
+    target = transcode(source)
+    if target == source:
+        return False
+
+    conversation.file_path = target
+    try:
+        db.commit()
+    except Exception:
+        db.rollback()
+        Path(target).unlink(missing_ok=True)
+        raise
+    os.remove(source)
+    return True
+
+def archive_pending(db: Session, page_size: int = 100) -> int:
+    """
+    Transcode the recordings of all completed conversations that are not
+    stored in the storage format yet, e.g. those uploaded before tiering
+    was enabled. Returns the number of files replaced.
+    """
+    if AUDIO_STORAGE_FORMAT not in STORAGE_FORMATS:
+        return 0
+    ext = STORAGE_FORMATS[AUDIO_STORAGE_FORMAT][0]
+    replaced = 0
+    last_id = 0
+    while True:
+        conversations = db.query(Conversation).filter(
+            Conversation.status == "completed",
+            Conversation.id > last_id,
+            ~Conversation.file_path.endswith(ext)
+        ).order_by(Conversation.id).limit(page_size).all()
+        if not conversations:
+            break
+        last_id = conversations[-1].id
+        for conversation in conversations:
+            replaced += archive_audio(db, conversation)
+    return replaced
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Inclusive byte offsets requested by a single-range Range header, None
+    when the whole file should be sent. Raises ValueError when the range
+    cannot be satisfied.
+    """
+    match = RANGE_PATTERN.match((header or "").strip())
+    if not match:
+        # Missing, multi-range or non-byte ranges: send the whole file
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("Range not satisfiable")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Range not satisfiable")
+    return start, end
+
+def iter_file(path: str, start: int, end: int, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Bytes start through end (inclusive) of a file, in chunks
+    """
+    remaining = end - start + 1
+    with open(path, "rb") as f:
+        f.seek(start)
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def clip_command(path: str, start: float, end: Optional[float]) -> Tuple[List[str], str]:
+    """
+    ffmpeg command that writes the given time range of a recording to
+    stdout, with the media type of its output. Seeking before the input
+    uses the container's seek index, so only the clip is decoded.
+    """
+    muxer, codec_args = CLIP_FORMATS.get(Path(path).suffix.lower(), DEFAULT_CLIP_FORMAT)
+    cmd = ["ffmpeg", "-nostdin", "-ss", f"{start:.3f}", "-i", path]
+    if end is not None:
+        cmd += ["-t", f"{end - start:.3f}"]
+    cmd += ["-map", "0:a:0", *codec_args, "-f", muxer, "-"]
+    return cmd, CLIP_MEDIA_TYPES[muxer]
+
+def stream_clip(cmd: List[str], chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Run a clip_command and yield its output as it is produced. The process
+    is killed if the client goes away before the clip is complete.
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        while chunk := process.stdout.read(chunk_size):
+            yield chunk
+    finally:
+        process.kill()
+        process.wait()
+        process.stdout.close()
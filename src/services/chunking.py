@@ -0,0 +1,115 @@
+from typing import Dict, List, Tuple
+import numpy as np
+
+FRAME_SECONDS = 0.03
+
+def frame_energy(audio: np.ndarray, sample_rate: int, frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """
+    RMS energy of consecutive non-overlapping frames
+    """
+    frame_length = max(1, int(sample_rate * frame_seconds))
+    n_frames = len(audio) // frame_length
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[:n_frames * frame_length].reshape(n_frames, frame_length)
+    return np.sqrt(np.mean(frames ** 2, axis=1))
+
+def plan_chunks(
+    audio: np.ndarray,
+    sample_rate: int,
+    chunk_seconds: float,
+    overlap_seconds: float,
+    search_seconds: float = 5.0
+) -> List[Tuple[int, int, int, int]]:
+    """
+    Split audio into chunks cut at the quietest point near every
+    `chunk_seconds` boundary.
+
+    Returns (start, end, core_start, core_end) sample offsets for each chunk.
+    [core_start, core_end) tiles the audio without gaps; [start, end) extends
+    the core by `overlap_seconds` on both sides so words at a cut are heard
+    in full by at least one chunk.
+    """
+    total = len(audio)
+    chunk_length = int(chunk_seconds * sample_rate)
+    if total <= chunk_length:
+        return [(0, total, 0, total)]
+
+    energy = frame_energy(audio, sample_rate)
+    frame_length = max(1, int(sample_rate * FRAME_SECONDS))
+    search_frames = int(search_seconds / FRAME_SECONDS)
+
+    cuts = [0]
+    target = chunk_length
+    while target < total - chunk_length // 4:
+        # Look for the quietest frame around the nominal boundary
+        center = target // frame_length
+        lo = max(cuts[-1] // frame_length + 1, center - search_frames)
+        hi = min(len(energy), center + search_frames + 1)
+        cut = (lo + int(np.argmin(energy[lo:hi]))) * frame_length if hi > lo else target
+        cuts.append(cut)
+        target = cut + chunk_length
+    cuts.append(total)
+
+    overlap = int(overlap_seconds * sample_rate)
+    return [
+        (max(0, core_start - overlap), min(total, core_end + overlap), core_start, core_end)
+        for core_start, core_end in zip(cuts[:-1], cuts[1:])
+    ]
+
+def merge_chunk_results(
+    results: List[Dict],
+    chunks: List[Tuple[int, int, int, int]],
+    sample_rate: int
+) -> Dict:
+    """
+    Merge per-chunk Whisper results into a single transcript.
+
+    Timestamps are shifted to the global timeline. Each word is kept only by
+    the chunk whose core contains the word's midpoint, which removes the
+    duplicates transcribed twice in the overlaps.
+    """
+    merged_segments = []
+    for result, (start, _, core_start, core_end) in zip(results, chunks):
+        offset = start / sample_rate
+        core_lo = core_start / sample_rate
+        core_hi = core_end / sample_rate
+
+        def in_core(item_start: float, item_end: float) -> bool:
+            midpoint = (item_start + item_end) / 2
+            return core_lo <= midpoint < core_hi
+
+        for segment in result["segments"]:
+            words = [
+                {**word, "start": word["start"] + offset, "end": word["end"] + offset}
+                for word in segment.get("words", [])
+            ]
+            if words:
+                kept = [word for word in words if in_core(word["start"], word["end"])]
+                if not kept:
+                    continue
+                text = segment["text"]
+                if len(kept) < len(words):
+                    text = " " + " ".join(word["text"].strip() for word in kept)
+                merged_segments.append({
+                    **segment,
+                    "start": kept[0]["start"],
+                    "end": kept[-1]["end"],
+                    "text": text,
+                    "words": kept
+                })
+            else:
+                seg_start = segment["start"] + offset
+                seg_end = segment["end"] + offset
+                if in_core(seg_start, seg_end):
+                    merged_segments.append({**segment, "start": seg_start, "end": seg_end})
+
+    merged_segments.sort(key=lambda segment: segment["start"])
+    for index, segment in enumerate(merged_segments):
+        segment["id"] = index
+
+    return {
+        "segments": merged_segments,
+        "text": "".join(segment["text"] for segment in merged_segments),
+        "language": results[0]["language"] if results else "en"
+    }
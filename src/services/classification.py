@@ -1,91 +1,212 @@
-from typing import Dict, List
+import re
+import zlib
+from typing import Dict, List, Sequence
 import numpy as np
+from scipy.sparse import csr_matrix
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+# Labels the classifier assigns, in output order
+CONVERSATION_PHASES = [
+    "introduction",
+    "discovery",
+    "pitch",
+    "objection_handling",
+    "closing"
+]
+SENTIMENT_LABELS = ["positive", "neutral", "negative"]
+
+# Seed vocabulary for each conversation phase and sentiment. Terms are hashed
+# into the same feature space as the transcript text, so multi-word entries
+# match as bigrams.
+PHASE_LEXICON = {
+    "introduction": [
+        "hello", "hi", "good morning", "good afternoon", "my name", "name is", "thanks for",
+        "nice to", "how are", "calling from", "introduce", "quick call", "taking the"
+    ],
+    "discovery": [
+        "tell me", "how do", "what do", "currently", "challenge", "challenges", "process",
+        "team", "looking for", "need", "needs", "goal", "goals", "how many", "right now", "pain"
+    ],
+    "pitch": [
+        "our product", "our platform", "we offer", "feature", "features", "solution", "helps",
+        "allows", "integrates", "demo", "show you", "benefit", "customers like", "save"
+    ],
+    "objection_handling": [
+        "expensive", "price", "pricing", "cost", "budget", "concern", "concerns", "worried",
+        "not sure", "competitor", "contract", "too much", "understand your", "already have", "but"
+    ],
+    "closing": [
+        "next steps", "next step", "sign", "contract", "proposal", "follow up", "send over",
+        "schedule", "agreement", "get started", "move forward", "deal", "purchase", "onboarding"
+    ]
+}
+SENTIMENT_LEXICON = {
+    "positive": [
+        "great", "good", "love", "excellent", "perfect", "awesome", "happy", "interested",
+        "sounds good", "makes sense", "helpful", "thank", "thanks", "exactly", "nice", "yes"
+    ],
+    "negative": [
+        "bad", "problem", "issue", "expensive", "unhappy", "frustrated", "difficult", "worried",
+        "not interested", "don't", "no", "never", "terrible", "disappointed", "concern", "hate"
+    ]
+}
+
+# Expected relative position (0 = start, 1 = end of call) of each phase
+PHASE_POSITION_PRIOR = {
+    "introduction": 0.0,
+    "discovery": 0.3,
+    "pitch": 0.5,
+    "objection_handling": 0.7,
+    "closing": 1.0
+}
+POSITION_PRIOR_WEIGHT = 0.3
+POSITION_PRIOR_WIDTH = 0.25
+# Minimum lexical evidence needed to call a segment positive or negative
+SENTIMENT_MARGIN = 0.1
+
+class HashingVectorizer:
+    """
+    Stateless word unigram + bigram featurizer using the hashing trick.
+    Produces L2-normalized sparse rows, one per text.
+    """
+
+    def __init__(self, n_features: int = 2 ** 16):
+        self.n_features = n_features
+
+    def tokens(self, text: str) -> List[str]:
+        words = TOKEN_PATTERN.findall(text.lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def transform(self, texts: Sequence[str]) -> csr_matrix:
+        indices = []
+        indptr = [0]
+        for text in texts:
+            indices.extend(zlib.crc32(token.encode()) % self.n_features for token in self.tokens(text))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.float32)
+        matrix = csr_matrix(
+            (data, np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)),
+            shape=(len(texts), self.n_features)
+        )
+        matrix.sum_duplicates()
+        norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        return csr_matrix(matrix.multiply(1 / norms[:, None]))
+
+    def weight_matrix(self, lexicon: Dict[str, List[str]], labels: List[str]) -> np.ndarray:
+        """
+        Dense (len(labels), n_features) weights with one row per label
+        """
+        weights = np.zeros((len(labels), self.n_features), dtype=np.float32)
+        for row, label in enumerate(labels):
+            for term in lexicon.get(label, []):
+                weights[row, zlib.crc32(term.encode()) % self.n_features] += 1
+        return weights
 
 class DialogueClassifier:
     def __init__(self):
         # Initialize any required models or resources
-        self.conversation_phases = [
-            "introduction",
-            "discovery",
-            "pitch",
-            "objection_handling",
-            "closing"
-        ]
-        self.sentiment_labels = ["positive", "neutral", "negative"]
-    
+        self.conversation_phases = list(CONVERSATION_PHASES)
+        self.sentiment_labels = list(SENTIMENT_LABELS)
+        self.vectorizer = HashingVectorizer()
+        self.phase_weights = self.vectorizer.weight_matrix(PHASE_LEXICON, self.conversation_phases)
+        self.sentiment_weights = self.vectorizer.weight_matrix(SENTIMENT_LEXICON, self.sentiment_labels)
+        self.phase_positions = np.array(
+            [PHASE_POSITION_PRIOR[phase] for phase in self.conversation_phases], dtype=np.float32
+        )
+
     async def classify_dialogue(self, transcript: Dict) -> Dict:
         """
         Classify dialogue segments into conversation phases and analyze sentiment
         """
-        segments = transcript["segments"]
-        classified_segments = []
-        
-        for segment in segments:
-            classification = {
-                "phase": self._classify_phase(segment["text"]),
-                "sentiment": self._analyze_sentiment(segment["text"]),
-                "speaker": segment["speaker"]
-            }
-            classified_segments.append({**segment, "classification": classification})
-        
-        return {
-            "segments": classified_segments,
-            "summary": self._generate_summary(classified_segments)
-        }
-    
-    def _classify_phase(self, text: str) -> str:
-        """
-        Classify text into conversation phase
-        This is a placeholder for more sophisticated classification
-        """
-        # Implement phase classification logic
-        return "discovery"
-    
-    def _analyze_sentiment(self, text: str) -> str:
+        return self.classify_batch([transcript])[0]
+
+    def classify_batch(self, transcripts: List[Dict]) -> List[Dict]:
         """
-        Analyze sentiment of text
-        This is a placeholder for more sophisticated sentiment analysis
+        Classify the segments of several conversations in one inference pass.
+        All segments are featurized together and scored with two matrix
+        products; results are split back per conversation.
         """
-        # Implement sentiment analysis logic
-        return "neutral"
-    
-    def _generate_summary(self, classified_segments: List[Dict]) -> Dict:
+        all_segments = [segment for transcript in transcripts for segment in transcript["segments"]]
+        counts = [len(transcript["segments"]) for transcript in transcripts]
+
+        features = self.vectorizer.transform([segment["text"] for segment in all_segments])
+        positions = np.concatenate([self._relative_positions(t["segments"]) for t in transcripts]) \
+            if all_segments else np.zeros(0, dtype=np.float32)
+        phase_ids = self._classify_phases(features, positions)
+        sentiment_ids = self._analyze_sentiments(features)
+
+        results = []
+        offset = 0
+        for transcript, count in zip(transcripts, counts):
+            segments = transcript["segments"]
+            speakers = transcript.get("speakers") or [segment.get("speaker") for segment in segments]
+            phases = phase_ids[offset:offset + count]
+            sentiments = sentiment_ids[offset:offset + count]
+            offset += count
+
+            classified_segments = [
+                {
+                    **segment,
+                    "classification": {
+                        "phase": self.conversation_phases[phase],
+                        "sentiment": self.sentiment_labels[sentiment],
+                        "speaker": speaker
+                    }
+                }
+                for segment, phase, sentiment, speaker in zip(segments, phases, sentiments, speakers)
+            ]
+            results.append({
+                "segments": classified_segments,
+                "summary": self._generate_summary(segments, phases, sentiments)
+            })
+        return results
+
+    def _relative_positions(self, segments: List[Dict]) -> np.ndarray:
         """
-        Generate conversation summary statistics
+        Midpoint of each segment as a fraction of the call duration
         """
-        return {
-            "phase_distribution": self._calculate_phase_distribution(classified_segments),
-            "sentiment_summary": self._calculate_sentiment_summary(classified_segments),
-            "duration": self._calculate_duration(classified_segments)
-        }
-    
-    def _calculate_phase_distribution(self, segments: List[Dict]) -> Dict:
+        if not segments:
+            return np.zeros(0, dtype=np.float32)
+        starts = np.array([segment["start"] for segment in segments], dtype=np.float32)
+        ends = np.array([segment["end"] for segment in segments], dtype=np.float32)
+        duration = max(float(ends.max()), 1e-6)
+        return (starts + ends) / 2 / duration
+
+    def _classify_phases(self, features: csr_matrix, positions: np.ndarray) -> np.ndarray:
         """
-        Calculate the distribution of conversation phases
+        Phase index per segment from lexical scores plus a position prior
         """
-        distribution = {phase: 0 for phase in self.conversation_phases}
-        for segment in segments:
-            phase = segment["classification"]["phase"]
-            distribution[phase] += segment["end"] - segment["start"]
-        return distribution
-    
-    def _calculate_sentiment_summary(self, segments: List[Dict]) -> Dict:
+        lexical = np.asarray(features @ self.phase_weights.T)
+        prior = np.exp(-((positions[:, None] - self.phase_positions[None, :]) / POSITION_PRIOR_WIDTH) ** 2)
+        return np.argmax(lexical + POSITION_PRIOR_WEIGHT * prior, axis=1)
+
+    def _analyze_sentiments(self, features: csr_matrix) -> np.ndarray:
         """
-        Calculate sentiment distribution
+        Sentiment index per segment; neutral unless the lexical evidence
+        for positive or negative exceeds the margin
         """
-        sentiment_counts = {label: 0 for label in self.sentiment_labels}
-        for segment in segments:
-            sentiment = segment["classification"]["sentiment"]
-            sentiment_counts[sentiment] += 1
-        return sentiment_counts
-    
-    def _calculate_duration(self, segments: List[Dict]) -> float:
+        scores = np.asarray(features @ self.sentiment_weights.T)
+        scores[:, self.sentiment_labels.index("neutral")] = SENTIMENT_MARGIN
+        return np.argmax(scores, axis=1)
+
+    def _generate_summary(self, segments: List[Dict], phases: np.ndarray, sentiments: np.ndarray) -> Dict:
         """
-        Calculate total conversation duration
+        Generate conversation summary statistics
         """
-        if not segments:
-            return 0
-        return segments[-1]["end"]
+        durations = np.array([segment["end"] - segment["start"] for segment in segments], dtype=np.float64)
+        phase_durations = np.bincount(phases, weights=durations, minlength=len(self.conversation_phases))
+        sentiment_counts = np.bincount(sentiments, minlength=len(self.sentiment_labels))
+        return {
+            "phase_distribution": {
+                phase: float(value) for phase, value in zip(self.conversation_phases, phase_durations)
+            },
+            "sentiment_summary": {
+                label: int(value) for label, value in zip(self.sentiment_labels, sentiment_counts)
+            },
+            "duration": float(segments[-1]["end"]) if segments else 0
+        }
 
 dialogue_classifier = DialogueClassifier()
 
@@ -93,4 +214,4 @@ async def classify_dialogue(transcript: Dict) -> Dict:
     """
     Wrapper function for dialogue classification
     """
-    return await dialogue_classifier.classify_dialogue(transcript)
\ No newline at end of file
+    return await dialogue_classifier.classify_dialogue(transcript)
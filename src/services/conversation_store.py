@@ -0,0 +1,153 @@
+import os
+from typing import Callable, Dict, List, Optional
+from sqlalchemy.orm import Session
+
+from ..models.database import Conversation, ConversationEmbedding, Job, Segment, StageVersion
+from .search import SearchService
+from .stats import ConversationStats
+from .stages import STAGE_VERSIONS, record_stage_versions
+from .word_store import split_words, unpack_words, conversation_words
+from .turn_taking import speech_bounds
+from .semantic_search import embedding_required, store_embeddings
+
+def segment_rows(
+    conversation: Conversation,
+    transcript: Dict,
+    analysis: Dict,
+    words: Optional[List[List[Dict]]] = None
+) -> List[Dict]:
+    """
+    Flatten classified segments into rows for the segments table
+    """
+    text = transcript.get("text") or ""
+    speakers = transcript.get("speakers") or []
+    segments = analysis.get("segments", [])
+    speech_starts, speech_ends = speech_bounds(segments, words)
+    rows = []
+    cursor = 0
+    for index, segment in enumerate(segments):
+        segment_text = segment.get("text", "")
+        offset = text.find(segment_text, cursor) if segment_text else -1
+        if offset < 0:
+            offset = cursor
+        cursor = offset + len(segment_text)
+        classification = segment.get("classification", {})
+        rows.append({
+            "conversation_id": conversation.id,
+            "segment_index": index,
+            "start": segment["start"],
+            "end": segment["end"],
+            "speaker": speakers[index] if index < len(speakers) else classification.get("speaker"),
+            "phase": classification.get("phase"),
+            "sentiment": classification.get("sentiment"),
+            "text_offset": offset,
+            "text_length": len(segment_text),
+            "speech_start": float(speech_starts[index]),
+            "speech_end": float(speech_ends[index]),
+            "questions": segment_text.count("?"),
+            "user_id": conversation.user_id,
+            "created_at": conversation.created_at
+        })
+    return rows
+
+def save_results(
+    db: Session,
+    conversation: Conversation,
+    transcript: Dict,
+    analysis: Dict,
+    words: Optional[bytes] = None,
+    embedding: Optional[ConversationEmbedding] = None
+) -> None:
+    """
+    Store a finished transcript and analysis together with everything
+    derived from them: daily stats, the full-text index, the segments
+    table, segment embeddings and the current stage versions. Runs in the caller's transaction.
+
+    Word timestamps in the transcript are moved to the packed words column;
+    pass `words` when they are already packed. Without either, the stored
+    words are kept.
+
+    `embedding` comes from embed_segments() or find_embeddings(), computed
+    before the transaction. Without it the stored vectors are kept and, when
+    a model is configured, the embeddings stage is left for re-analysis.
+    """
+    transcript_segments = transcript.get("segments", [])
+    transcript, analysis, packed = split_words(transcript, analysis)
+    if packed is not None:
+        segment_words = [segment.get("words") for segment in transcript_segments]
+    elif words is not None:
+        segment_words = unpack_words(words)
+    else:
+        # Before the transcript is replaced: older rows keep words inline
+        segment_words = conversation_words(conversation)
+    ConversationStats(db).record_analysis(conversation, conversation.analysis, analysis)
+    conversation.transcript = transcript
+    conversation.analysis = analysis
+    if packed is not None or words is not None:
+        conversation.packed_words = packed if packed is not None else words
+    conversation.status = "completed"
+    summary = analysis.get("summary", {})
+    conversation.duration = summary.get("duration")
+    conversation.segment_count = len(transcript.get("segments", []))
+    conversation.summary = summary
+    db.flush()
+
+    SearchService(db).index_conversation(conversation)
+    db.query(Segment).filter(Segment.conversation_id == conversation.id).delete(synchronize_session=False)
+    db.bulk_insert_mappings(Segment, segment_rows(conversation, transcript, analysis, segment_words))
+    stages = None
+    if embedding is not None:
+        store_embeddings(db, conversation, embedding)
+    elif embedding_required(transcript.get("segments", [])):
+        # Keep the stored embeddings version: current vectors stay current,
+        # missing ones are picked up by the re-analysis backfill
+        stages = [stage for stage in STAGE_VERSIONS if stage != "embeddings"]
+    record_stage_versions(db, conversation.id, stages)
+
+def save_batch(
+    db: Session,
+    conversations: List[Conversation],
+    save: Callable[[Conversation], None]
+) -> Dict[int, Exception]:
+    """
+    Run `save` for each conversation and commit them in one transaction, so
+    a batch takes the write lock and commits once. If any save fails, the
+    batch is rolled back and saved again one conversation per transaction;
+    the errors of those that still fail are returned by conversation id.
+    """
+    ids = [conversation.id for conversation in conversations]
+    try:
+        for conversation in conversations:
+            save(conversation)
+        db.commit()
+        return {}
+    except Exception:
+        db.rollback()
+
+    errors: Dict[int, Exception] = {}
+    for conversation_id, conversation in zip(ids, conversations):
+        try:
+            save(conversation)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            errors[conversation_id] = e
+    return errors
+
+def delete_conversation(db: Session, conversation: Conversation) -> None:
+    """
+    Delete a conversation with its derived rows and audio file
+    """
+    ConversationStats(db).record_analysis(conversation, conversation.analysis, None)
+    SearchService(db).remove_conversation(conversation.id)
+    db.query(Segment).filter(Segment.conversation_id == conversation.id).delete(synchronize_session=False)
+    db.query(Job).filter(Job.conversation_id == conversation.id).delete(synchronize_session=False)
+    db.query(StageVersion).filter(StageVersion.conversation_id == conversation.id).delete(synchronize_session=False)
+    db.query(ConversationEmbedding).filter(
+        ConversationEmbedding.conversation_id == conversation.id
+    ).delete(synchronize_session=False)
+    db.delete(conversation)
+    db.commit()
+
+    if conversation.file_path and os.path.exists(conversation.file_path):
+        os.remove(conversation.file_path)
@@ -0,0 +1,39 @@
+import logging
+from functools import lru_cache
+from typing import List, Optional
+import numpy as np
+
+from ..config import SEMANTIC_MODEL
+
+logger = logging.getLogger(__name__)
+
+class SentenceTransformerEmbedder:
+    """
+    A local sentence-transformers model run on CPU
+    """
+    def __init__(self, model_name: str):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name, device="cpu")
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = model_name
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype=np.float32)
+        return self.model.encode(
+            texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        ).astype(np.float32)
+
+@lru_cache(maxsize=1)
+def get_embedder() -> Optional[SentenceTransformerEmbedder]:
+    """
+    The configured embedder of this process, or None when SEMANTIC_MODEL is
+    not set or sentence-transformers is not installed
+    """
+    if not SEMANTIC_MODEL:
+        return None
+    try:
+        return SentenceTransformerEmbedder(SEMANTIC_MODEL)
+    except ImportError:
+        logger.error("SEMANTIC_MODEL is set but sentence-transformers is not installed; semantic search is disabled")
+        return None
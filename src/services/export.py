@@ -0,0 +1,176 @@
+import csv
+import io
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+from sqlalchemy.orm import Session
+
+from ..config import EXPORT_BATCH_SIZE
+from ..models.database import Conversation
+
+# One row per transcript segment
+EXPORT_COLUMNS = [
+    "conversation_id",
+    "user_id",
+    "created_at",
+    "conversation_duration",
+    "segment_index",
+    "start",
+    "end",
+    "speaker",
+    "phase",
+    "sentiment",
+    "text"
+]
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet"
+}
+
+def iter_conversation_batches(
+    db: Session,
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[List]:
+    """
+    Completed conversations in id order, `batch_size` at a time. Each batch
+    is its own keyset query returning plain tuples, so nothing accumulates
+    in the session however many conversations are exported.
+    """
+    last_id = 0
+    while True:
+        query = db.query(
+            Conversation.id,
+            Conversation.user_id,
+            Conversation.created_at,
+            Conversation.duration,
+            Conversation.transcript,
+            Conversation.analysis
+        ).filter(Conversation.status == "completed", Conversation.id > last_id)
+        if user_id is not None:
+            query = query.filter(Conversation.user_id == user_id)
+        if start_date:
+            query = query.filter(Conversation.created_at >= start_date)
+        if end_date:
+            query = query.filter(Conversation.created_at <= end_date)
+        batch = query.order_by(Conversation.id).limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1].id
+
+def segment_columns(batch: List) -> Dict[str, list]:
+    """
+    Flatten the transcripts and analyses of a batch into segment-level
+    columns
+    """
+    columns: Dict[str, list] = {name: [] for name in EXPORT_COLUMNS}
+    for conversation in batch:
+        transcript = conversation.transcript or {}
+        analysis = conversation.analysis or {}
+        segments = transcript.get("segments", [])
+        speakers = transcript.get("speakers") or []
+        classified = analysis.get("segments", [])
+        for index, segment in enumerate(segments):
+            classification = classified[index].get("classification", {}) if index < len(classified) else {}
+            columns["conversation_id"].append(conversation.id)
+            columns["user_id"].append(conversation.user_id)
+            columns["created_at"].append(conversation.created_at)
+            columns["conversation_duration"].append(conversation.duration)
+            columns["segment_index"].append(index)
+            columns["start"].append(segment.get("start"))
+            columns["end"].append(segment.get("end"))
+            columns["speaker"].append(speakers[index] if index < len(speakers) else classification.get("speaker"))
+            columns["phase"].append(classification.get("phase"))
+            columns["sentiment"].append(classification.get("sentiment"))
+            columns["text"].append((segment.get("text") or "").strip())
+    return columns
+
+def _csv_chunks(batches: Iterator[List]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        columns = segment_columns(batch)
+        columns["created_at"] = [value.isoformat() if value else None for value in columns["created_at"]]
+        writer.writerows(zip(*(columns[name] for name in EXPORT_COLUMNS)))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file that hands out what was written since the last drain
+    """
+    def __init__(self):
+        self.chunks: List[bytes] = []
+        self.position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self.position
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+def _parquet_chunks(batches: Iterator[List]) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("conversation_id", pa.int64()),
+        ("user_id", pa.int64()),
+        ("created_at", pa.timestamp("us")),
+        ("conversation_duration", pa.float64()),
+        ("segment_index", pa.int32()),
+        ("start", pa.float64()),
+        ("end", pa.float64()),
+        ("speaker", pa.string()),
+        ("phase", pa.string()),
+        ("sentiment", pa.string()),
+        ("text", pa.string())
+    ])
+    sink = _ChunkSink()
+    # One row group per batch, streamed as soon as it is written
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_table(pa.Table.from_pydict(segment_columns(batch), schema=schema))
+            yield sink.drain()
+    yield sink.drain()
+
+def export_segments(
+    db: Session,
+    export_format: str = "csv",
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    batch_size: int = EXPORT_BATCH_SIZE
+) -> Iterator[bytes]:
+    """
+    Stream every segment of the matching conversations as CSV or Parquet.
+    Memory use is bounded by one batch of conversations.
+    """
+    if export_format not in MEDIA_TYPES:
+        raise ValueError(f"Unknown export format: {export_format}")
+    if export_format == "parquet":
+        # Fail before the first byte is sent rather than mid-stream
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+    batches = iter_conversation_batches(db, user_id, start_date, end_date, batch_size)
+    if export_format == "parquet":
+        return _parquet_chunks(batches)
+    return _csv_chunks(batches)
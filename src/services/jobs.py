@@ -0,0 +1,201 @@
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+
+from ..config import JOB_MAX_ATTEMPTS, JOB_RETRY_BASE_SECONDS, JOB_LEASE_SECONDS
+from ..models.database import Job
+
+# Higher priority jobs are claimed first; bulk imports may also be routed to
+# a cheaper model (see transcription.select_model)
+PRIORITY_BULK = -1
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 1
+
+class JobQueue:
+    """
+    Persistent job queue stored in the application database.
+
+    Jobs are claimed with a conditional UPDATE so that several worker
+    processes can poll the same table without handing out a job twice.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_base_seconds: float = JOB_RETRY_BASE_SECONDS,
+        lease_seconds: float = JOB_LEASE_SECONDS
+    ):
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.lease_seconds = lease_seconds
+
+    def enqueue(
+        self,
+        db: Session,
+        conversation_id: int,
+        kind: str = "transcribe",
+        profile: bool = False,
+        priority: int = PRIORITY_NORMAL
+    ) -> Job:
+        """
+        Add a job for the conversation; committed together with the caller's transaction
+        """
+        job = Job(
+            conversation_id=conversation_id,
+            kind=kind,
+            profile=profile,
+            priority=priority,
+            status="pending",
+            max_attempts=self.max_attempts,
+            run_after=datetime.utcnow()
+        )
+        db.add(job)
+        return job
+
+    def claim(self, db: Session, worker_id: str) -> Optional[Job]:
+        """
+        Atomically take the oldest runnable job, or return None if there is none
+        """
+        while True:
+            now = datetime.utcnow()
+            candidate = db.query(Job.id).filter(
+                Job.status == "pending",
+                Job.run_after <= now
+            ).order_by(Job.priority.desc(), Job.id).first()
+            if candidate is None:
+                return None
+
+            claimed = db.query(Job).filter(
+                Job.id == candidate.id,
+                Job.status == "pending"
+            ).update({
+                Job.status: "running",
+                Job.locked_by: worker_id,
+                Job.locked_at: now,
+                Job.attempts: Job.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+
+            # If another worker won the race for this job, try the next one
+            if claimed:
+                return db.query(Job).get(candidate.id)
+
+    def claim_batch(self, db: Session, worker_id: str, limit: int, kind: Optional[str] = None) -> List[Job]:
+        """
+        Atomically take up to `limit` of the oldest runnable jobs. Jobs another
+        worker claimed concurrently are left out of the result.
+        """
+        now = datetime.utcnow()
+        candidates = db.query(Job.id).filter(
+            Job.status == "pending",
+            Job.run_after <= now
+        )
+        if kind is not None:
+            candidates = candidates.filter(Job.kind == kind)
+        ids = [row.id for row in candidates.order_by(Job.priority.desc(), Job.id).limit(limit)]
+        if not ids:
+            return []
+
+        db.query(Job).filter(
+            Job.id.in_(ids),
+            Job.status == "pending"
+        ).update({
+            Job.status: "running",
+            Job.locked_by: worker_id,
+            Job.locked_at: now,
+            Job.attempts: Job.attempts + 1
+        }, synchronize_session=False)
+        db.commit()
+
+        return db.query(Job).filter(
+            Job.id.in_(ids),
+            Job.status == "running",
+            Job.locked_by == worker_id,
+            Job.locked_at == now
+        ).order_by(Job.priority.desc(), Job.id).all()
+
+    def heartbeat(self, db: Session, job_id: int, worker_id: str) -> None:
+        """
+        Renew the lease on a running job
+        """
+        db.query(Job).filter(
+            Job.id == job_id,
+            Job.locked_by == worker_id,
+            Job.status == "running"
+        ).update({Job.locked_at: datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+
+    def complete(self, db: Session, job_id: int) -> None:
+        """
+        Mark a job as successfully finished
+        """
+        db.query(Job).filter(Job.id == job_id).update({
+            Job.status: "completed",
+            Job.locked_by: None,
+            Job.error: None
+        }, synchronize_session=False)
+        db.commit()
+
+    def fail(self, db: Session, job_id: int, error: str) -> bool:
+        """
+        Record a failed attempt. The job is retried with exponential backoff
+        until it runs out of attempts. Returns True if it will be retried.
+        """
+        job = db.query(Job).get(job_id)
+        if job is None:
+            return False
+
+        job.error = error
+        job.locked_by = None
+        if job.attempts >= job.max_attempts:
+            job.status = "failed"
+        else:
+            delay = self.retry_base_seconds * (2 ** (job.attempts - 1))
+            job.status = "pending"
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        db.commit()
+        return job.status == "pending"
+
+    def requeue_stale(self, db: Session) -> Tuple[int, List[Job]]:
+        """
+        Return jobs whose worker stopped renewing its lease to the queue.
+        Returns the number requeued and the jobs failed for good because
+        they ran out of attempts.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        stale = db.query(Job).filter(
+            Job.status == "running",
+            Job.locked_at < cutoff
+        )
+        # A job that keeps killing its worker must not be retried forever;
+        # one at a time so a lease renewed meanwhile is not failed
+        failed = []
+        for job in stale.filter(Job.attempts >= Job.max_attempts).all():
+            if stale.filter(Job.id == job.id).update({
+                Job.status: "failed",
+                Job.locked_by: None,
+                Job.error: "Worker lease expired"
+            }, synchronize_session=False):
+                failed.append(job)
+        count = stale.update({
+            Job.status: "pending",
+            Job.locked_by: None,
+            Job.run_after: datetime.utcnow()
+        }, synchronize_session=False)
+        db.commit()
+        return count, failed
+
+    def pending_count(self, db: Session) -> int:
+        """
+        Number of jobs waiting to be picked up
+        """
+        return db.query(Job).filter(Job.status == "pending").count()
+
+    def running_count(self, db: Session) -> int:
+        """
+        Number of jobs currently claimed by a worker
+        """
+        return db.query(Job).filter(Job.status == "running").count()
+
+# Global job queue instance
+job_queue = JobQueue()
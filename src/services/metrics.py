@@ -0,0 +1,212 @@
+import bisect
+import functools
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900, float("inf"))
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """
+        Sample lines of every series; called with the lock held
+        """
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Unlabelled series are reported as 0 before their first update
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Unlabelled series are reported as 0 before their first update
+        self._values: Dict[Tuple[str, ...], float] = {} if self.labelnames else {(): 0}
+
+    def set(self, value: float, **labels) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in self._values.items()]
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * len(self.buckets))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, counts in self._counts.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                bucket_labels = _format_labels(self.labelnames, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {self._sums[key]}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    """
+    Minimal in-process metrics registry rendered in the Prometheus text format
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = MetricsRegistry()
+
+STAGE_SECONDS = registry.register(Histogram(
+    "pipeline_stage_seconds", "Time spent in each pipeline stage", ["stage"]
+))
+MODEL_LOAD_SECONDS = registry.register(Histogram(
+    "model_load_seconds", "Time to load a Whisper model", ["model"]
+))
+AUDIO_SECONDS_PROCESSED = registry.register(Counter(
+    "audio_seconds_processed_total", "Seconds of audio transcribed"
+))
+TRANSCRIPTION_SECONDS = registry.register(Counter(
+    "transcription_seconds_total", "Wall-clock seconds spent transcribing"
+))
+AUDIO_SECONDS_PER_SECOND = registry.register(Gauge(
+    "audio_seconds_per_second", "Audio seconds transcribed per second for the last job"
+))
+JOB_QUEUE_DEPTH = registry.register(Gauge(
+    "job_queue_depth", "Jobs waiting to be claimed"
+))
+JOBS_IN_FLIGHT = registry.register(Gauge(
+    "jobs_in_flight", "Jobs currently claimed by a worker"
+))
+JOBS_PROCESSED = registry.register(Counter(
+    "jobs_processed_total", "Jobs finished by this process", ["result"]
+))
+DB_QUERY_SECONDS = registry.register(Histogram(
+    "db_query_seconds", "Duration of search and stats queries", ["operation"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5, float("inf"))
+))
+
+def time_stage(stage: str):
+    """
+    Context manager timing one pipeline stage
+    """
+    return STAGE_SECONDS.time(stage=stage)
+
+def record_transcription(audio_seconds: float, elapsed: float) -> None:
+    AUDIO_SECONDS_PROCESSED.inc(audio_seconds)
+    TRANSCRIPTION_SECONDS.inc(elapsed)
+    if elapsed > 0:
+        AUDIO_SECONDS_PER_SECOND.set(audio_seconds / elapsed)
+
+def timed_query(operation: str):
+    """
+    Decorator recording the duration of a database query method
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with DB_QUERY_SECONDS.time(operation=operation):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def start_metrics_server(port: int) -> ThreadingHTTPServer:
+    """
+    Serve this process's metrics on a background thread. Used by worker
+    processes, which have no web server of their own.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
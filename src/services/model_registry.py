@@ -0,0 +1,197 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Optional
+
+import torch
+import whisper_timestamped as whisper
+
+from ..config import MODEL_MEMORY_BUDGET_MB, USE_GPU, WHISPER_QUANTIZE
+from .metrics import MODEL_LOAD_SECONDS
+
+# Approximate resident size (fp32 weights) used to make room before a model
+# has been loaded and its real size is known
+ESTIMATED_MODEL_SIZE_MB = {
+    "tiny": 75,
+    "base": 145,
+    "small": 485,
+    "medium": 1530,
+    "large": 3100,
+}
+
+
+def _estimate_size_mb(name: str) -> float:
+    size = name.split(".")[0].split("-")[0]
+    return ESTIMATED_MODEL_SIZE_MB.get(size, ESTIMATED_MODEL_SIZE_MB["large"])
+
+
+def _model_size_mb(model) -> float:
+    # Quantized layers keep their weights in packed (tensor, bias) tuples
+    # rather than parameters, so count the state dict instead
+    total = 0
+    for value in model.state_dict().values():
+        for tensor in value if isinstance(value, tuple) else (value,):
+            if isinstance(tensor, torch.Tensor):
+                total += tensor.numel() * tensor.element_size()
+    return total / (1024 * 1024)
+
+
+def quantize_linear_layers(model):
+    """
+    Convert the model's linear layers to int8 dynamic quantization in place.
+    Weights are stored as int8 and activations are quantized on the fly,
+    which shrinks the model roughly 4x and speeds up CPU inference.
+    """
+    for module in model.modules():
+        # Whisper's Linear subclass only adds dtype casting, which fp32 CPU
+        # inference doesn't need, and quantize_dynamic only swaps exact nn.Linear
+        if isinstance(module, torch.nn.Linear) and type(module) is not torch.nn.Linear:
+            module.__class__ = torch.nn.Linear
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+
+
+def configure_threads(intra_op: int, inter_op: int) -> None:
+    """
+    Size torch's thread pools for this process. Must run before the first
+    model call; the inter-op pool can't be resized once it has started.
+    """
+    torch.set_num_threads(max(1, intra_op))
+    try:
+        torch.set_num_interop_threads(max(1, inter_op))
+    except RuntimeError:
+        pass
+
+
+class _ModelEntry:
+    def __init__(self, name: str):
+        self.name = name
+        self.model = None
+        self.size_mb = _estimate_size_mb(name)
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.load_lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of Whisper models.
+
+    Each model is loaded lazily, at most once per process, and shared by all
+    concurrent jobs. When the memory budget is exceeded the least recently
+    used idle models are evicted; models that are in use are never evicted.
+    With `quantize`, models loaded on the CPU get int8 linear layers.
+    """
+
+    def __init__(
+        self,
+        memory_budget_mb: int = MODEL_MEMORY_BUDGET_MB,
+        device: Optional[str] = None,
+        quantize: bool = WHISPER_QUANTIZE
+    ):
+        self.memory_budget_mb = memory_budget_mb
+        self.device = device or ("cuda" if USE_GPU and torch.cuda.is_available() else "cpu")
+        self.quantize = quantize and self.device == "cpu"
+        self._entries: Dict[str, _ModelEntry] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def acquire(self, name: str):
+        """
+        Borrow a loaded model for the duration of the block
+        """
+        entry = self._checkout(name)
+        try:
+            yield self._ensure_loaded(entry)
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def preload(self, names: Iterable[str]) -> None:
+        """
+        Load the given models ahead of the first request
+        """
+        for name in names:
+            with self.acquire(name):
+                pass
+
+    def evict_idle(self, max_idle_seconds: float = 0) -> None:
+        """
+        Drop loaded models that have not been used for the given time
+        """
+        now = time.monotonic()
+        with self._lock:
+            for entry in list(self._entries.values()):
+                if entry.model is not None and entry.in_use == 0 and now - entry.last_used >= max_idle_seconds:
+                    self._unload(entry)
+
+    def stats(self) -> Dict:
+        """
+        Describe the currently registered models
+        """
+        with self._lock:
+            return {
+                "device": self.device,
+                "quantized": self.quantize,
+                "memory_budget_mb": self.memory_budget_mb,
+                "resident_mb": self._resident_mb(),
+                "models": {
+                    name: {
+                        "loaded": entry.model is not None,
+                        "size_mb": round(entry.size_mb, 1),
+                        "in_use": entry.in_use,
+                    }
+                    for name, entry in self._entries.items()
+                },
+            }
+
+    def _checkout(self, name: str) -> _ModelEntry:
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                entry = self._entries[name] = _ModelEntry(name)
+            entry.in_use += 1
+            entry.last_used = time.monotonic()
+            return entry
+
+    def _ensure_loaded(self, entry: _ModelEntry):
+        if entry.model is not None:
+            return entry.model
+
+        # Only one thread loads a given model, the others wait for it
+        with entry.load_lock:
+            if entry.model is None:
+                with self._lock:
+                    self._make_room(entry.size_mb, keep=entry)
+                with MODEL_LOAD_SECONDS.time(model=entry.name):
+                    model = whisper.load_model(entry.name, device=self.device)
+                    if self.quantize:
+                        model = quantize_linear_layers(model)
+                with self._lock:
+                    entry.model = model
+                    entry.size_mb = _model_size_mb(model)
+            return entry.model
+
+    def _make_room(self, needed_mb: float, keep: _ModelEntry) -> None:
+        if not self.memory_budget_mb:
+            return
+        idle = sorted(
+            (e for e in self._entries.values() if e is not keep and e.model is not None and e.in_use == 0),
+            key=lambda e: e.last_used,
+        )
+        for entry in idle:
+            if self._resident_mb() + needed_mb <= self.memory_budget_mb:
+                break
+            self._unload(entry)
+
+    def _unload(self, entry: _ModelEntry) -> None:
+        entry.model = None
+        if self.device == "cuda":
+            torch.cuda.empty_cache()
+
+    def _resident_mb(self) -> float:
+        return sum(e.size_mb for e in self._entries.values() if e.model is not None)
+
+
+# Global model registry instance
+model_registry = ModelRegistry()
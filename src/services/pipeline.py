@@ -0,0 +1,186 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.database import Conversation
+from .audio_loader import SAMPLE_RATE, load_audio
+from .transcription import transcribe_audio, select_model
+from .classification import dialogue_classifier
+from .speaker_identification import speaker_identifier
+from .voiceprints import voiceprint_index
+from .turn_taking import analyze_turn_taking
+from .transcript_cache import transcript_cache, model_variant
+from .jobs import PRIORITY_NORMAL
+from .conversation_store import save_results, save_batch
+from .semantic_search import embed_segments, find_embeddings
+from .audio_storage import archive_audio
+from .progress import progress_tracker
+from .metrics import time_stage, record_transcription
+
+# Pipeline steps as reported to progress_tracker (step 0 is the upload)
+STEP_DECODING = 1
+STEP_TRANSCRIBING = 2
+STEP_ANALYZING = 3
+TOTAL_STEPS = 4
+
+logger = logging.getLogger(__name__)
+
+async def transcribe_and_analyze(
+    conversation_id: int,
+    db: Session
+):
+    """
+    Run the full transcription and analysis pipeline for one conversation
+    """
+    errors = await transcribe_and_analyze_batch([conversation_id], db)
+    if conversation_id in errors:
+        raise errors[conversation_id]
+
+async def transcribe_and_analyze_batch(
+    conversation_ids: List[int],
+    db: Session,
+    priorities: Optional[Dict[int, int]] = None
+) -> Dict[int, Exception]:
+    """
+    Run the pipeline for several conversations.
+
+    Each recording is decoded and transcribed on its own, with the model
+    chosen for its length and job priority; speaker features and dialogue
+    classification then run as one batched call over all of them. A failure
+    only affects its own conversation: the returned dict maps the ids that
+    failed to their error.
+    """
+    priorities = priorities or {}
+    errors: Dict[int, Exception] = {}
+    transcribed: List[Tuple[Conversation, np.ndarray, Dict]] = []
+    for conversation_id in conversation_ids:
+        try:
+            result = await _transcribe(conversation_id, db, priorities.get(conversation_id, PRIORITY_NORMAL))
+        except Exception as e:
+            db.rollback()
+            errors[conversation_id] = e
+            continue
+        if result is not None:
+            transcribed.append(result)
+
+    if not transcribed:
+        return errors
+
+    try:
+        # Identify speakers
+        with time_stage("identify_speakers"):
+            voiceprint_index.refresh(db)
+            speakers = speaker_identifier.identify_speakers_batch([
+                (transcript["segments"], audio, conversation.audio_hash)
+                for conversation, audio, transcript in transcribed
+            ])
+        for (_, _, transcript), call_speakers in zip(transcribed, speakers):
+            transcript["speakers"] = call_speakers
+
+        # Analyze turn-taking patterns
+        with time_stage("turn_taking"):
+            turn_analyses = [
+                analyze_turn_taking(transcript["speakers"], transcript["segments"])
+                for _, _, transcript in transcribed
+            ]
+
+        # Classify dialogue
+        with time_stage("classify"):
+            analyses = dialogue_classifier.classify_batch([transcript for _, _, transcript in transcribed])
+
+        # Encode segments for semantic search before the write transaction
+        with time_stage("embed"):
+            embeddings = [embed_segments(transcript["segments"]) for _, _, transcript in transcribed]
+    except Exception as e:
+        for conversation, _, _ in transcribed:
+            errors[conversation.id] = e
+        return errors
+
+    results = {}
+    for (conversation, _, transcript), analysis, turn_analysis, embedding in zip(
+        transcribed, analyses, turn_analyses, embeddings
+    ):
+        analysis["turn_taking"] = turn_analysis
+        results[conversation.id] = (transcript, analysis, embedding)
+
+    def save(conversation: Conversation) -> None:
+        transcript, analysis, embedding = results[conversation.id]
+        save_results(db, conversation, transcript, analysis, embedding=embedding)
+        # Results of a substitute model must not be served for the default one
+        if conversation.audio_hash and model_variant(transcript["model"]) == transcript_cache.model_name:
+            transcript_cache.put(db, conversation.audio_hash, transcript, analysis)
+
+    # Update all conversations in one transaction
+    with time_stage("save"):
+        save_errors = save_batch(db, [conversation for conversation, _, _ in transcribed], save)
+    errors.update(save_errors)
+    for conversation_id, (conversation, _, _) in zip(results, transcribed):
+        if conversation_id in save_errors:
+            continue
+        progress_tracker.update_progress(str(conversation_id), TOTAL_STEPS, status="completed")
+        _archive(db, conversation)
+    return errors
+
+def _archive(db: Session, conversation: Conversation) -> None:
+    """
+    Move a finished conversation's recording to compact storage. The
+    results are already saved, so a failure here only keeps the upload.
+    """
+    try:
+        with time_stage("archive"):
+            archive_audio(db, conversation)
+    except Exception:
+        logger.exception("Failed to archive audio of conversation %s", conversation.id)
+
+async def _transcribe(
+    conversation_id: int,
+    db: Session,
+    priority: int = PRIORITY_NORMAL
+) -> Optional[Tuple[Conversation, np.ndarray, Dict]]:
+    """
+    Decode and transcribe one conversation. Returns None when the results
+    were already in the transcript cache and have been saved.
+    """
+    # Get conversation from database
+    conversation = db.query(Conversation).filter(Conversation.id == conversation_id).first()
+    if not conversation:
+        raise ValueError(f"Conversation {conversation_id} not found")
+
+    task_id = str(conversation_id)
+
+    # Another upload of the same audio may have finished in the meantime
+    if conversation.audio_hash:
+        with time_stage("cache_lookup"):
+            cached = transcript_cache.get(db, conversation.audio_hash)
+        if cached is not None:
+            segments = cached.transcript.get("segments", [])
+            # Reuse the vectors of the earlier upload rather than encoding again
+            with time_stage("embed"):
+                embedding = find_embeddings(db, conversation.audio_hash, segments) or embed_segments(segments)
+            with time_stage("save"):
+                save_results(db, conversation, cached.transcript, cached.analysis, cached.words, embedding)
+                db.commit()
+            progress_tracker.update_progress(task_id, TOTAL_STEPS, status="completed")
+            _archive(db, conversation)
+            return None
+
+    # Decode once; transcription and speaker analysis share the samples
+    progress_tracker.update_progress(task_id, STEP_DECODING)
+    with time_stage("decode"):
+        audio = load_audio(conversation.file_path, conversation.audio_hash)
+
+    # Transcribe audio, reporting the share of audio done so far
+    progress_tracker.update_progress(task_id, STEP_TRANSCRIBING)
+    duration = len(audio) / SAMPLE_RATE
+    started = time.perf_counter()
+    with time_stage("transcribe"):
+        transcript = await transcribe_audio(
+            audio,
+            lambda fraction: progress_tracker.update_progress(task_id, STEP_TRANSCRIBING, fraction=fraction),
+            select_model(duration, priority)
+        )
+    record_transcription(duration, time.perf_counter() - started)
+    progress_tracker.update_progress(task_id, STEP_ANALYZING)
+    return conversation, audio, transcript
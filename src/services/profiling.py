@@ -0,0 +1,68 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional
+
+from ..config import PROFILE_DIR, PROFILE_INTERVAL_SECONDS
+
+class SamplingProfiler:
+    """
+    Statistical profiler for one thread.
+
+    A background thread snapshots the target thread's stack at a fixed
+    interval and counts identical stacks. The result is written in the
+    collapsed ("folded") format understood by flamegraph.pl and speedscope.
+    Work done in other processes (e.g. chunked transcription) is not sampled.
+    """
+
+    def __init__(self, interval: float = PROFILE_INTERVAL_SECONDS, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            self.samples[";".join(reversed(stack))] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def profile_conversation(conversation_id: int):
+    """
+    Sample the calling thread while the block runs and write the profile to
+    PROFILE_DIR/conversation-<id>-<timestamp>.folded
+    """
+    profiler = SamplingProfiler()
+    profiler.start()
+    try:
+        yield profiler
+    finally:
+        profiler.stop()
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profiler.dump(os.path.join(PROFILE_DIR, f"conversation-{conversation_id}-{int(time.time())}.folded"))
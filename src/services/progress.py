@@ -1,83 +1,194 @@
-from typing import Dict
-from datetime import datetime
+from typing import Dict, Optional, Set
+from datetime import datetime, timedelta
+from collections import defaultdict
 import asyncio
-from sqlalchemy.orm import Session
-import json
+
+from ..models.database import SessionLocal, ProcessingTask
+
+STEP_DETAILS = {
+    0: "Uploading file",
+    1: "Decoding audio",
+    2: "Transcribing",
+    3: "Analyzing"
+}
+
+# Progress within a step is only written when it moved at least this much
+MIN_FRACTION_DELTA = 0.01
 
 class ProcessingProgress:
-    def __init__(self):
-        self.tasks = {}
-    
-    def create_task(self, task_id: str, total_steps: int = 4) -> None:
+    """
+    Pipeline progress stored in the database so every API and worker
+    process sees the same state
+    """
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def create_task(self, task_id: str, total_steps: int = 4, conversation_id: Optional[int] = None) -> None:
         """
         Initialize a new processing task
         """
-        self.tasks[task_id] = {
-            "started_at": datetime.utcnow(),
-            "current_step": 0,
-            "total_steps": total_steps,
-            "status": "processing",
-            "step_details": {
-                0: "Uploading file",
-                1: "Converting audio",
-                2: "Transcribing",
-                3: "Analyzing"
-            },
-            "error": None
-        }
-    
-    def update_progress(self, task_id: str, step: int, status: str = "processing", error: str = None) -> None:
+        self.create_tasks({task_id: conversation_id}, total_steps)
+
+    def create_tasks(self, tasks: Dict[str, Optional[int]], total_steps: int = 4) -> None:
         """
-        Update the progress of a task
+        Initialize several tasks, given as task id -> conversation id, in one transaction
         """
-        if task_id in self.tasks:
-            self.tasks[task_id].update({
-                "current_step": step,
-                "status": status,
-                "error": error
-            })
-    
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            for task_id, conversation_id in tasks.items():
+                db.merge(ProcessingTask(
+                    task_id=task_id,
+                    conversation_id=conversation_id,
+                    current_step=0,
+                    total_steps=total_steps,
+                    step_fraction=0,
+                    status="processing",
+                    error=None,
+                    started_at=now,
+                    updated_at=now
+                ))
+            db.commit()
+        finally:
+            db.close()
+
+    def update_progress(
+        self,
+        task_id: str,
+        step: int,
+        status: str = "processing",
+        error: str = None,
+        fraction: float = 0.0
+    ) -> None:
+        """
+        Update the progress of a task. `fraction` is how much of the current
+        step is done; small fraction changes within a step are not written.
+        """
+        db = self.session_factory()
+        try:
+            task = db.query(ProcessingTask).get(task_id)
+            if task is None:
+                return
+            unchanged = task.current_step == step and task.status == status and task.error == error
+            if unchanged and abs((task.step_fraction or 0) - fraction) < MIN_FRACTION_DELTA:
+                return
+            task.current_step = step
+            task.step_fraction = fraction
+            task.status = status
+            task.error = error
+            task.updated_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
     def get_progress(self, task_id: str) -> Dict:
         """
         Get the current progress of a task
         """
-        if task_id not in self.tasks:
-            return {"error": "Task not found"}
-        
-        task = self.tasks[task_id]
-        progress = (task["current_step"] / task["total_steps"]) * 100
-        
-        return {
-            "task_id": task_id,
-            "progress": progress,
-            "current_step": task["current_step"],
-            "step_details": task["step_details"].get(task["current_step"]),
-            "status": task["status"],
-            "error": task["error"],
-            "started_at": task["started_at"].isoformat()
-        }
-    
+        db = self.session_factory()
+        try:
+            task = db.query(ProcessingTask).get(task_id)
+            if task is None:
+                return {"error": "Task not found"}
+            return self._to_dict(task)
+        finally:
+            db.close()
+
+    def changed_since(self, since: datetime) -> Dict[str, Dict]:
+        """
+        Progress of all tasks updated after the given time
+        """
+        db = self.session_factory()
+        try:
+            tasks = db.query(ProcessingTask).filter(ProcessingTask.updated_at > since).all()
+            return {task.task_id: self._to_dict(task) for task in tasks}
+        finally:
+            db.close()
+
     def clean_old_tasks(self, max_age_hours: int = 24) -> None:
         """
         Remove completed tasks older than specified hours
         """
-        current_time = datetime.utcnow()
-        to_remove = []
-        
-        for task_id, task in self.tasks.items():
-            if task["status"] in ["completed", "error"]:
-                age = (current_time - task["started_at"]).total_seconds() / 3600
-                if age > max_age_hours:
-                    to_remove.append(task_id)
-        
-        for task_id in to_remove:
-            del self.tasks[task_id]
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(hours=max_age_hours)
+            db.query(ProcessingTask).filter(
+                ProcessingTask.status.in_(["completed", "error"]),
+                ProcessingTask.started_at < cutoff
+            ).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _to_dict(self, task: ProcessingTask) -> Dict:
+        progress = ((task.current_step + (task.step_fraction or 0)) / task.total_steps) * 100
+        return {
+            "task_id": task.task_id,
+            "conversation_id": task.conversation_id,
+            "progress": min(progress, 100.0),
+            "current_step": task.current_step,
+            "step_details": STEP_DETAILS.get(task.current_step),
+            "status": task.status,
+            "error": task.error,
+            "started_at": task.started_at.isoformat(),
+            "updated_at": task.updated_at.isoformat()
+        }
+
+class ProgressBroadcaster:
+    """
+    Pushes progress changes to subscribers in this process.
+
+    A single poll loop per process reads only the tasks that changed since
+    the previous poll and fans them out, so the database load doesn't grow
+    with the number of connected dashboards.
+    """
+
+    def __init__(self, tracker: ProcessingProgress, interval: float = 0.5):
+        self.tracker = tracker
+        self.interval = interval
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self._poller: Optional[asyncio.Task] = None
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        self.subscribers[task_id].add(queue)
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.get_running_loop().create_task(self._poll())
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue) -> None:
+        self.subscribers[task_id].discard(queue)
+        if not self.subscribers[task_id]:
+            del self.subscribers[task_id]
+
+    async def _poll(self) -> None:
+        loop = asyncio.get_running_loop()
+        last_poll = datetime.utcnow()
+        last_sent: Dict[str, str] = {}
+        while self.subscribers:
+            await asyncio.sleep(self.interval)
+            poll_started = datetime.utcnow()
+            # Look back one extra interval so rows committed just after the
+            # previous poll aren't missed; duplicates are filtered below
+            since = last_poll - timedelta(seconds=self.interval)
+            changes = await loop.run_in_executor(None, self.tracker.changed_since, since)
+            last_poll = poll_started
+            for task_id, progress in changes.items():
+                if last_sent.get(task_id) == progress["updated_at"]:
+                    continue
+                last_sent[task_id] = progress["updated_at"]
+                for queue in self.subscribers.get(task_id, ()):
+                    queue.put_nowait(progress)
+            last_sent = {task_id: value for task_id, value in last_sent.items() if task_id in self.subscribers}
 
 # Global progress tracker instance
 progress_tracker = ProcessingProgress()
+progress_broadcaster = ProgressBroadcaster(progress_tracker)
 
 # Background task to clean old tasks periodically
 async def clean_old_tasks_periodically():
+    loop = asyncio.get_running_loop()
     while True:
-        progress_tracker.clean_old_tasks()
-        await asyncio.sleep(3600)  # Clean every hour
\ No newline at end of file
+        await loop.run_in_executor(None, progress_tracker.clean_old_tasks)
+        await asyncio.sleep(3600)  # Clean every hour
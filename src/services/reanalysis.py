@@ -0,0 +1,156 @@
+from typing import Dict, List
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..models.database import Conversation, Job
+from .audio_loader import load_audio
+from .classification import dialogue_classifier
+from .speaker_identification import speaker_identifier
+from .voiceprints import voiceprint_index
+from .turn_taking import analyze_turn_taking
+from .word_store import conversation_words
+from .conversation_store import save_results, save_batch
+from .semantic_search import embed_segments
+from .stages import load_stage_versions, stale_stages
+from .jobs import job_queue, PRIORITY_BULK
+from .metrics import time_stage
+
+REANALYZE_JOB = "reanalyze"
+
+async def reanalyze_batch(conversation_ids: List[int], db: Session) -> Dict[int, Exception]:
+    """
+    Bring the analysis of several conversations up to the current stage
+    versions. Only stale stages are recomputed, from the stored outputs of
+    the stages before them; Whisper never runs again. The audio is decoded
+    only when speaker labels have to be recomputed. Returns errors by
+    conversation id, like pipeline.transcribe_and_analyze_batch.
+    """
+    errors: Dict[int, Exception] = {}
+    conversations = {
+        conversation.id: conversation
+        for conversation in db.query(Conversation).filter(Conversation.id.in_(conversation_ids))
+    }
+    versions = load_stage_versions(db, conversations)
+
+    work = []
+    for conversation_id in conversation_ids:
+        conversation = conversations.get(conversation_id)
+        if conversation is None:
+            errors[conversation_id] = ValueError(f"Conversation {conversation_id} not found")
+            continue
+        stale = stale_stages(versions[conversation_id])
+        if not stale:
+            continue
+        if "transcript" in stale or not conversation.transcript:
+            errors[conversation_id] = ValueError(
+                f"Conversation {conversation_id} has no current transcript and must be transcribed again"
+            )
+            continue
+        work.append((conversation, dict(conversation.transcript), dict(conversation.analysis or {}), stale))
+
+    # Speaker labels need the audio; all other stages work from stored outputs
+    needs_speakers = []
+    for item in work:
+        conversation, transcript, _, stale = item
+        if "speakers" not in stale:
+            continue
+        try:
+            with time_stage("decode"):
+                audio = load_audio(conversation.file_path, conversation.audio_hash)
+        except Exception as e:
+            errors[conversation.id] = e
+            continue
+        needs_speakers.append((item, audio))
+    work = [item for item in work if item[0].id not in errors]
+
+    try:
+        with time_stage("identify_speakers"):
+            voiceprint_index.refresh(db)
+            speakers = speaker_identifier.identify_speakers_batch([
+                (transcript["segments"], audio, conversation.audio_hash)
+                for (conversation, transcript, _, _), audio in needs_speakers
+            ])
+        for ((_, transcript, _, _), _), call_speakers in zip(needs_speakers, speakers):
+            transcript["speakers"] = call_speakers
+
+        with time_stage("turn_taking"):
+            for conversation, transcript, analysis, stale in work:
+                if "turn_taking" in stale:
+                    analysis["turn_taking"] = analyze_turn_taking(
+                        transcript["speakers"], transcript["segments"], conversation_words(conversation)
+                    )
+
+        to_classify = [item for item in work if "classification" in item[3]]
+        with time_stage("classify"):
+            classified = dialogue_classifier.classify_batch([transcript for _, transcript, _, _ in to_classify])
+        for (_, _, analysis, _), result in zip(to_classify, classified):
+            analysis.update(result)
+
+        # Encoded before the write transaction; current vectors are kept
+        with time_stage("embed"):
+            embeddings = {
+                conversation.id: embed_segments(transcript["segments"])
+                for conversation, transcript, _, stale in work if "embeddings" in stale
+            }
+    except Exception as e:
+        for conversation, _, _, _ in work:
+            errors[conversation.id] = e
+        return errors
+
+    results = {conversation.id: (transcript, analysis) for conversation, transcript, analysis, _ in work}
+
+    def save(conversation: Conversation) -> None:
+        transcript, analysis = results[conversation.id]
+        save_results(db, conversation, transcript, analysis, embedding=embeddings.get(conversation.id))
+
+    with time_stage("save"):
+        errors.update(save_batch(db, [conversation for conversation, _, _, _ in work], save))
+    return errors
+
+def enqueue_stale(db: Session, page_size: int = 1000) -> Dict[str, int]:
+    """
+    Queue a re-analysis job for every completed conversation with stale
+    stages that isn't already queued. Safe to run again at any time: an
+    interrupted backfill continues where it left off.
+    """
+    queued = 0
+    needs_transcription = 0
+    last_id = 0
+    while True:
+        ids = [
+            row.id for row in db.query(Conversation.id).filter(
+                Conversation.status == "completed",
+                Conversation.id > last_id
+            ).order_by(Conversation.id).limit(page_size)
+        ]
+        if not ids:
+            break
+        last_id = ids[-1]
+
+        active = {
+            row.conversation_id for row in db.query(Job.conversation_id).filter(
+                Job.conversation_id.in_(ids),
+                Job.kind == REANALYZE_JOB,
+                Job.status.in_(["pending", "running"])
+            )
+        }
+        for conversation_id, versions in load_stage_versions(db, ids).items():
+            stale = stale_stages(versions)
+            if not stale or conversation_id in active:
+                continue
+            if "transcript" in stale:
+                needs_transcription += 1
+                continue
+            job_queue.enqueue(db, conversation_id, kind=REANALYZE_JOB, priority=PRIORITY_BULK)
+            queued += 1
+        db.commit()
+    return {"queued": queued, "needs_transcription": needs_transcription}
+
+def reanalysis_status(db: Session) -> Dict[str, int]:
+    """
+    Number of re-analysis jobs in each state
+    """
+    counts = db.query(Job.status, func.count(Job.id)).filter(Job.kind == REANALYZE_JOB).group_by(Job.status)
+    status = {"pending": 0, "running": 0, "completed": 0, "failed": 0}
+    status.update({state: count for state, count in counts})
+    return status
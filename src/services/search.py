@@ -1,35 +1,96 @@
+import re
 from typing import List, Dict, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from datetime import datetime
+from sqlalchemy import text, bindparam, exists, DateTime
+from datetime import date, datetime
 
-from src.models.database import Conversation
+from src.models.database import Conversation, Segment
+from src.services.stats import ConversationStats
+from src.services.metrics import timed_query
+from src.services.semantic_search import semantic_index
+from src.config import SEMANTIC_MIN_SCORE
+
+# Quoted phrases or single terms, optionally with a trailing * for prefix search
+QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+
+def to_fts_query(query: str) -> str:
+    """
+    Turn user input into an FTS5 MATCH expression.
+
+    "quoted phrases" are matched as phrases and terms ending in * as
+    prefixes; everything else is quoted so punctuation can't break the
+    query syntax. Terms are combined with AND.
+    """
+    terms = []
+    for phrase, word in QUERY_TOKEN.findall(query):
+        if phrase.strip():
+            terms.append('"' + phrase.strip() + '"')
+        elif word:
+            prefix = word.endswith("*")
+            word = word.rstrip("*").replace('"', "")
+            if word:
+                terms.append('"' + word + '"' + ("*" if prefix else ""))
+    return " ".join(terms)
 
 class SearchService:
     def __init__(self, db: Session):
         self.db = db
     
+    def index_conversation(self, conversation: Conversation) -> None:
+        """
+        Replace the full-text index rows for a conversation's segments.
+        Runs in the caller's transaction.
+        """
+        self.db.execute(
+            text("DELETE FROM segments_fts WHERE conversation_id = :conversation_id"),
+            {"conversation_id": conversation.id}
+        )
+        transcript = conversation.transcript or {}
+        speakers = transcript.get("speakers") or []
+        rows = [
+            {
+                "text": segment["text"],
+                "conversation_id": conversation.id,
+                "segment_index": index,
+                "start": segment["start"],
+                "end": segment["end"],
+                "speaker": speakers[index] if index < len(speakers) else segment.get("speaker")
+            }
+            for index, segment in enumerate(transcript.get("segments", []))
+        ]
+        if rows:
+            self.db.execute(
+                text(
+                    'INSERT INTO segments_fts (text, conversation_id, segment_index, start, "end", speaker) '
+                    "VALUES (:text, :conversation_id, :segment_index, :start, :end, :speaker)"
+                ),
+                rows
+            )
+    
+    @timed_query("search_conversations")
     def search_conversations(
         self,
-        user_id: int,
+        user_id: Optional[int],
         query: Optional[str] = None,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
         phase: Optional[str] = None,
-        sentiment: Optional[str] = None
+        sentiment: Optional[str] = None,
+        limit: int = 20,
+        mode: str = "keyword"
     ) -> List[Dict]:
         """
-        Search conversations with various filters
+        Search conversations with various filters.
+
+        With a text query, conversations are ranked by their best matching
+        segment (BM25) and each result lists the matching segments with
+        timestamps and a highlighted snippet. In "semantic" mode segments
+        are matched by embedding similarity instead, so paraphrases match
+        too; results then carry the similarity but no snippet.
         """
-        query_obj = self.db.query(Conversation).filter(Conversation.user_id == user_id)
-        
-        if query:
-            query_obj = query_obj.filter(
-                or_(
-                    Conversation.transcript["text"].as_string().ilike(f"%{query}%"),
-                    Conversation.analysis["segments"].as_string().ilike(f"%{query}%")
-                )
-            )
+        query_obj = self.db.query(Conversation)
+        if user_id is not None:
+            query_obj = query_obj.filter(Conversation.user_id == user_id)
         
         if start_date:
             query_obj = query_obj.filter(Conversation.created_at >= start_date)
@@ -39,52 +100,183 @@ class SearchService:
         
         if phase:
             query_obj = query_obj.filter(
-                Conversation.analysis["summary"]["phase_distribution"][phase].as_numeric() > 0
+                exists().where(Segment.conversation_id == Conversation.id).where(Segment.phase == phase)
             )
         
         if sentiment:
             query_obj = query_obj.filter(
-                Conversation.analysis["summary"]["sentiment_summary"][sentiment].as_numeric() > 0
+                exists().where(Segment.conversation_id == Conversation.id).where(Segment.sentiment == sentiment)
             )
         
-        return [conversation.to_dict() for conversation in query_obj.all()]
-
-    def get_conversation_stats(self, user_id: int) -> Dict:
+        if not query:
+            conversations = query_obj.order_by(Conversation.created_at.desc()).limit(limit).all()
+            return [conversation.to_dict() for conversation in conversations]
+        
+        if mode == "semantic":
+            matches = self._semantic_segments(query, user_id, start_date, end_date)
+        else:
+            matches = self._match_segments(query, user_id, start_date, end_date)
+        results = {}
+        for match in matches:
+            result = results.setdefault(match["conversation_id"], {
+                "conversation_id": match["conversation_id"],
+                "score": match["score"] if mode == "semantic" else -match["rank"],
+                "matches": []
+            })
+            if mode == "semantic":
+                result["matches"].append({
+                    "segment_index": match["segment_index"],
+                    "start": match["start"],
+                    "end": match["end"],
+                    "score": match["score"]
+                })
+            else:
+                result["matches"].append({
+                    "segment_index": match["segment_index"],
+                    "start": match["start"],
+                    "end": match["end"],
+                    "speaker": match["speaker"],
+                    "snippet": match["snippet"]
+                })
+        
+        # Apply the remaining filters to the matching conversations only
+        if phase or sentiment:
+            allowed = {
+                row.id for row in query_obj.with_entities(Conversation.id).filter(
+                    Conversation.id.in_(list(results))
+                )
+            }
+            results = {key: value for key, value in results.items() if key in allowed}
+        
+        return list(results.values())[:limit]
+    
+    def _match_segments(
+        self,
+        query: str,
+        user_id: Optional[int],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        max_segments: int = 500
+    ) -> List[Dict]:
         """
-        Get aggregated statistics for user's conversations
+        Best matching segments, ordered by rank (lower is better)
         """
-        conversations = self.db.query(Conversation).filter(
-            Conversation.user_id == user_id
-        ).all()
+        fts_query = to_fts_query(query)
+        if not fts_query:
+            return []
         
-        total_duration = 0
-        phase_stats = {
-            "introduction": 0,
-            "discovery": 0,
-            "pitch": 0,
-            "objection_handling": 0,
-            "closing": 0
-        }
-        sentiment_stats = {
-            "positive": 0,
-            "neutral": 0,
-            "negative": 0
-        }
+        conditions = ["segments_fts MATCH :query"]
+        params = {"query": fts_query, "max_segments": max_segments}
+        if user_id is not None:
+            conditions.append("c.user_id = :user_id")
+            params["user_id"] = user_id
+        if start_date:
+            conditions.append("c.created_at >= :start_date")
+            params["start_date"] = start_date
+        if end_date:
+            conditions.append("c.created_at <= :end_date")
+            params["end_date"] = end_date
         
-        for conv in conversations:
-            total_duration += conv.analysis["summary"]["duration"]
-            
-            # Aggregate phase stats
-            for phase, duration in conv.analysis["summary"]["phase_distribution"].items():
-                phase_stats[phase] += duration
-            
-            # Aggregate sentiment stats
-            for sentiment, count in conv.analysis["summary"]["sentiment_summary"].items():
-                sentiment_stats[sentiment] += count
+        statement = text(f"""
+            SELECT segments_fts.conversation_id AS conversation_id,
+                   segments_fts.segment_index AS segment_index,
+                   segments_fts.start AS start,
+                   segments_fts."end" AS "end",
+                   segments_fts.speaker AS speaker,
+                   snippet(segments_fts, 0, '[', ']', '...', 16) AS snippet,
+                   segments_fts.rank AS rank
+            FROM segments_fts
+            JOIN conversations c ON c.id = segments_fts.conversation_id
+            WHERE {" AND ".join(conditions)}
+            ORDER BY segments_fts.rank
+            LIMIT :max_segments
+        """)
+        if start_date:
+            statement = statement.bindparams(bindparam("start_date", type_=DateTime))
+        if end_date:
+            statement = statement.bindparams(bindparam("end_date", type_=DateTime))
         
-        return {
-            "total_conversations": len(conversations),
-            "total_duration": total_duration,
-            "phase_distribution": phase_stats,
-            "sentiment_distribution": sentiment_stats
-        }
\ No newline at end of file
+        return [dict(row._mapping) for row in self.db.execute(statement, params)]
+
+    def _semantic_segments(
+        self,
+        query: str,
+        user_id: Optional[int],
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        max_segments: int = 500
+    ) -> List[Dict]:
+        """
+        Most similar segments from the semantic index, best first
+        """
+        semantic_index.sync(self.db)
+        return semantic_index.search(query, max_segments, user_id, start_date, end_date, SEMANTIC_MIN_SCORE)
+
+    @timed_query("search_segments")
+    def search_segments(
+        self,
+        user_id: Optional[int],
+        phase: Optional[str] = None,
+        sentiment: Optional[str] = None,
+        speaker: Optional[str] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[Dict]:
+        """
+        Find classified segments, e.g. negative customer segments during
+        objection handling last week, without loading any conversation JSON
+        """
+        query_obj = self.db.query(Segment)
+        if user_id is not None:
+            query_obj = query_obj.filter(Segment.user_id == user_id)
+        if phase:
+            query_obj = query_obj.filter(Segment.phase == phase)
+        if sentiment:
+            query_obj = query_obj.filter(Segment.sentiment == sentiment)
+        if speaker:
+            query_obj = query_obj.filter(Segment.speaker == speaker)
+        if start_date:
+            query_obj = query_obj.filter(Segment.created_at >= start_date)
+        if end_date:
+            query_obj = query_obj.filter(Segment.created_at <= end_date)
+        
+        segments = query_obj.order_by(Segment.created_at.desc(), Segment.id).limit(limit).all()
+        return [
+            {
+                "conversation_id": segment.conversation_id,
+                "segment_index": segment.segment_index,
+                "start": segment.start,
+                "end": segment.end,
+                "speaker": segment.speaker,
+                "phase": segment.phase,
+                "sentiment": segment.sentiment,
+                "text_offset": segment.text_offset,
+                "text_length": segment.text_length,
+                "created_at": segment.created_at.isoformat() if segment.created_at else None
+            }
+            for segment in segments
+        ]
+    
+    def remove_conversation(self, conversation_id: int) -> None:
+        """
+        Drop a conversation's segments from the full-text index
+        """
+        self.db.execute(
+            text("DELETE FROM segments_fts WHERE conversation_id = :conversation_id"),
+            {"conversation_id": conversation_id}
+        )
+    
+    @timed_query("conversation_stats")
+    def get_conversation_stats(
+        self,
+        user_id: Optional[int],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        period: Optional[str] = None
+    ) -> Dict:
+        """
+        Get aggregated statistics for user's conversations from the
+        incrementally maintained daily aggregates
+        """
+        return ConversationStats(self.db).get_stats(user_id, start_date, end_date, period)
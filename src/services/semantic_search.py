@@ -0,0 +1,568 @@
+import datetime
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import SEMANTIC_MODEL, SEMANTIC_INDEX_DIR, SEMANTIC_INDEX_DTYPE, SEMANTIC_IVF_MIN_ROWS, SEMANTIC_PROBES
+from ..models.database import Conversation, ConversationEmbedding
+from .embeddings import get_embedder
+
+try:
+    import fcntl
+
+    def _lock_file(file) -> None:
+        fcntl.flock(file, fcntl.LOCK_EX)
+
+    def _unlock_file(file) -> None:
+        fcntl.flock(file, fcntl.LOCK_UN)
+except ImportError:
+    # Windows: lock the first byte of the file instead
+    import msvcrt
+
+    def _lock_file(file) -> None:
+        file.seek(0)
+        while True:
+            try:
+                # Gives up after ten one-second attempts; keep waiting
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                continue
+
+    def _unlock_file(file) -> None:
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+# One row per indexed segment, parallel to the vector matrix
+META_DTYPE = np.dtype([
+    ("embedding_id", "<i8"),
+    ("conversation_id", "<i8"),
+    ("segment_index", "<i4"),
+    ("start", "<f4"),
+    ("end", "<f4"),
+    ("user_id", "<i8"),
+    ("created_at", "<f8")
+])
+# Unit vectors are stored as int8 multiples of 1/127
+INT8_SCALE = 127.0
+# Rows scored per matrix product; bounds the float32 copy of an int8 block
+SCAN_BLOCK_ROWS = 65536
+# Embedding rows (conversations) read per query while indexing
+PAGE_SIZE = 500
+EPOCH = datetime.datetime(1970, 1, 1)
+
+def _timestamp(value: Optional[datetime.datetime]) -> float:
+    return (value - EPOCH).total_seconds() if value else 0.0
+
+def require_embedder():
+    """
+    The configured embedder; semantic search is unavailable without one
+    """
+    embedder = get_embedder()
+    if embedder is None:
+        raise RuntimeError(
+            "Semantic search requires a local sentence-transformers model "
+            "(set SEMANTIC_MODEL and pip install sentence-transformers)"
+        )
+    return embedder
+
+def embedding_required(segments: List[Dict]) -> bool:
+    """
+    Whether saving these segments calls for vectors: a model is configured
+    and there is something to embed
+    """
+    return bool(SEMANTIC_MODEL and segments)
+
+def embed_segments(segments: List[Dict]) -> Optional[ConversationEmbedding]:
+    """
+    Embed the text of each transcript segment, as an unsaved row for
+    store_embeddings. Encoding a long call takes seconds, so run this before
+    the write transaction. None without a configured model or segments.
+    """
+    embedder = get_embedder()
+    if not segments or embedder is None:
+        return None
+    vectors = embedder.embed([segment.get("text", "") for segment in segments])
+    spans = np.array([[segment["start"], segment["end"]] for segment in segments], dtype=np.float32)
+    return ConversationEmbedding(
+        model=embedder.name,
+        vectors=vectors.astype(np.float32).tobytes(),
+        spans=spans.tobytes()
+    )
+
+def find_embeddings(db: Session, audio_hash: str, segments: List[Dict]) -> Optional[ConversationEmbedding]:
+    """
+    Vectors of the configured model already stored for another conversation
+    of the same audio and segments, as an unsaved copy for store_embeddings.
+    Lets cached results be saved without encoding them again.
+    """
+    if not audio_hash or not embedding_required(segments):
+        return None
+    spans = np.array([[segment["start"], segment["end"]] for segment in segments], dtype=np.float32).tobytes()
+    # Flushing pending changes here would start the write transaction early
+    with db.no_autoflush:
+        stored = db.query(ConversationEmbedding).join(
+            Conversation, Conversation.id == ConversationEmbedding.conversation_id
+        ).filter(
+            Conversation.audio_hash == audio_hash,
+            ConversationEmbedding.model == SEMANTIC_MODEL,
+            ConversationEmbedding.spans == spans
+        ).first()
+    if stored is None:
+        return None
+    return ConversationEmbedding(model=stored.model, vectors=stored.vectors, spans=stored.spans)
+
+def store_embeddings(db: Session, conversation: Conversation, embedding: ConversationEmbedding) -> None:
+    """
+    Replace the conversation's stored vectors with those from
+    embed_segments() or find_embeddings(). Runs in the caller's transaction.
+    """
+    db.query(ConversationEmbedding).filter(
+        ConversationEmbedding.conversation_id == conversation.id
+    ).delete(synchronize_session=False)
+    embedding.conversation_id = conversation.id
+    db.add(embedding)
+
+def _train_clusters(sample: np.ndarray, n_clusters: int, iterations: int = 10, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means on a sample of unit vectors; returns unit centroids
+    """
+    rng = np.random.default_rng(seed)
+    centroids = sample[rng.choice(len(sample), n_clusters, replace=False)].copy()
+    for _ in range(iterations):
+        labels = (sample @ centroids.T).argmax(axis=1)
+        order = np.argsort(labels, kind="stable")
+        present, starts = np.unique(labels[order], return_index=True)
+        # Empty clusters keep their previous centroid
+        centroids[present] = np.add.reduceat(sample[order], starts, axis=0)
+        norms = np.linalg.norm(centroids, axis=1, keepdims=True)
+        centroids /= np.where(norms > 0, norms, 1)
+    return centroids.astype(np.float32)
+
+class SemanticIndex:
+    """
+    All segment embeddings as one memory-mapped matrix, shared by every
+    process through the files in SEMANTIC_INDEX_DIR.
+
+    The conversation_embeddings table is the source of truth. sync()
+    appends rows added since the last call, under a file lock; rows of
+    conversations that were re-embedded or deleted stay in the files and
+    are masked out until rebuild() rewrites them. rebuild() also adds a
+    coarse clustering index once the corpus is large: queries then score
+    only the segments of the closest clusters plus rows appended since.
+    """
+    def __init__(
+        self,
+        directory: str = SEMANTIC_INDEX_DIR,
+        dtype: str = SEMANTIC_INDEX_DTYPE,
+        probes: int = SEMANTIC_PROBES
+    ):
+        self.directory = Path(directory)
+        self.dtype = np.dtype(np.int8 if dtype == "int8" else np.float32)
+        self.probes = probes
+        # Embedding rows that are current, by conversation
+        self.current: Dict[int, int] = {}
+        self.current_ids: Set[int] = set()
+        self._db_state = None
+        self._stamp_seen = None
+        self._unmap()
+
+    def _unmap(self) -> None:
+        self.state: Optional[Dict] = None
+        self.vectors = np.zeros((0, 0), dtype=self.dtype)
+        self.meta = np.zeros(0, dtype=META_DTYPE)
+        self.live = np.zeros(0, dtype=bool)
+        # Embedding id -> its range of rows
+        self.positions: Dict[int, Tuple[int, int]] = {}
+        self.centroids: Optional[np.ndarray] = None
+        self.assign: Optional[np.ndarray] = None
+        # Rows sorted by cluster, with each cluster's offsets into `order`
+        self.order = np.zeros(0, dtype=np.int64)
+        self.offsets = np.zeros(1, dtype=np.int64)
+        self.sorted_rows = 0
+
+    # Files
+
+    def _path(self, name: str, generation: int) -> Path:
+        return self.directory / f"{name}.{generation}.bin"
+
+    def _read_state(self) -> Optional[Dict]:
+        try:
+            with open(self.directory / "index.json") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _write_state(self, state: Dict) -> None:
+        partial = self.directory / "index.json.part"
+        with open(partial, "w") as f:
+            json.dump(state, f)
+        os.replace(partial, self.directory / "index.json")
+
+    def _stamp(self) -> Optional[int]:
+        try:
+            return (self.directory / "index.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    @contextmanager
+    def _lock(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.directory / "index.lock", "w") as lock:
+            _lock_file(lock)
+            try:
+                yield
+            finally:
+                _unlock_file(lock)
+
+    def _remove_generations(self, before: int) -> None:
+        """
+        Delete the files of generations older than `before`. The generation
+        being replaced is kept until the next one replaces it, since other
+        processes may still have it mapped; files that can't be deleted yet
+        (still mapped, on Windows) are retried then. Call with the lock held.
+        """
+        for path in self.directory.glob("*.bin"):
+            suffixes = path.suffixes
+            if len(suffixes) < 2 or not suffixes[-2][1:].isdigit() or int(suffixes[-2][1:]) >= before:
+                continue
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+    def _compatible(self, state: Optional[Dict]) -> bool:
+        embedder = require_embedder()
+        return bool(state) and (state["model"], state["dim"], state["dtype"]) == (
+            embedder.name, embedder.dim, self.dtype.name
+        )
+
+    def _new_state(self, previous: Optional[Dict]) -> Dict:
+        embedder = require_embedder()
+        return {
+            "generation": (previous or {}).get("generation", 0) + 1,
+            "model": embedder.name,
+            "dim": embedder.dim,
+            "dtype": self.dtype.name,
+            "rows": 0,
+            "watermark": 0,
+            "clusters": 0
+        }
+
+    def _write_rows(self, name: str, state: Dict, data: np.ndarray) -> None:
+        """
+        Write rows after the committed ones, dropping whatever an
+        interrupted append left behind
+        """
+        path = self._path(name, state["generation"])
+        with open(path, "r+b" if path.exists() else "wb") as f:
+            f.seek(state["rows"] * (data.nbytes // len(data)))
+            f.write(data.tobytes())
+            f.truncate()
+
+    def _load_centroids(self, state: Dict) -> np.ndarray:
+        return np.fromfile(self._path("centroids", state["generation"]), dtype=np.float32).reshape(
+            state["clusters"], state["dim"]
+        )
+
+    def _encode(self, vectors: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int8:
+            return np.clip(np.rint(vectors * INT8_SCALE), -127, 127).astype(np.int8)
+        return vectors.astype(np.float32)
+
+    def _decode(self, block: np.ndarray) -> np.ndarray:
+        if self.dtype == np.int8:
+            return block.astype(np.float32) / INT8_SCALE
+        return np.asarray(block, dtype=np.float32)
+
+    def _append(self, db: Session, state: Dict) -> None:
+        """
+        Add embedding rows newer than the state's watermark to its files.
+        Call with the lock held.
+        """
+        centroids = self._load_centroids(state) if state["clusters"] else None
+        while True:
+            rows = db.query(ConversationEmbedding, Conversation.user_id, Conversation.created_at).join(
+                Conversation, Conversation.id == ConversationEmbedding.conversation_id
+            ).filter(
+                ConversationEmbedding.model == state["model"],
+                ConversationEmbedding.id > state["watermark"]
+            ).order_by(ConversationEmbedding.id).limit(PAGE_SIZE).all()
+            if not rows:
+                return
+
+            vectors = []
+            meta = []
+            for embedding, user_id, created_at in rows:
+                segment_vectors = np.frombuffer(embedding.vectors, dtype=np.float32).reshape(-1, state["dim"])
+                spans = np.frombuffer(embedding.spans, dtype=np.float32).reshape(-1, 2)
+                rows_meta = np.zeros(len(segment_vectors), dtype=META_DTYPE)
+                rows_meta["embedding_id"] = embedding.id
+                rows_meta["conversation_id"] = embedding.conversation_id
+                rows_meta["segment_index"] = np.arange(len(segment_vectors))
+                rows_meta["start"] = spans[:, 0]
+                rows_meta["end"] = spans[:, 1]
+                rows_meta["user_id"] = user_id if user_id is not None else -1
+                rows_meta["created_at"] = _timestamp(created_at)
+                vectors.append(segment_vectors)
+                meta.append(rows_meta)
+            vectors = np.concatenate(vectors)
+
+            self._write_rows("vectors", state, self._encode(vectors))
+            self._write_rows("meta", state, np.concatenate(meta))
+            if centroids is not None:
+                self._write_rows("assign", state, (vectors @ centroids.T).argmax(axis=1).astype(np.int32))
+            state["rows"] += len(vectors)
+            state["watermark"] = rows[-1][0].id
+            self._write_state(state)
+
+    def rebuild(self, db: Session) -> Dict:
+        """
+        Rewrite the index from the database as a new generation, without
+        the rows of replaced or deleted conversations, and cluster it when
+        it has at least SEMANTIC_IVF_MIN_ROWS segments. Readers keep using
+        the previous files until their next sync; those are deleted by the
+        rebuild after this one.
+        """
+        require_embedder()
+        with self._lock():
+            previous = self._read_state()
+            state = self._new_state(previous)
+            self._remove_generations(state["generation"] - 1)
+            self._append(db, state)
+            if state["rows"] >= SEMANTIC_IVF_MIN_ROWS:
+                vectors = np.memmap(
+                    self._path("vectors", state["generation"]), dtype=self.dtype, mode="r",
+                    shape=(state["rows"], state["dim"])
+                )
+                n_clusters = int(np.clip(np.sqrt(state["rows"]), 16, 4096))
+                # About 64 vectors per cluster are enough to place the centroids
+                sample = np.random.default_rng(0).choice(state["rows"], min(state["rows"], n_clusters * 64), replace=False)
+                centroids = _train_clusters(self._decode(vectors[np.sort(sample)]), n_clusters)
+                assign = np.concatenate([
+                    (self._decode(vectors[start:start + SCAN_BLOCK_ROWS]) @ centroids.T).argmax(axis=1)
+                    for start in range(0, state["rows"], SCAN_BLOCK_ROWS)
+                ]).astype(np.int32)
+                self._path("centroids", state["generation"]).write_bytes(centroids.tobytes())
+                self._path("assign", state["generation"]).write_bytes(assign.tobytes())
+                state["clusters"] = n_clusters
+            self._write_state(state)
+        self._db_state = None
+        return self.stats()
+
+    # Readers
+
+    def sync(self, db: Session) -> None:
+        """
+        Bring this process's view up to date with the database: index new
+        embedding rows and mask out replaced ones. Returns immediately when
+        nothing changed, so it can run before every query.
+        """
+        model = require_embedder().name
+        db_state = tuple(db.query(
+            func.count(ConversationEmbedding.id), func.max(ConversationEmbedding.id)
+        ).filter(ConversationEmbedding.model == model).one())
+        if db_state == self._db_state and self._stamp() == self._stamp_seen:
+            return
+
+        state = self._read_state()
+        if not self._compatible(state) or (db_state[1] or 0) > state["watermark"]:
+            with self._lock():
+                state = self._read_state()
+                if not self._compatible(state):
+                    state = self._new_state(state)
+                    self._remove_generations(state["generation"] - 1)
+                self._append(db, state)
+                self._write_state(state)
+
+        dead = self._update_current(db, model, db_state)
+        self._map(state, reset_live=dead is None)
+        for embedding_id in dead or ():
+            if embedding_id in self.positions:
+                start, end = self.positions[embedding_id]
+                self.live[start:end] = False
+        self._db_state = db_state
+        self._stamp_seen = self._stamp()
+
+    def _update_current(self, db: Session, model: str, db_state: Tuple) -> Optional[Set[int]]:
+        """
+        Track the current embedding row of each conversation. Returns the
+        ids that stopped being current, or None after a full reload.
+        """
+        if self._db_state is not None:
+            dead = set()
+            new_rows = db.query(ConversationEmbedding.id, ConversationEmbedding.conversation_id).filter(
+                ConversationEmbedding.model == model,
+                ConversationEmbedding.id > (self._db_state[1] or 0)
+            )
+            for embedding_id, conversation_id in new_rows:
+                previous = self.current.get(conversation_id)
+                if previous is not None:
+                    dead.add(previous)
+                    self.current_ids.discard(previous)
+                self.current[conversation_id] = embedding_id
+                self.current_ids.add(embedding_id)
+            # Equal counts mean no conversation was deleted in between
+            if len(self.current) == db_state[0]:
+                return dead
+
+        self.current = {
+            conversation_id: embedding_id
+            for embedding_id, conversation_id in db.query(
+                ConversationEmbedding.id, ConversationEmbedding.conversation_id
+            ).filter(ConversationEmbedding.model == model)
+        }
+        self.current_ids = set(self.current.values())
+        return None
+
+    def _open(self, name: str, state: Dict, dtype, shape) -> np.ndarray:
+        if state["rows"] == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self._path(name, state["generation"]), dtype=dtype, mode="r", shape=shape)
+
+    def _map(self, state: Dict, reset_live: bool) -> None:
+        """
+        Map the files described by `state`, reusing what is already mapped
+        when only rows were appended
+        """
+        same_generation = self.state is not None and self.state["generation"] == state["generation"]
+        mapped_rows = len(self.meta) if same_generation else 0
+        if not same_generation:
+            self._unmap()
+
+        rows = state["rows"]
+        self.vectors = self._open("vectors", state, self.dtype, (rows, state["dim"]))
+        self.meta = self._open("meta", state, META_DTYPE, (rows,))
+        if state["clusters"]:
+            self.assign = self._open("assign", state, np.int32, (rows,))
+            if self.centroids is None:
+                self.centroids = self._load_centroids(state)
+
+        ids = np.asarray(self.meta["embedding_id"][mapped_rows:])
+        if len(ids):
+            starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+            ends = np.r_[starts[1:], len(ids)]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                self.positions[int(ids[start])] = (mapped_rows + start, mapped_rows + end)
+
+        if reset_live or not same_generation:
+            current = np.fromiter(self.current_ids, dtype=np.int64, count=len(self.current_ids))
+            self.live = np.isin(np.asarray(self.meta["embedding_id"]), current)
+        elif rows > len(self.live):
+            current = np.fromiter(self.current_ids, dtype=np.int64, count=len(self.current_ids))
+            self.live = np.concatenate([self.live, np.isin(ids, current)])
+
+        # Re-sort by cluster once the unsorted tail gets long
+        if self.assign is not None and rows - self.sorted_rows > max(SCAN_BLOCK_ROWS, rows // 10):
+            assign = np.asarray(self.assign)
+            self.order = np.argsort(assign, kind="stable")
+            self.offsets = np.r_[0, np.cumsum(np.bincount(assign, minlength=state["clusters"]))]
+            self.sorted_rows = rows
+        self.state = state
+
+    def _candidates(self, query: np.ndarray) -> Optional[np.ndarray]:
+        """
+        Rows in the clusters closest to the query plus the rows added since
+        they were sorted, or None to scan everything
+        """
+        if self.centroids is None or self.sorted_rows == 0:
+            return None
+        closest = np.argsort(-(self.centroids @ query))[:self.probes]
+        rows = [self.order[self.offsets[cluster]:self.offsets[cluster + 1]] for cluster in closest]
+        rows.append(np.arange(self.sorted_rows, len(self.meta)))
+        # Ascending rows read the memory map sequentially
+        return np.sort(np.concatenate(rows))
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        user_id: Optional[int] = None,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        min_score: float = -1.0
+    ) -> List[Dict]:
+        """
+        Segments most similar to the query, best first, as conversation id,
+        segment index, start, end and cosine similarity. Call sync() first.
+        """
+        embedder = require_embedder()
+        if len(self.meta) == 0:
+            return []
+        vector = embedder.embed([query])[0]
+        if not vector.any():
+            return []
+
+        scaled = vector / INT8_SCALE if self.dtype == np.int8 else vector
+        candidates = self._candidates(vector)
+        total = len(self.meta) if candidates is None else len(candidates)
+        best_rows = np.zeros(0, dtype=np.int64)
+        best_scores = np.zeros(0, dtype=np.float32)
+        for offset in range(0, total, SCAN_BLOCK_ROWS):
+            if candidates is None:
+                rows = np.arange(offset, min(offset + SCAN_BLOCK_ROWS, total))
+                block = self.vectors[offset:offset + SCAN_BLOCK_ROWS]
+                meta = self.meta[offset:offset + SCAN_BLOCK_ROWS]
+            else:
+                rows = candidates[offset:offset + SCAN_BLOCK_ROWS]
+                block = self.vectors[rows]
+                meta = self.meta[rows]
+
+            # The int8 scale is folded into the query instead of every row
+            scores = block.astype(np.float32, copy=False) @ scaled
+            keep = self.live[rows] & (scores >= min_score)
+            if user_id is not None:
+                keep &= meta["user_id"] == user_id
+            if start_date:
+                keep &= meta["created_at"] >= _timestamp(start_date)
+            if end_date:
+                keep &= meta["created_at"] <= _timestamp(end_date)
+            scores = np.where(keep, scores, -np.inf)
+
+            if len(scores) > limit:
+                top = np.argpartition(-scores, limit)[:limit]
+                rows, scores = rows[top], scores[top]
+            best_rows = np.concatenate([best_rows, rows])
+            best_scores = np.concatenate([best_scores, scores])
+            if len(best_scores) > limit:
+                top = np.argpartition(-best_scores, limit)[:limit]
+                best_rows, best_scores = best_rows[top], best_scores[top]
+
+        order = np.argsort(-best_scores, kind="stable")
+        results = []
+        for row, score in zip(best_rows[order].tolist(), best_scores[order].tolist()):
+            if score == -np.inf:
+                break
+            segment = self.meta[row]
+            results.append({
+                "conversation_id": int(segment["conversation_id"]),
+                "segment_index": int(segment["segment_index"]),
+                "start": round(float(segment["start"]), 3),
+                "end": round(float(segment["end"]), 3),
+                "score": round(score, 4)
+            })
+        return results
+
+    def stats(self) -> Dict:
+        state = self._read_state() or {}
+        size = sum(
+            self._path(name, state["generation"]).stat().st_size
+            for name in ("vectors", "meta", "assign", "centroids")
+            if state and self._path(name, state["generation"]).exists()
+        )
+        return {
+            "rows": state.get("rows", 0),
+            "live_rows": int(self.live.sum()),
+            "clusters": state.get("clusters", 0),
+            "model": state.get("model"),
+            "dtype": state.get("dtype"),
+            "size_mb": round(size / 1024 / 1024, 1)
+        }
+
+# Shared by all requests of a process
+semantic_index = SemanticIndex()
@@ -1,45 +1,201 @@
 import numpy as np
-from typing import Dict, List, Tuple
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
 from scipy.cluster.vq import kmeans2
 
+from .audio_features import FEATURE_DIM, FRAME_LENGTH, HOP_LENGTH, SAMPLE_RATE, frame_features, segment_features
+from .turn_taking import analyze_turn_taking
+from .voiceprints import VoiceprintIndex, voiceprint_index
+
+# Maximum number of segment feature vectors kept in memory
+FEATURES_CACHE_SIZE = 100000
+# Calls are framed together until their combined length reaches this
+FEATURE_BATCH_SECONDS = 3600
+# Most speakers a call is split into
+MAX_SPEAKERS = 4
+# k-means restarts per speaker count; the tightest clustering is kept
+KMEANS_RESTARTS = 5
+
+# (segments, decoded samples or None, audio hash or None)
+CallAudio = Tuple[List[Dict], Optional[np.ndarray], Optional[str]]
+
 class SpeakerIdentifier:
-    def __init__(self):
-        self.features_cache = {}
+    def __init__(self, cache_size: int = FEATURES_CACHE_SIZE, voiceprints: Optional[VoiceprintIndex] = None):
+        # (audio hash, start, end) -> feature vector, least recently used first
+        self.features_cache: "OrderedDict[Tuple[str, float, float], np.ndarray]" = OrderedDict()
+        self.cache_size = cache_size
+        self.voiceprints = voiceprints
+    
+    def identify_speakers(
+        self,
+        audio_segments: List[Dict],
+        audio: Optional[np.ndarray] = None,
+        audio_hash: Optional[str] = None
+    ) -> List[str]:
+        """
+        Identify speakers in audio segments, by enrolled voiceprint where
+        possible and by clustering otherwise. `audio` holds the decoded 16 kHz mono samples of the whole call.
+        """
+        return self.identify_speakers_batch([(audio_segments, audio, audio_hash)])[0]
     
-    def identify_speakers(self, audio_segments: List[Dict]) -> List[str]:
+    def identify_speakers_batch(self, calls: List[CallAudio]) -> List[List[str]]:
         """
-        Identify speakers in audio segments using clustering
+        Identify speakers for several calls given as (segments, audio, audio hash).
+        Frame features are computed in one pass over all calls; labeling
+        stays per call.
         """
-        # Extract features from audio segments
-        features = self._extract_features(audio_segments)
+        speakers: List[Optional[List[str]]] = [None] * len(calls)
+        with_audio = []
+        for index, (segments, audio, _) in enumerate(calls):
+            if audio is None:
+                speakers[index] = ["Unknown"] * len(segments)
+            else:
+                with_audio.append(index)
         
-        # Perform clustering to separate speakers
+        features = self._extract_features_batch([calls[index] for index in with_audio])
+        for index, call_features in zip(with_audio, features):
+            speakers[index] = self._label_speakers(call_features)
+        return speakers
+    
+    def _label_speakers(self, features: np.ndarray) -> List[str]:
+        """
+        Cluster the segments by voice, then name the clusters that match an
+        enrolled voiceprint. The remaining clusters are customers; when no
+        rep was recognized the largest one is taken to be the salesperson.
+        """
         if len(features) < 2:
             return ["Unknown"] * len(features)
+        labels = self._cluster_speakers(features)
+        names = self.voiceprints.match(features, labels) if self.voiceprints is not None else {}
+
+        roles: Dict[int, str] = {}
+        if not names:
+            roles[self._identify_salesperson_cluster(features, labels, None)] = "Salesperson"
+        # Largest first, so the main customer is plain "Customer"
+        others = [
+            int(cluster) for cluster in np.argsort(-np.bincount(labels), kind="stable")
+            if cluster not in names and cluster not in roles
+        ]
+        for number, cluster in enumerate(others, 1):
+            roles[cluster] = "Customer" if number == 1 else f"Customer {number}"
+        return [names.get(label) or roles[label] for label in labels.tolist()]
+
+    def analyze_turn_taking(self, speakers: List[str], segments: List[Dict]) -> Dict:
+        """
+        Turn-taking statistics, see turn_taking.analyze_turn_taking. For
+        callers of the earlier two-role result, salesperson_stats and
+        customer_stats are included in their old shape.
+        """
+        result = analyze_turn_taking(speakers, segments)
+        for key, label in (("salesperson_stats", "Salesperson"), ("customer_stats", "Customer")):
+            stats = result["speakers"].get(label)
+            result[key] = {
+                "total_turns": stats["turns"] if stats else 0,
+                "avg_duration": stats["avg_turn_duration"] if stats else 0,
+                "total_duration": stats["talk_time"] if stats else 0
+            }
+        return result
+
+    def _cluster_speakers(self, features: np.ndarray) -> np.ndarray:
+        """
+        Cluster labels 0..k-1 per segment, trying 2 to MAX_SPEAKERS speakers
+        and keeping the count with the best silhouette
+        """
+        # Standardize so MFCCs, energy and pitch weigh in equally
+        std = features.std(axis=0)
+        normalized = (features - features.mean(axis=0)) / np.where(std > 0, std, 1)
+        if len(features) < 4:
+            return np.unique(kmeans2(normalized, 2, minit='++', seed=0)[1], return_inverse=True)[1]
+
+        best_labels, best_score = None, -np.inf
+        for k in range(2, min(MAX_SPEAKERS, len(features) - 1) + 1):
+            runs = [kmeans2(normalized, k, minit='++', seed=seed) for seed in range(KMEANS_RESTARTS)]
+            _, labels = min(runs, key=lambda run: ((normalized - run[0][run[1]]) ** 2).sum())
+            labels = np.unique(labels, return_inverse=True)[1]
+            score = _silhouette(normalized, labels)
+            if score > best_score:
+                best_labels, best_score = labels, score
+        return best_labels
+    
+    def _extract_features(
+        self,
+        segments: List[Dict],
+        audio: np.ndarray,
+        audio_hash: Optional[str] = None
+    ) -> np.ndarray:
+        """
+        Extract MFCC, energy and pitch statistics for every segment
+        """
+        return self._extract_features_batch([(segments, audio, audio_hash)])[0]
+    
+    def _extract_features_batch(self, calls: List[CallAudio]) -> List[np.ndarray]:
+        """
+        Segment features for each call. Only segments missing from the cache
+        are summarized; the calls that have any are concatenated (padded to
+        whole hops, so frame boundaries line up with those of each call on
+        its own) and framed together in groups of up to FEATURE_BATCH_SECONDS.
+        """
+        results = []
+        pending = []
+        for segments, audio, audio_hash in calls:
+            keys = [
+                (audio_hash, round(segment["start"], 3), round(segment["end"], 3))
+                for segment in segments
+            ]
+            features = np.empty((len(segments), FEATURE_DIM), dtype=np.float32)
+            missing = []
+            for index, key in enumerate(keys):
+                cached = self.features_cache.get(key) if audio_hash else None
+                if cached is None:
+                    missing.append(index)
+                else:
+                    self.features_cache.move_to_end(key)
+                    features[index] = cached
+            results.append(features)
+            if missing:
+                pending.append((segments, audio, audio_hash, keys, features, missing))
         
-        centroids, labels = kmeans2(features, 2, minit='points')
+        group: list = []
+        group_samples = 0
+        for item in pending:
+            length = len(item[1])
+            if group and group_samples + length > FEATURE_BATCH_SECONDS * SAMPLE_RATE:
+                self._summarize_group(group)
+                group, group_samples = [], 0
+            group.append(item)
+            group_samples += length
+        if group:
+            self._summarize_group(group)
         
-        # Determine which cluster is likely the salesperson
-        salesperson_cluster = self._identify_salesperson_cluster(features, labels, centroids)
+        while len(self.features_cache) > self.cache_size:
+            self.features_cache.popitem(last=False)
+        return results
+    
+    def _summarize_group(self, group: list) -> None:
+        pieces = []
+        spans = []
+        offset = 0
+        for segments, audio, _, _, _, missing in group:
+            duration = len(audio) / SAMPLE_RATE
+            for index in missing:
+                start = min(segments[index]["start"], duration)
+                end = min(segments[index]["end"], duration)
+                spans.append((offset / SAMPLE_RATE + start, offset / SAMPLE_RATE + end))
+            padded = -(-(len(audio) + FRAME_LENGTH) // HOP_LENGTH) * HOP_LENGTH
+            pieces.append(np.asarray(audio, dtype=np.float32))
+            pieces.append(np.zeros(padded - len(audio), dtype=np.float32))
+            offset += padded
         
-        # Map labels to speaker roles
-        speakers = []
-        for label in labels:
-            if label == salesperson_cluster:
-                speakers.append("Salesperson")
-            else:
-                speakers.append("Customer")
+        frames = frame_features(np.concatenate(pieces) if len(pieces) > 2 else pieces[0])
+        summarized = segment_features(frames, spans)
         
-        return speakers
-    
-    def _extract_features(self, segments: List[Dict]) -> np.ndarray:
-        """
-        Extract relevant features from audio segments
-        Placeholder for actual feature extraction
-        """
-        # This should be replaced with actual audio feature extraction
-        # For now, return random features for demonstration
-        return np.random.rand(len(segments), 10)
+        position = 0
+        for _, _, audio_hash, keys, features, missing in group:
+            features[missing] = summarized[position:position + len(missing)]
+            position += len(missing)
+            if audio_hash:
+                for index in missing:
+                    self.features_cache[keys[index]] = features[index].copy()
     
     def _identify_salesperson_cluster(
         self,
@@ -58,56 +214,24 @@ class SpeakerIdentifier:
         # - Vocabulary usage
         # - Turn-taking patterns
         
-        # For now, assume the cluster with more segments is the salesperson
-        cluster_0_count = np.sum(labels == 0)
-        cluster_1_count = np.sum(labels == 1)
-        
-        return 0 if cluster_0_count > cluster_1_count else 1
-    
-    def analyze_turn_taking(self, speakers: List[str], segments: List[Dict]) -> Dict:
-        """
-        Analyze conversation dynamics based on speaker turns
-        """
-        turns = []
-        current_speaker = speakers[0]
-        current_duration = 0
-        
-        for speaker, segment in zip(speakers, segments):
-            if speaker != current_speaker:
-                turns.append({
-                    "speaker": current_speaker,
-                    "duration": current_duration
-                })
-                current_speaker = speaker
-                current_duration = segment["end"] - segment["start"]
-            else:
-                current_duration += segment["end"] - segment["start"]
-        
-        # Add last turn
-        turns.append({
-            "speaker": current_speaker,
-            "duration": current_duration
-        })
-        
-        return self._calculate_turn_statistics(turns)
-    
-    def _calculate_turn_statistics(self, turns: List[Dict]) -> Dict:
-        """
-        Calculate statistics about turn-taking patterns
-        """
-        salesperson_turns = [t for t in turns if t["speaker"] == "Salesperson"]
-        customer_turns = [t for t in turns if t["speaker"] == "Customer"]
-        
-        return {
-            "total_turns": len(turns),
-            "salesperson_stats": {
-                "total_turns": len(salesperson_turns),
-                "avg_duration": np.mean([t["duration"] for t in salesperson_turns]) if salesperson_turns else 0,
-                "total_duration": sum(t["duration"] for t in salesperson_turns)
-            },
-            "customer_stats": {
-                "total_turns": len(customer_turns),
-                "avg_duration": np.mean([t["duration"] for t in customer_turns]) if customer_turns else 0,
-                "total_duration": sum(t["duration"] for t in customer_turns)
-            }
-        }
\ No newline at end of file
+        # For now, assume the cluster with the most segments is the salesperson
+        return int(np.bincount(labels).argmax())
+
+def _silhouette(points: np.ndarray, labels: np.ndarray) -> float:
+    """
+    Mean silhouette: how much closer each point is to its own cluster than
+    to the nearest other one, from -1 to 1
+    """
+    distances = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=-1))
+    onehot = np.eye(labels.max() + 1)[labels]
+    sizes = onehot.sum(axis=0)
+    totals = distances @ onehot
+    own = sizes[labels]
+    # Singletons score 0
+    inner = totals[np.arange(len(labels)), labels] / np.maximum(own - 1, 1)
+    outer = np.where(onehot > 0, np.inf, totals / np.maximum(sizes, 1)).min(axis=1)
+    scores = (outer - inner) / np.maximum(np.maximum(inner, outer), 1e-12)
+    return float(np.where(own > 1, scores, 0.0).mean())
+
+# Shared by the pipeline and re-analysis so they use one feature cache
+speaker_identifier = SpeakerIdentifier(voiceprints=voiceprint_index)
@@ -0,0 +1,79 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from ..config import SEMANTIC_MODEL
+from ..models.database import StageVersion
+
+# Bump a stage's version whenever a change alters its output; re-analysis
+# recomputes that stage and everything downstream of it
+STAGE_VERSIONS = {
+    "transcript": "1",
+    "speakers": "3",
+    "turn_taking": "2",
+    "classification": "1",
+    # Configuring or changing the model re-embeds every conversation
+    "embeddings": f"1:{SEMANTIC_MODEL}" if SEMANTIC_MODEL else "1"
+}
+
+# Stages in pipeline order with the stages each one consumes
+STAGE_DEPENDENCIES = {
+    "transcript": [],
+    "speakers": ["transcript"],
+    "turn_taking": ["transcript", "speakers"],
+    "classification": ["transcript", "speakers"],
+    "embeddings": ["transcript"]
+}
+
+def stale_stages(versions: Dict[str, str]) -> Set[str]:
+    """
+    Stages whose stored version is missing or outdated, plus every stage
+    downstream of one of them
+    """
+    stale = set()
+    for stage, dependencies in STAGE_DEPENDENCIES.items():
+        if versions.get(stage) != STAGE_VERSIONS[stage] or stale.intersection(dependencies):
+            stale.add(stage)
+    return stale
+
+def load_stage_versions(db: Session, conversation_ids: Iterable[int]) -> Dict[int, Dict[str, str]]:
+    """
+    Stored stage versions per conversation. Conversations analyzed before
+    versions were recorded are reported with only their transcript current:
+    it came from the same Whisper pass, everything after it is recomputed.
+    """
+    conversation_ids = list(conversation_ids)
+    versions: Dict[int, Dict[str, str]] = {
+        conversation_id: {} for conversation_id in conversation_ids
+    }
+    rows = db.query(StageVersion).filter(StageVersion.conversation_id.in_(conversation_ids))
+    for row in rows:
+        versions[row.conversation_id][row.stage] = row.version
+    for stored in versions.values():
+        if not stored:
+            stored["transcript"] = STAGE_VERSIONS["transcript"]
+    return versions
+
+def record_stage_versions(
+    db: Session,
+    conversation_id: int,
+    stages: Optional[List[str]] = None
+) -> None:
+    """
+    Mark the given stages (default: all) as produced by the current code.
+    Runs in the caller's transaction.
+    """
+    now = datetime.utcnow()
+    db.execute(
+        text(
+            "INSERT INTO stage_versions (conversation_id, stage, version, updated_at) "
+            "VALUES (:conversation_id, :stage, :version, :updated_at) "
+            "ON CONFLICT (conversation_id, stage) DO UPDATE "
+            "SET version = excluded.version, updated_at = excluded.updated_at"
+        ),
+        [
+            {"conversation_id": conversation_id, "stage": stage, "version": STAGE_VERSIONS[stage], "updated_at": now}
+            for stage in (stages or STAGE_VERSIONS)
+        ]
+    )
@@ -0,0 +1,142 @@
+from typing import Dict, Optional
+from collections import defaultdict
+from datetime import date, datetime
+from sqlalchemy import text, func
+from sqlalchemy.orm import Session
+
+from ..models.database import Conversation, UserDailyStat
+from .classification import CONVERSATION_PHASES, SENTIMENT_LABELS
+
+# Owner bucket for conversations without a user
+ANONYMOUS_USER_ID = 0
+
+# SQLite strftime formats for the supported rollup periods
+PERIOD_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m"
+}
+
+def analysis_metrics(analysis: Optional[Dict]) -> Dict[str, float]:
+    """
+    Flatten an analysis summary into additive metrics
+    """
+    if not analysis or "summary" not in analysis:
+        return {}
+    summary = analysis["summary"]
+    metrics = {
+        "conversations": 1.0,
+        "duration": float(summary.get("duration", 0))
+    }
+    for phase, duration in summary.get("phase_distribution", {}).items():
+        metrics[f"phase:{phase}"] = float(duration)
+    for sentiment, count in summary.get("sentiment_summary", {}).items():
+        metrics[f"sentiment:{sentiment}"] = float(count)
+    return metrics
+
+class ConversationStats:
+    """
+    Per-user, per-day aggregates kept up to date as analyses are written,
+    replaced or deleted, so dashboards never re-read transcripts.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    def record_analysis(
+        self,
+        conversation: Conversation,
+        old_analysis: Optional[Dict],
+        new_analysis: Optional[Dict]
+    ) -> None:
+        """
+        Apply the difference between two analyses of a conversation.
+        Pass old_analysis=None for a new analysis and new_analysis=None on delete.
+        Runs in the caller's transaction.
+        """
+        delta = defaultdict(float)
+        for metric, value in analysis_metrics(new_analysis).items():
+            delta[metric] += value
+        for metric, value in analysis_metrics(old_analysis).items():
+            delta[metric] -= value
+
+        rows = [
+            {
+                "user_id": conversation.user_id if conversation.user_id is not None else ANONYMOUS_USER_ID,
+                "day": (conversation.created_at or datetime.utcnow()).date(),
+                "metric": metric,
+                "value": value
+            }
+            for metric, value in delta.items() if value
+        ]
+        if rows:
+            self.db.execute(
+                text(
+                    "INSERT INTO user_daily_stats (user_id, day, metric, value) "
+                    "VALUES (:user_id, :day, :metric, :value) "
+                    "ON CONFLICT (user_id, day, metric) DO UPDATE SET value = value + excluded.value"
+                ),
+                rows
+            )
+
+    def get_stats(
+        self,
+        user_id: Optional[int],
+        start_date: Optional[date] = None,
+        end_date: Optional[date] = None,
+        period: Optional[str] = None
+    ) -> Dict:
+        """
+        Totals over the date range, optionally broken down per day, week or month
+        """
+        query = self.db.query(UserDailyStat.metric, func.sum(UserDailyStat.value))
+        query = self._filter(query, user_id, start_date, end_date)
+        stats = self._format(dict(query.group_by(UserDailyStat.metric).all()))
+
+        if period:
+            bucket = func.strftime(PERIOD_FORMATS[period], UserDailyStat.day)
+            series_query = self.db.query(bucket, UserDailyStat.metric, func.sum(UserDailyStat.value))
+            series_query = self._filter(series_query, user_id, start_date, end_date)
+            buckets = defaultdict(dict)
+            for key, metric, value in series_query.group_by(bucket, UserDailyStat.metric).order_by(bucket):
+                buckets[key][metric] = value
+            stats["series"] = [{"period": key, **self._format(metrics)} for key, metrics in buckets.items()]
+
+        return stats
+
+    def rebuild(self) -> None:
+        """
+        Recompute all aggregates from the stored analyses
+        """
+        self.db.query(UserDailyStat).delete(synchronize_session=False)
+        conversations = self.db.query(Conversation).filter(
+            Conversation.analysis.isnot(None)
+        ).yield_per(500)
+        for conversation in conversations:
+            self.record_analysis(conversation, None, conversation.analysis)
+        self.db.commit()
+
+    def _filter(self, query, user_id: Optional[int], start_date: Optional[date], end_date: Optional[date]):
+        if user_id is not None:
+            query = query.filter(UserDailyStat.user_id == user_id)
+        if start_date:
+            query = query.filter(UserDailyStat.day >= start_date)
+        if end_date:
+            query = query.filter(UserDailyStat.day <= end_date)
+        return query
+
+    def _format(self, metrics: Dict[str, float]) -> Dict:
+        # Every label is reported, including those with no data yet
+        phases = {phase: 0.0 for phase in CONVERSATION_PHASES}
+        sentiments = {sentiment: 0 for sentiment in SENTIMENT_LABELS}
+        for metric, value in metrics.items():
+            if metric.startswith("phase:"):
+                phases[metric[len("phase:"):]] = value
+            elif metric.startswith("sentiment:"):
+                sentiments[metric[len("sentiment:"):]] = int(round(value))
+        return {
+            "total_conversations": int(round(metrics.get("conversations", 0))),
+            "total_duration": metrics.get("duration", 0),
+            "phase_distribution": phases,
+            "sentiment_distribution": sentiments
+        }
@@ -0,0 +1,115 @@
+import hashlib
+import json
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import WHISPER_MODEL, WHISPER_QUANTIZE, TRANSCRIBE_OPTIONS, TRANSCRIPT_CACHE_MAX_MB
+from ..models.database import TranscriptCacheEntry
+from .stages import STAGE_VERSIONS
+from .word_store import split_words
+
+# Entries written by older versions of any stage stop matching
+PIPELINE_VERSION = ",".join(f"{stage}={version}" for stage, version in STAGE_VERSIONS.items())
+
+def model_variant(model_name: str, quantized: bool = WHISPER_QUANTIZE) -> str:
+    """
+    Name a model together with its weight format; int8 weights give slightly
+    different transcripts than the fp32 model
+    """
+    return f"{model_name}+int8" if quantized else model_name
+
+class TranscriptCache:
+    """
+    Content-addressed cache of pipeline results so identical audio is only
+    transcribed once
+    """
+
+    def __init__(
+        self,
+        model_name: str = model_variant(WHISPER_MODEL),
+        options: Optional[Dict] = None,
+        pipeline_version: str = PIPELINE_VERSION,
+        max_bytes: int = TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024
+    ):
+        self.model_name = model_name
+        self.options = options if options is not None else TRANSCRIBE_OPTIONS
+        self.pipeline_version = pipeline_version
+        self.max_bytes = max_bytes
+
+    def make_key(self, audio_hash: str) -> str:
+        """
+        Cache key for audio with the current model, options and pipeline version
+        """
+        payload = json.dumps({
+            "audio": audio_hash,
+            "model": self.model_name,
+            "options": self.options,
+            "pipeline": self.pipeline_version
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, db: Session, audio_hash: str) -> Optional[TranscriptCacheEntry]:
+        """
+        Look up a cached result and mark it as recently used
+        """
+        entry = db.query(TranscriptCacheEntry).get(self.make_key(audio_hash))
+        if entry is not None:
+            entry.last_used_at = datetime.utcnow()
+        return entry
+
+    def put(self, db: Session, audio_hash: str, transcript: Dict, analysis: Dict) -> None:
+        """
+        Store a pipeline result, evicting old entries to stay under the size cap
+        """
+        transcript, analysis, words = split_words(transcript, analysis)
+        size = len(json.dumps(transcript)) + len(json.dumps(analysis)) + len(words or b"")
+        if size > self.max_bytes:
+            return
+
+        db.merge(TranscriptCacheEntry(
+            key=self.make_key(audio_hash),
+            audio_hash=audio_hash,
+            model_name=self.model_name,
+            pipeline_version=self.pipeline_version,
+            transcript=transcript,
+            analysis=analysis,
+            words=words,
+            size_bytes=size,
+            last_used_at=datetime.utcnow()
+        ))
+        db.flush()
+        self._evict(db)
+
+    def purge_stale(self, db: Session) -> int:
+        """
+        Delete entries produced by another model or pipeline version
+        """
+        count = db.query(TranscriptCacheEntry).filter(
+            (TranscriptCacheEntry.pipeline_version != self.pipeline_version)
+            | (TranscriptCacheEntry.model_name != self.model_name)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return count
+
+    def _evict(self, db: Session) -> None:
+        total = db.query(func.coalesce(func.sum(TranscriptCacheEntry.size_bytes), 0)).scalar()
+        if total <= self.max_bytes:
+            return
+
+        oldest = db.query(TranscriptCacheEntry.key, TranscriptCacheEntry.size_bytes).order_by(
+            TranscriptCacheEntry.last_used_at
+        ).yield_per(100)
+        to_delete = []
+        for key, size in oldest:
+            if total <= self.max_bytes:
+                break
+            to_delete.append(key)
+            total -= size
+        db.query(TranscriptCacheEntry).filter(
+            TranscriptCacheEntry.key.in_(to_delete)
+        ).delete(synchronize_session=False)
+
+# Global transcript cache instance
+transcript_cache = TranscriptCache()
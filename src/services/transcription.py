@@ -1,23 +1,83 @@
 import whisper_timestamped as whisper
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
 import torch
 import numpy as np
-from typing import Dict, List
+from typing import Callable, Dict, List, Optional, Union
+
+from ..config import (
+    WHISPER_MODEL,
+    WHISPER_BULK_MODEL,
+    WHISPER_LONG_AUDIO_MODEL,
+    LONG_AUDIO_MODEL_SECONDS,
+    TRANSCRIBE_OPTIONS,
+    LONG_AUDIO_THRESHOLD_SECONDS,
+    LONG_AUDIO_CHUNK_SECONDS,
+    LONG_AUDIO_OVERLAP_SECONDS,
+    LONG_AUDIO_PROCESSES,
+    PROGRESS_CHUNK_SECONDS,
+    MODEL_MEMORY_BUDGET_MB,
+)
+from .model_registry import ModelRegistry, model_registry, configure_threads
+from .jobs import PRIORITY_BULK, PRIORITY_NORMAL, PRIORITY_HIGH
+from .chunking import plan_chunks, merge_chunk_results
+from .audio_loader import load_audio, SAMPLE_RATE
+
+def _run_whisper(model, audio: np.ndarray) -> Dict:
+    return whisper.transcribe(model, audio, **TRANSCRIBE_OPTIONS)
+
+def select_model(duration: float, priority: int = PRIORITY_NORMAL) -> str:
+    """
+    Whisper model for a recording of `duration` seconds. Bulk jobs and very
+    long recordings use the smaller models configured for them, if any.
+    """
+    if priority <= PRIORITY_BULK and WHISPER_BULK_MODEL:
+        return WHISPER_BULK_MODEL
+    if priority < PRIORITY_HIGH and WHISPER_LONG_AUDIO_MODEL and duration > LONG_AUDIO_MODEL_SECONDS:
+        return WHISPER_LONG_AUDIO_MODEL
+    return WHISPER_MODEL
+
+def _init_chunk_process(threads: int, memory_budget_mb: int) -> None:
+    # Split the worker's cores and model budget between the chunk processes
+    # instead of oversubscribing them
+    configure_threads(threads, 1)
+    model_registry.memory_budget_mb = memory_budget_mb
+
+def _transcribe_chunk(model_name: str, audio: np.ndarray) -> Dict:
+    """
+    Transcribe one chunk inside a pool process, using that process's registry
+    """
+    with model_registry.acquire(model_name) as model:
+        return _run_whisper(model, audio)
 
 class TranscriptionService:
-    def __init__(self):
-        self.model = whisper.load_model("base.en", device="cuda" if torch.cuda.is_available() else "cpu")
+    def __init__(self, model_name: str = WHISPER_MODEL, registry: ModelRegistry = model_registry):
+        self.model_name = model_name
+        self.registry = registry
+        self._chunk_pool: Optional[ProcessPoolExecutor] = None
+        self._chunk_pool_lock = threading.Lock()
     
-    async def transcribe_audio(self, audio_path: str) -> Dict:
+    async def transcribe_audio(
+        self,
+        audio: Union[str, np.ndarray],
+        progress_callback: Optional[Callable[[float], None]] = None,
+        model_name: Optional[str] = None
+    ) -> Dict:
         """
-        Transcribe audio file using Whisper model and return timestamped transcript
+        Transcribe audio using Whisper model and return timestamped transcript.
+        Accepts a file path or already decoded 16 kHz mono float32 samples.
+        `progress_callback` receives the fraction of audio transcribed so far.
+        `model_name` overrides the service's default model.
         """
-        # Load and transcribe audio
-        result = whisper.transcribe(
-            self.model,
-            audio_path,
-            language="en",
-            detect_speech_segments=True
-        )
+        if isinstance(audio, str):
+            audio = load_audio(audio)
+        model_name = model_name or self.model_name
+        
+        if len(audio) / SAMPLE_RATE > LONG_AUDIO_THRESHOLD_SECONDS:
+            result = self._transcribe_long(audio, model_name, progress_callback)
+        else:
+            result = self._transcribe_in_process(audio, model_name, progress_callback)
         
         # Process segments and identify speakers
         processed_segments = self._process_segments(result["segments"])
@@ -25,8 +85,89 @@ class TranscriptionService:
         return {
             "segments": processed_segments,
             "text": result["text"],
-            "language": result["language"]
+            "language": result["language"],
+            "model": model_name
+        }
+    
+    def _transcribe_in_process(
+        self,
+        audio: np.ndarray,
+        model_name: str,
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> Dict:
+        """
+        Transcribe with the shared, already warm model, one piece of
+        PROGRESS_CHUNK_SECONDS after another, reporting progress after each
+        """
+        if PROGRESS_CHUNK_SECONDS > 0:
+            chunks = plan_chunks(
+                audio,
+                SAMPLE_RATE,
+                chunk_seconds=PROGRESS_CHUNK_SECONDS,
+                overlap_seconds=LONG_AUDIO_OVERLAP_SECONDS
+            )
+        else:
+            chunks = [(0, len(audio), 0, len(audio))]
+        results = []
+        with self.registry.acquire(model_name) as model:
+            for start, end, _, core_end in chunks:
+                results.append(_run_whisper(model, audio[start:end]))
+                if progress_callback:
+                    progress_callback(core_end / max(1, len(audio)))
+        if len(chunks) == 1:
+            return results[0]
+        return merge_chunk_results(results, chunks, SAMPLE_RATE)
+    
+    def _transcribe_long(
+        self,
+        audio: np.ndarray,
+        model_name: str,
+        progress_callback: Optional[Callable[[float], None]] = None
+    ) -> Dict:
+        """
+        Split long recordings at quiet points into overlapping chunks,
+        transcribe them in parallel and stitch the results back together
+        """
+        chunks = plan_chunks(
+            audio,
+            SAMPLE_RATE,
+            chunk_seconds=LONG_AUDIO_CHUNK_SECONDS,
+            overlap_seconds=LONG_AUDIO_OVERLAP_SECONDS
+        )
+        pool = self._get_chunk_pool()
+        futures = {
+            pool.submit(_transcribe_chunk, model_name, audio[start:end]): index
+            for index, (start, end, _, _) in enumerate(chunks)
         }
+        results = [None] * len(chunks)
+        transcribed = 0
+        for future in as_completed(futures):
+            index = futures[future]
+            results[index] = future.result()
+            _, _, core_start, core_end = chunks[index]
+            transcribed += core_end - core_start
+            if progress_callback:
+                progress_callback(transcribed / len(audio))
+        return merge_chunk_results(results, chunks, SAMPLE_RATE)
+    
+    def _get_chunk_pool(self) -> ProcessPoolExecutor:
+        with self._chunk_pool_lock:
+            if self._chunk_pool is None:
+                # The worker has sized this process's thread pool to its
+                # share of the cores; the chunk processes divide that share
+                cores = max(1, torch.get_num_threads())
+                processes = max(1, min(LONG_AUDIO_PROCESSES or cores, cores))
+                threads = max(1, cores // processes)
+                budget_mb = max(1, MODEL_MEMORY_BUDGET_MB // processes) if MODEL_MEMORY_BUDGET_MB else 0
+                # Spawn rather than fork: forking after torch has started its
+                # thread pools can deadlock the children
+                self._chunk_pool = ProcessPoolExecutor(
+                    max_workers=processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_chunk_process,
+                    initargs=(threads, budget_mb)
+                )
+            return self._chunk_pool
     
     def _process_segments(self, segments: List) -> List[Dict]:
         """
@@ -56,9 +197,12 @@ class TranscriptionService:
 
 transcription_service = TranscriptionService()
 
-async def transcribe_audio(audio_path: str) -> Dict:
+async def transcribe_audio(
+    audio: Union[str, np.ndarray],
+    progress_callback: Optional[Callable[[float], None]] = None,
+    model_name: Optional[str] = None
+) -> Dict:
     """
     Wrapper function for transcription service
     """
-    service = TranscriptionService()
-    return await service.transcribe_audio(audio_path)
\ No newline at end of file
+    return await transcription_service.transcribe_audio(audio, progress_callback, model_name)
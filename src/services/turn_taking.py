@@ -0,0 +1,205 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models.database import Segment
+from .metrics import timed_query
+
+def speech_bounds(segments: List[Dict], words: Optional[Sequence[List[Dict]]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Start and end of the speech in each segment. Word timestamps are tighter
+    than Whisper's segment boundaries, which include surrounding silence;
+    segments without words keep their own boundaries. Without `words` the
+    word lists inside the segments are used.
+    """
+    if words is None:
+        words = [segment.get("words") for segment in segments]
+    starts = np.array([segment["start"] for segment in segments], dtype=np.float64)
+    ends = np.array([segment["end"] for segment in segments], dtype=np.float64)
+    for index, segment_words in enumerate(words or []):
+        if index < len(segments) and segment_words:
+            starts[index] = segment_words[0]["start"]
+            ends[index] = segment_words[-1]["end"]
+    return starts, ends
+
+def _turn_totals(
+    conversation: np.ndarray,
+    key: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    questions: np.ndarray,
+    n_keys: int
+) -> Dict[str, np.ndarray]:
+    """
+    Run-length encode segments into turns and total them per key.
+
+    Segments must be sorted by conversation and time; `key` groups them for
+    the totals (a speaker, or a speaker of a user) and also marks the turn
+    boundaries: a turn is a run of consecutive segments of one conversation
+    with the same key. A turn starting before the previous one ended is an
+    interruption by its speaker; otherwise the gap is that speaker's
+    response latency.
+    """
+    if len(key) == 0:
+        zeros = np.zeros(n_keys)
+        return {
+            "talk_time": zeros, "turns": zeros, "longest_turn": zeros, "questions": zeros,
+            "interruptions": zeros, "overlap": zeros, "latency": zeros, "responses": zeros,
+            "turn_count": 0, "gaps": np.zeros(0)
+        }
+
+    boundary = np.empty(len(key), dtype=bool)
+    boundary[0] = True
+    boundary[1:] = (key[1:] != key[:-1]) | (conversation[1:] != conversation[:-1])
+    first = np.flatnonzero(boundary)
+
+    turn_key = key[first]
+    turn_conversation = conversation[first]
+    turn_start = starts[first]
+    turn_end = np.maximum.reduceat(ends, first)
+
+    # Transitions between consecutive turns of the same conversation
+    same = turn_conversation[1:] == turn_conversation[:-1]
+    gaps = (turn_start[1:] - turn_end[:-1])[same]
+    responder = turn_key[1:][same]
+    overlapping = gaps < 0
+
+    longest = np.zeros(n_keys)
+    np.maximum.at(longest, turn_key, turn_end - turn_start)
+    return {
+        "talk_time": np.bincount(key, weights=ends - starts, minlength=n_keys),
+        "turns": np.bincount(turn_key, minlength=n_keys).astype(np.float64),
+        "longest_turn": longest,
+        "questions": np.bincount(key, weights=questions, minlength=n_keys),
+        "interruptions": np.bincount(responder, weights=overlapping, minlength=n_keys),
+        "overlap": np.bincount(responder, weights=np.where(overlapping, -gaps, 0.0), minlength=n_keys),
+        "latency": np.bincount(responder, weights=np.where(overlapping, 0.0, gaps), minlength=n_keys),
+        "responses": np.bincount(responder, weights=~overlapping, minlength=n_keys),
+        "turn_count": len(first),
+        "gaps": gaps
+    }
+
+def _speaker_stats(totals: Dict[str, np.ndarray], index: int, total_talk_time: float) -> Dict:
+    turns = totals["turns"][index]
+    responses = totals["responses"][index]
+    talk_time = float(totals["talk_time"][index])
+    return {
+        "turns": int(turns),
+        "talk_time": round(talk_time, 3),
+        "talk_ratio": round(talk_time / total_talk_time, 4) if total_talk_time > 0 else 0.0,
+        "avg_turn_duration": round(talk_time / turns, 3) if turns else 0.0,
+        "longest_monologue": round(float(totals["longest_turn"][index]), 3),
+        "questions": int(totals["questions"][index]),
+        "questions_per_turn": round(float(totals["questions"][index]) / turns, 4) if turns else 0.0,
+        "interruptions": int(totals["interruptions"][index]),
+        "overlap_seconds": round(float(totals["overlap"][index]), 3),
+        "avg_response_latency": round(float(totals["latency"][index]) / responses, 3) if responses else None
+    }
+
+def analyze_turn_taking(
+    speakers: List[str],
+    segments: List[Dict],
+    words: Optional[Sequence[List[Dict]]] = None
+) -> Dict:
+    """
+    Turn-taking and interaction statistics for one conversation with any
+    number of speakers: talk ratio, turns, longest monologue, questions per
+    turn, interruptions and overlap, and response latency. Timings come
+    from word timestamps where available, see speech_bounds.
+    """
+    labels, codes = np.unique(np.asarray(speakers, dtype=object).astype(str), return_inverse=True)
+    starts, ends = speech_bounds(segments, words)
+    questions = np.array([segment.get("text", "").count("?") for segment in segments], dtype=np.float64)
+    totals = _turn_totals(np.zeros(len(codes), dtype=np.int64), codes, starts, ends, questions, len(labels))
+
+    total_talk_time = float(totals["talk_time"].sum())
+    gaps = totals["gaps"]
+    latencies = gaps[gaps >= 0]
+    return {
+        "total_turns": totals["turn_count"],
+        "speakers": {
+            str(label): _speaker_stats(totals, index, total_talk_time)
+            for index, label in enumerate(labels)
+        },
+        "interruptions": int((gaps < 0).sum()),
+        "overlap_seconds": round(float(np.maximum(-gaps, 0).sum()), 3),
+        "response_latency": {
+            "mean": round(float(latencies.mean()), 3) if len(latencies) else None,
+            "median": round(float(np.median(latencies)), 3) if len(latencies) else None
+        }
+    }
+
+@timed_query("turn_taking_report")
+def turn_taking_report(
+    db: Session,
+    user_id: Optional[int] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Dict:
+    """
+    Turn-taking statistics over all matching conversations at once, per
+    user and for the whole team, from the segments table. The rows are
+    read as plain tuples into arrays and encoded in one vectorized pass;
+    no conversation JSON is loaded.
+    """
+    query = db.query(
+        Segment.conversation_id,
+        Segment.user_id,
+        Segment.speaker,
+        Segment.speech_start,
+        Segment.speech_end,
+        Segment.start,
+        Segment.end,
+        Segment.questions
+    )
+    if user_id is not None:
+        query = query.filter(Segment.user_id == user_id)
+    if start_date:
+        query = query.filter(Segment.created_at >= start_date)
+    if end_date:
+        query = query.filter(Segment.created_at <= end_date)
+    rows = query.order_by(Segment.conversation_id, Segment.segment_index).all()
+
+    if rows:
+        conversation_ids, user_ids, speakers, speech_starts, speech_ends, starts, ends, questions = zip(*rows)
+    else:
+        conversation_ids = user_ids = speakers = speech_starts = speech_ends = starts = ends = questions = ()
+    conversation = np.array(conversation_ids, dtype=np.int64)
+    # Rows stored before speech bounds were recorded fall back to the segment
+    starts = np.array([s if s is not None else d for s, d in zip(speech_starts, starts)], dtype=np.float64)
+    ends = np.array([e if e is not None else d for e, d in zip(speech_ends, ends)], dtype=np.float64)
+    questions = np.array([q or 0 for q in questions], dtype=np.float64)
+    speaker_labels, speaker_codes = np.unique(np.array([s or "Unknown" for s in speakers], dtype=str), return_inverse=True)
+    # -1 groups conversations without an owner
+    user_labels, user_codes = np.unique(np.array([u if u is not None else -1 for u in user_ids], dtype=np.int64), return_inverse=True)
+
+    def summarize(totals: Dict[str, np.ndarray], offset: int) -> Dict:
+        talk_times = totals["talk_time"][offset:offset + len(speaker_labels)]
+        total_talk_time = float(talk_times.sum())
+        return {
+            str(label): _speaker_stats(totals, offset + index, total_talk_time)
+            for index, label in enumerate(speaker_labels)
+            if totals["turns"][offset + index]
+        }
+
+    n_speakers = len(speaker_labels)
+    team = _turn_totals(conversation, speaker_codes, starts, ends, questions, n_speakers)
+    per_user = _turn_totals(
+        conversation, user_codes * n_speakers + speaker_codes, starts, ends, questions, len(user_labels) * n_speakers
+    )
+    conversations_per_user = np.bincount(
+        user_codes[np.flatnonzero(np.diff(conversation, prepend=-1))], minlength=len(user_labels)
+    )
+    return {
+        "conversations": int(len(np.unique(conversation))),
+        "team": summarize(team, 0),
+        "users": [
+            {
+                "user_id": int(user) if user >= 0 else None,
+                "conversations": int(conversations_per_user[index]),
+                "speakers": summarize(per_user, index * n_speakers)
+            }
+            for index, user in enumerate(user_labels)
+        ]
+    }
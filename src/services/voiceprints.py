@@ -0,0 +1,123 @@
+import datetime
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..config import VOICEPRINT_MAX_PITCH_SEMITONES
+from ..models.database import Voiceprint
+from .audio_features import FEATURE_DIM, PITCH_FEATURE, SAMPLE_RATE, frame_features, segment_features
+
+# Enrollment audio is summarized in windows of about a transcript segment
+ENROLLMENT_WINDOW_SECONDS = 3.0
+# Windows with less voiced speech than this are silence or noise
+MIN_VOICED_RATIO = 0.3
+
+def voiceprint_embedding(audios: List[np.ndarray]) -> Tuple[np.ndarray, int]:
+    """
+    Mean segment feature vector over the speech windows of recordings of
+    one speaker, with the number of windows used
+    """
+    window = int(ENROLLMENT_WINDOW_SECONDS * SAMPLE_RATE)
+    features = []
+    for audio in audios:
+        n_windows = len(audio) // window
+        if n_windows == 0:
+            continue
+        spans = [
+            (index * ENROLLMENT_WINDOW_SECONDS, (index + 1) * ENROLLMENT_WINDOW_SECONDS)
+            for index in range(n_windows)
+        ]
+        windows = segment_features(frame_features(audio), spans)
+        # The last feature is the voiced ratio of the window
+        features.append(windows[windows[:, -1] >= MIN_VOICED_RATIO])
+    speech = np.concatenate(features) if features else np.zeros((0, FEATURE_DIM), dtype=np.float32)
+    if len(speech) == 0:
+        raise ValueError("No speech found in the enrollment audio")
+    return speech.mean(axis=0).astype(np.float32), len(speech)
+
+def enroll(db: Session, name: str, audios: List[np.ndarray], user_id: Optional[int] = None) -> Voiceprint:
+    """
+    Store the voiceprint of a rep from recordings of them speaking alone.
+    Enrolling an existing name replaces its voiceprint.
+    """
+    embedding, windows = voiceprint_embedding(audios)
+    now = datetime.datetime.utcnow()
+    voiceprint = db.query(Voiceprint).filter(Voiceprint.name == name).first()
+    if voiceprint is None:
+        voiceprint = Voiceprint(name=name, created_at=now)
+        db.add(voiceprint)
+    voiceprint.user_id = user_id
+    voiceprint.embedding = embedding.tobytes()
+    voiceprint.windows = windows
+    voiceprint.updated_at = now
+    db.commit()
+    return voiceprint
+
+class VoiceprintIndex:
+    """
+    All enrolled voiceprints, loaded once and matched against the speakers
+    of each call
+    """
+    def __init__(self, max_semitones: float = VOICEPRINT_MAX_PITCH_SEMITONES):
+        self.max_semitones = max_semitones
+        self.names: List[str] = []
+        self.matrix = np.zeros((0, FEATURE_DIM), dtype=np.float32)
+        # (count, last update) of the table when the matrix was built
+        self._state = None
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def refresh(self, db: Session) -> None:
+        """
+        Reload the voiceprints if any were enrolled, replaced or deleted
+        since the last load. Cheap enough to call before every batch.
+        """
+        state = tuple(db.query(func.count(Voiceprint.id), func.max(Voiceprint.updated_at)).one())
+        if state == self._state:
+            return
+        voiceprints = db.query(Voiceprint).order_by(Voiceprint.id).all()
+        self.names = [voiceprint.name for voiceprint in voiceprints]
+        self.matrix = np.array(
+            [np.frombuffer(voiceprint.embedding, dtype=np.float32) for voiceprint in voiceprints],
+            dtype=np.float32
+        ).reshape(len(voiceprints), FEATURE_DIM)
+        self._state = state
+
+    def match(self, features: np.ndarray, labels: np.ndarray) -> Dict[int, str]:
+        """
+        Names of the speakers of one call, given its segment features and
+        their cluster labels, as cluster -> voiceprint name. Each voiceprint
+        names at most one cluster, the closest within the pitch tolerance.
+
+        Speakers are compared by pitch only: MFCC means shift with the
+        microphone and line far more than they differ between voices, so
+        they separate speakers within a call but not across recordings.
+        """
+        if not self.names or len(labels) == 0:
+            return {}
+        pitches = []
+        for cluster in range(labels.max() + 1):
+            voiced = features[labels == cluster, PITCH_FEATURE]
+            voiced = voiced[voiced > 0]
+            pitches.append(float(np.median(voiced)) if len(voiced) else np.nan)
+        enrolled = self.matrix[:, PITCH_FEATURE].astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            distance = np.abs(12 * np.log2(np.array(pitches)[:, None] / enrolled[None, :]))
+        distance = np.where(np.isfinite(distance), distance, np.inf)
+
+        names: Dict[int, str] = {}
+        used = set()
+        for flat in np.argsort(distance, axis=None, kind="stable"):
+            cluster, voice = np.unravel_index(flat, distance.shape)
+            if distance[cluster, voice] > self.max_semitones:
+                break
+            if cluster in names or voice in used:
+                continue
+            names[int(cluster)] = self.names[voice]
+            used.add(voice)
+        return names
+
+# Shared by the speaker identifier of each process
+voiceprint_index = VoiceprintIndex()
@@ -0,0 +1,108 @@
+import struct
+import zlib
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+# magic, segment count, word count, vocabulary size, id width in bytes
+HEADER = struct.Struct("<4sIIIB")
+MAGIC = b"WTS1"
+
+def pack_words(segments: List[Dict]) -> bytes:
+    """
+    Encode the words of every segment as a compressed columnar blob:
+    per-segment word counts, float32 start/end/confidence arrays and word
+    ids into a table of distinct word strings. Keys other than text, start,
+    end and confidence are not kept.
+    """
+    words = [word for segment in segments for word in segment.get("words") or []]
+    counts = np.array([len(segment.get("words") or []) for segment in segments], dtype="<u4")
+    starts = np.array([word["start"] for word in words], dtype="<f4")
+    ends = np.array([word["end"] for word in words], dtype="<f4")
+    confidences = np.array([word.get("confidence", np.nan) for word in words], dtype="<f4")
+
+    vocabulary: Dict[str, int] = {}
+    ids = np.array([vocabulary.setdefault(word["text"], len(vocabulary)) for word in words], dtype="<u4")
+    id_width = 2 if len(vocabulary) <= 0xFFFF else 4
+    if id_width == 2:
+        ids = ids.astype("<u2")
+    strings = "\0".join(vocabulary).encode("utf-8")
+
+    payload = b"".join([
+        HEADER.pack(MAGIC, len(segments), len(words), len(vocabulary), id_width),
+        counts.tobytes(),
+        starts.tobytes(),
+        ends.tobytes(),
+        confidences.tobytes(),
+        ids.tobytes(),
+        strings
+    ])
+    return zlib.compress(payload, 6)
+
+def unpack_words(blob: bytes) -> List[List[Dict]]:
+    """
+    Decode a blob from pack_words into one list of word dicts per segment
+    """
+    payload = zlib.decompress(blob)
+    magic, n_segments, n_words, n_vocabulary, id_width = HEADER.unpack_from(payload)
+    if magic != MAGIC:
+        raise ValueError("Not a word timestamp blob")
+
+    offset = HEADER.size
+    def take(dtype: str, count: int) -> np.ndarray:
+        nonlocal offset
+        array = np.frombuffer(payload, dtype=dtype, count=count, offset=offset)
+        offset += array.nbytes
+        return array
+
+    counts = take("<u4", n_segments)
+    # Rounded in float64 so the JSON shows 1.23 rather than 1.2300000190734863
+    starts = take("<f4", n_words).astype(np.float64).round(3).tolist()
+    ends = take("<f4", n_words).astype(np.float64).round(3).tolist()
+    confidences = take("<f4", n_words).astype(np.float64).round(3).tolist()
+    ids = take("<u2" if id_width == 2 else "<u4", n_words).tolist()
+    vocabulary = payload[offset:].decode("utf-8").split("\0") if n_vocabulary else []
+
+    words = [
+        {"text": vocabulary[word_id], "start": start, "end": end, "confidence": confidence}
+        for word_id, start, end, confidence in zip(ids, starts, ends, confidences)
+    ]
+    for word in words:
+        if word["confidence"] != word["confidence"]:  # NaN: not reported
+            del word["confidence"]
+
+    segments = []
+    position = 0
+    for count in counts.tolist():
+        segments.append(words[position:position + count])
+        position += count
+    return segments
+
+def strip_words(segments: List[Dict]) -> List[Dict]:
+    """
+    Copies of the segments without their word lists
+    """
+    return [{key: value for key, value in segment.items() if key != "words"} for segment in segments]
+
+def split_words(transcript: Dict, analysis: Dict) -> Tuple[Dict, Dict, Optional[bytes]]:
+    """
+    Separate word-level detail from a transcript and its analysis. Returns
+    both without words plus the packed words, or None if there were none.
+    The inputs are not modified.
+    """
+    segments = transcript.get("segments", [])
+    has_words = any(segment.get("words") for segment in segments)
+    blob = pack_words(segments) if has_words else None
+    transcript = {**transcript, "segments": strip_words(segments)}
+    if "segments" in analysis:
+        analysis = {**analysis, "segments": strip_words(analysis["segments"])}
+    return transcript, analysis, blob
+
+def conversation_words(conversation) -> List[List[Dict]]:
+    """
+    Word lists per segment of a conversation, decoded on demand. Rows saved
+    before words were packed still carry them inside the transcript.
+    """
+    if conversation.packed_words:
+        return unpack_words(conversation.packed_words)
+    segments = (conversation.transcript or {}).get("segments", [])
+    return [segment.get("words", []) for segment in segments]
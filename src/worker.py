@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from typing import Dict, List
+
+from .config import (
+    WORKER_COUNT, WORKER_POLL_INTERVAL, JOB_LEASE_SECONDS, WHISPER_PRELOAD_MODELS, BATCH_SIZE,
+    TORCH_INTRA_OP_THREADS, TORCH_INTER_OP_THREADS,
+    WORKER_METRICS_PORT, PROFILE_CONVERSATION_IDS
+)
+from .models.database import session_scope, Conversation, engine
+from .services.jobs import job_queue
+from .services.metrics import JOBS_PROCESSED, start_metrics_server
+from .services.profiling import profile_conversation
+from .services.progress import progress_tracker
+from .services.transcript_cache import transcript_cache
+
+logger = logging.getLogger(__name__)
+
+def _run_jobs(jobs: List) -> Dict[int, Exception]:
+    """
+    Run the pipeline for a batch of jobs; returns errors by conversation id
+    """
+    # Imported here so every worker process loads its own models
+    from .services.pipeline import transcribe_and_analyze_batch
+    from .services.reanalysis import reanalyze_batch, REANALYZE_JOB
+
+    priorities = {job.conversation_id: job.priority for job in jobs}
+    errors: Dict[int, Exception] = {}
+    batch = []
+    reanalyze = []
+    with session_scope() as db:
+        for job in jobs:
+            if job.kind == REANALYZE_JOB:
+                reanalyze.append(job.conversation_id)
+            # Profiled conversations run on their own so the profile covers only them
+            elif job.profile or job.conversation_id in PROFILE_CONVERSATION_IDS:
+                with profile_conversation(job.conversation_id):
+                    errors.update(asyncio.run(
+                        transcribe_and_analyze_batch([job.conversation_id], db, priorities)
+                    ))
+            else:
+                batch.append(job.conversation_id)
+        if batch:
+            errors.update(asyncio.run(transcribe_and_analyze_batch(batch, db, priorities)))
+        if reanalyze:
+            errors.update(asyncio.run(reanalyze_batch(reanalyze, db)))
+    return errors
+
+def _batch_limit(db, num_workers: int) -> int:
+    # Share the backlog between the workers instead of letting one claim it all
+    pending = job_queue.pending_count(db)
+    return max(1, min(BATCH_SIZE, -(-pending // num_workers)))
+
+def _keep_lease(job_ids: List[int], worker_id: str, done: threading.Event) -> None:
+    """
+    Periodically renew the job leases so long transcriptions aren't requeued
+    """
+    while not done.wait(JOB_LEASE_SECONDS / 3):
+        try:
+            with session_scope() as db:
+                for job_id in job_ids:
+                    job_queue.heartbeat(db, job_id, worker_id)
+        except Exception:
+            logger.exception("Failed to renew leases for jobs %s", job_ids)
+
+def _mark_failed(conversation_id: int, error: str) -> None:
+    with session_scope() as db:
+        db.query(Conversation).filter(Conversation.id == conversation_id).update(
+            {Conversation.status: "error"}, synchronize_session=False
+        )
+    progress_tracker.update_progress(str(conversation_id), 0, status="error", error=error)
+
+def worker_loop(
+    worker_id: str,
+    stop: multiprocessing.Event,
+    poll_interval: float = WORKER_POLL_INTERVAL,
+    metrics_port: int = 0,
+    num_workers: int = WORKER_COUNT
+) -> None:
+    """
+    Claim and execute batches of jobs until asked to stop
+    """
+    logging.basicConfig(level=logging.INFO)
+    # Don't reuse connections inherited from the parent process
+    engine.dispose()
+
+    if metrics_port:
+        start_metrics_server(metrics_port)
+
+    # Size torch's thread pools before the first model call, so the workers
+    # together don't run more threads than there are cores
+    from .services.model_registry import model_registry, configure_threads
+    configure_threads(
+        TORCH_INTRA_OP_THREADS or (os.cpu_count() or 1) // num_workers,
+        TORCH_INTER_OP_THREADS
+    )
+
+    # Keep the configured models warm so the first job doesn't pay the load cost
+    model_registry.preload(WHISPER_PRELOAD_MODELS)
+
+    while not stop.is_set():
+        with session_scope() as db:
+            jobs = job_queue.claim_batch(db, worker_id, _batch_limit(db, num_workers))
+            for job in jobs:
+                db.expunge(job)
+
+        if not jobs:
+            stop.wait(poll_interval)
+            continue
+
+        logger.info(
+            "Worker %s running %d jobs (conversations %s)",
+            worker_id, len(jobs), [job.conversation_id for job in jobs]
+        )
+        done = threading.Event()
+        lease = threading.Thread(target=_keep_lease, args=([job.id for job in jobs], worker_id, done), daemon=True)
+        lease.start()
+        try:
+            errors = _run_jobs(jobs)
+        except Exception as e:
+            logger.exception("Batch failed")
+            errors = {job.conversation_id: e for job in jobs}
+        finally:
+            done.set()
+            lease.join()
+
+        with session_scope() as db:
+            for job in jobs:
+                error = errors.get(job.conversation_id)
+                if error is None:
+                    job_queue.complete(db, job.id)
+                    JOBS_PROCESSED.inc(result="completed")
+                    continue
+                logger.error("Job %s failed", job.id, exc_info=error)
+                retrying = job_queue.fail(db, job.id, str(error))
+                # A failed re-analysis leaves the previous results in place
+                if not retrying and job.kind == "transcribe":
+                    _mark_failed(job.conversation_id, str(error))
+                JOBS_PROCESSED.inc(result="retry" if retrying else "failed")
+
+def run_pool(num_workers: int = WORKER_COUNT) -> None:
+    """
+    Start the worker processes and restart any that die
+    """
+    logging.basicConfig(level=logging.INFO)
+    stop = multiprocessing.Event()
+    host = socket.gethostname()
+
+    def spawn(index: int) -> multiprocessing.Process:
+        worker_id = f"{host}:{os.getpid()}:{index}"
+        metrics_port = WORKER_METRICS_PORT + index if WORKER_METRICS_PORT else 0
+        process = multiprocessing.Process(
+            target=worker_loop,
+            args=(worker_id, stop),
+            kwargs={"metrics_port": metrics_port, "num_workers": num_workers}
+        )
+        process.start()
+        return process
+
+    # Entries from an older model or pipeline version can never be hit again
+    with session_scope() as db:
+        purged = transcript_cache.purge_stale(db)
+    if purged:
+        logger.info("Purged %d stale transcript cache entries", purged)
+
+    processes = {index: spawn(index) for index in range(num_workers)}
+    logger.info("Started %d transcription workers", num_workers)
+    try:
+        while True:
+            # Jobs left behind by crashed workers go back to the queue
+            with session_scope() as db:
+                requeued, failed = job_queue.requeue_stale(db)
+                failed = [(job.conversation_id, job.kind) for job in failed]
+            if requeued:
+                logger.warning("Requeued %d abandoned jobs", requeued)
+            for conversation_id, kind in failed:
+                logger.error("Conversation %s failed: worker lease expired on its last attempt", conversation_id)
+                # A failed re-analysis leaves the previous results in place
+                if kind == "transcribe":
+                    _mark_failed(conversation_id, "Worker lease expired")
+
+            for index, process in processes.items():
+                if not process.is_alive():
+                    logger.warning("Worker %d exited with code %s, restarting", index, process.exitcode)
+                    processes[index] = spawn(index)
+            time.sleep(WORKER_POLL_INTERVAL * 5)
+    except KeyboardInterrupt:
+        stop.set()
+        for process in processes.values():
+            process.join()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the transcription worker pool")
+    parser.add_argument("--workers", type=int, default=WORKER_COUNT)
+    args = parser.parse_args()
+    run_pool(args.workers)
@@ -0,0 +1,33 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+# Point the database, uploads and indexes at a scratch directory before any
+# module of the app is imported; the database is created on import
+_scratch = tempfile.mkdtemp(prefix="sales-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_scratch}/test.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_scratch, "uploads"))
+os.environ.setdefault("SEMANTIC_INDEX_DIR", os.path.join(_scratch, "semantic_index"))
+os.environ.setdefault("PROFILE_DIR", os.path.join(_scratch, "profiles"))
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import pytest
+
+@pytest.fixture
+def db():
+    """
+    A session on the scratch database, emptied again after the test
+    """
+    from src.models.database import Base, SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.rollback()
+        for table in reversed(Base.metadata.sorted_tables):
+            session.execute(table.delete())
+        session.commit()
+        session.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from src.services.audio_storage import iter_file, parse_range
+
+@pytest.mark.parametrize("header, expected", [
+    (None, None),
+    ("", None),
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=900-5000", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" bytes=10-10 ", (10, 10)),
+    # Multiple or non-byte ranges get the whole file
+    ("bytes=0-1,5-6", None),
+    ("items=0-1", None),
+    ("bytes=-", None),
+])
+def test_parse_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=1000-", 1000),
+    ("bytes=500-100", 1000),
+    ("bytes=-0", 1000),
+    ("bytes=-10", 0),
+    ("bytes=0-", 0),
+])
+def test_unsatisfiable_ranges(header, size):
+    with pytest.raises(ValueError):
+        parse_range(header, size)
+
+def test_iter_file_reads_the_inclusive_range(tmp_path):
+    path = tmp_path / "call.flac"
+    path.write_bytes(bytes(range(256)) * 4)
+    assert b"".join(iter_file(str(path), 250, 260, chunk_size=4)) == (bytes(range(256)) * 2)[250:261]
+    assert b"".join(iter_file(str(path), 1020, 2000)) == bytes(range(252, 256))
@@ -0,0 +1,67 @@
+import numpy as np
+
+from src.services.chunking import merge_chunk_results, plan_chunks
+
+SAMPLE_RATE = 16000
+
+def _noise_with_pauses(seconds: int, pauses) -> np.ndarray:
+    audio = np.random.default_rng(0).normal(0, 0.1, seconds * SAMPLE_RATE).astype(np.float32)
+    for at in pauses:
+        audio[int(at * SAMPLE_RATE):int((at + 0.5) * SAMPLE_RATE)] = 0
+    return audio
+
+def test_short_audio_is_one_chunk():
+    audio = np.zeros(10 * SAMPLE_RATE, dtype=np.float32)
+    assert plan_chunks(audio, SAMPLE_RATE, chunk_seconds=30, overlap_seconds=2) == [
+        (0, len(audio), 0, len(audio))
+    ]
+
+def test_cores_tile_the_audio_and_cut_at_pauses():
+    audio = _noise_with_pauses(100, [31, 63])
+    chunks = plan_chunks(audio, SAMPLE_RATE, chunk_seconds=30, overlap_seconds=2)
+
+    assert chunks[0][2] == 0 and chunks[-1][3] == len(audio)
+    for (_, _, _, core_end), (_, _, core_start, _) in zip(chunks, chunks[1:]):
+        assert core_end == core_start
+    # Each cut lands inside a pause rather than on the nominal boundary
+    assert not np.any(audio[chunks[1][2]:chunks[1][2] + 160])
+    assert not np.any(audio[chunks[2][2]:chunks[2][2] + 160])
+    for start, end, core_start, core_end in chunks:
+        assert start == max(0, core_start - 2 * SAMPLE_RATE)
+        assert end == min(len(audio), core_end + 2 * SAMPLE_RATE)
+
+def test_short_tail_is_merged_into_the_last_chunk():
+    audio = _noise_with_pauses(65, [])
+    chunks = plan_chunks(audio, SAMPLE_RATE, chunk_seconds=30, overlap_seconds=2)
+    assert len(chunks) == 2
+
+def _word(text: str, start: float, end: float) -> dict:
+    return {"text": text, "start": start, "end": end}
+
+def test_merge_shifts_timestamps_and_drops_overlap_duplicates():
+    # Core boundary at 10 s; the second chunk starts 2 s earlier
+    chunks = [
+        (0, 12 * SAMPLE_RATE, 0, 10 * SAMPLE_RATE),
+        (8 * SAMPLE_RATE, 20 * SAMPLE_RATE, 10 * SAMPLE_RATE, 20 * SAMPLE_RATE)
+    ]
+    first = {"language": "en", "segments": [
+        {"text": " hello there friend", "start": 8.5, "end": 11.5, "words": [
+            _word(" hello", 8.5, 9.0), _word(" there", 9.2, 9.8), _word(" friend", 10.5, 11.5)
+        ]}
+    ]}
+    second = {"language": "en", "segments": [
+        {"text": " there friend", "start": 1.2, "end": 3.5, "words": [
+            _word(" there", 1.2, 1.8), _word(" friend", 2.5, 3.5)
+        ]},
+        {"text": " bye", "start": 5.0, "end": 5.5, "words": [_word(" bye", 5.0, 5.5)]}
+    ]}
+
+    merged = merge_chunk_results([first, second], chunks, SAMPLE_RATE)
+
+    words = [word["text"].strip() for segment in merged["segments"] for word in segment["words"]]
+    assert words == ["hello", "there", "friend", "bye"]
+    assert [segment["id"] for segment in merged["segments"]] == [0, 1, 2]
+    assert merged["segments"][1]["start"] == 10.5
+    assert merged["segments"][2]["start"] == 13.0
+    assert merged["text"] == " hello there friend bye"
+    assert merged["language"] == "en"
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+from src.models.database import Job
+from src.services.jobs import PRIORITY_BULK, PRIORITY_HIGH, JobQueue
+
+def _queue(**options) -> JobQueue:
+    return JobQueue(**{"max_attempts": 3, "retry_base_seconds": 10, "lease_seconds": 60, **options})
+
+def test_claim_takes_higher_priority_then_oldest(db):
+    queue = _queue()
+    bulk = queue.enqueue(db, 1, priority=PRIORITY_BULK)
+    first = queue.enqueue(db, 2)
+    second = queue.enqueue(db, 3)
+    urgent = queue.enqueue(db, 4, priority=PRIORITY_HIGH)
+    db.commit()
+
+    claimed = [queue.claim(db, "worker-1").id for _ in range(4)]
+
+    assert claimed == [urgent.id, first.id, second.id, bulk.id]
+    assert queue.claim(db, "worker-1") is None
+    job = db.query(Job).get(first.id)
+    assert (job.status, job.locked_by, job.attempts) == ("running", "worker-1", 1)
+
+def test_claim_batch_skips_jobs_claimed_elsewhere_and_future_jobs(db):
+    queue = _queue()
+    jobs = [queue.enqueue(db, index) for index in range(4)]
+    jobs[3].run_after = datetime.utcnow() + timedelta(minutes=5)
+    db.commit()
+    taken = queue.claim(db, "worker-2")
+
+    batch = queue.claim_batch(db, "worker-1", limit=10)
+
+    assert [job.id for job in batch] == [jobs[1].id, jobs[2].id]
+    assert taken.id == jobs[0].id
+    assert queue.pending_count(db) == 1
+    assert queue.running_count(db) == 3
+
+def test_fail_retries_with_exponential_backoff(db):
+    queue = _queue()
+    job = queue.enqueue(db, 1)
+    db.commit()
+    job_id = job.id
+
+    delays = []
+    for _ in range(2):
+        queue.claim(db, "worker-1")
+        before = datetime.utcnow()
+        assert queue.fail(db, job_id, "boom") is True
+        job = db.query(Job).get(job_id)
+        assert (job.status, job.locked_by, job.error) == ("pending", None, "boom")
+        delays.append((job.run_after - before).total_seconds())
+        # Make the retry runnable now
+        job.run_after = datetime.utcnow()
+        db.commit()
+
+    assert 9 < delays[0] <= 10.5 and 19 < delays[1] <= 20.5
+    queue.claim(db, "worker-1")
+    assert queue.fail(db, job_id, "boom") is False
+    assert db.query(Job).get(job_id).status == "failed"
+
+def test_complete(db):
+    queue = _queue()
+    job = queue.enqueue(db, 1)
+    db.commit()
+    job_id = job.id
+    queue.claim(db, "worker-1")
+    queue.complete(db, job_id)
+    job = db.query(Job).get(job_id)
+    assert (job.status, job.locked_by) == ("completed", None)
+
+def test_requeue_stale_returns_abandoned_jobs(db):
+    queue = _queue()
+    jobs = [queue.enqueue(db, index) for index in range(3)]
+    db.commit()
+    abandoned, last_try, alive = (job.id for job in jobs)
+    for _ in range(3):
+        queue.claim(db, "worker-1")
+    expired = datetime.utcnow() - timedelta(seconds=120)
+    db.query(Job).filter(Job.id.in_([abandoned, last_try])).update(
+        {Job.locked_at: expired}, synchronize_session=False
+    )
+    db.query(Job).filter(Job.id == last_try).update({Job.attempts: 3}, synchronize_session=False)
+    db.commit()
+    queue.heartbeat(db, alive, "worker-1")
+
+    count, failed = queue.requeue_stale(db)
+
+    assert count == 1
+    assert [job.id for job in failed] == [last_try]
+    statuses = {job.id: (job.status, job.locked_by) for job in db.query(Job).populate_existing()}
+    assert statuses == {
+        abandoned: ("pending", None),
+        last_try: ("failed", None),
+        alive: ("running", "worker-1")
+    }
+    assert queue.claim(db, "worker-2").id == abandoned
@@ -0,0 +1,36 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from src.main import app, decode_cursor, encode_cursor
+from src.models.database import Conversation
+
+@pytest.mark.parametrize("conversation_id", [1, 42, 10 ** 12])
+def test_cursor_round_trip(conversation_id):
+    cursor = encode_cursor(conversation_id)
+    assert cursor.isascii() and "/" not in cursor and "+" not in cursor
+    assert decode_cursor(cursor) == conversation_id
+
+@pytest.mark.parametrize("cursor", ["abc", "", "é", encode_cursor(1)[:-1] + "!", "bm90LWFuLWlk"])
+def test_invalid_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+def test_listing_pages_newest_first(db):
+    db.add_all([Conversation(file_path=f"call-{index}.wav", status="completed") for index in range(5)])
+    db.commit()
+    ids = [conversation.id for conversation in db.query(Conversation).order_by(Conversation.id.desc())]
+    client = TestClient(app)
+
+    pages = []
+    cursor = None
+    while True:
+        page = client.get("/conversations", params={"limit": 2, **({"cursor": cursor} if cursor else {})}).json()
+        pages.append([item["id"] for item in page["items"]])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+
+    assert pages == [ids[0:2], ids[2:4], ids[4:5]]
+    assert client.get("/conversations", params={"cursor": "abc"}).status_code == 400
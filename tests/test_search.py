@@ -0,0 +1,39 @@
+import sqlite3
+
+import pytest
+
+from src.services.search import to_fts_query
+
+@pytest.mark.parametrize("query, expected", [
+    ("pricing", '"pricing"'),
+    ("pricing concerns", '"pricing" "concerns"'),
+    ('"next steps" contract', '"next steps" "contract"'),
+    ("integrat*", '"integrat"*'),
+    ("what's the price?", '"what\'s" "the" "price?"'),
+    ('AND OR NOT NEAR(a b) col:x', '"AND" "OR" "NOT" "NEAR(a" "b)" "col:x"'),
+    ('"" * ** "  "', ""),
+    ('say "hi', '"say" "hi"'),
+])
+def test_to_fts_query(query, expected):
+    assert to_fts_query(query) == expected
+
+def _docs(*texts) -> sqlite3.Connection:
+    db = sqlite3.connect(":memory:")
+    db.execute("CREATE VIRTUAL TABLE docs USING fts5(text)")
+    db.executemany("INSERT INTO docs VALUES (?)", [(text,) for text in texts])
+    return db
+
+def _match(db: sqlite3.Connection, query: str) -> list:
+    rows = db.execute("SELECT rowid FROM docs WHERE docs MATCH ? ORDER BY rowid", (to_fts_query(query),))
+    return [row[0] for row in rows]
+
+@pytest.mark.parametrize("query", ["price?", "NEAR(a b)", 'say "hi', "-x ^y", "pric*", '"next steps"'])
+def test_queries_are_valid_fts5(query):
+    # Raises sqlite3.OperationalError on a syntax error
+    _match(_docs("what is the price?", "next steps: say hi"), query)
+
+def test_prefix_and_phrase_matching():
+    db = _docs("our pricing is fair", "steps next", "next steps")
+    assert _match(db, "pric*") == [1]
+    assert _match(db, '"next steps"') == [3]
+    assert _match(db, "steps next") == [2, 3]
@@ -0,0 +1,54 @@
+import warnings
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import _voice, generate_conversation
+from src.services.audio_features import PITCH_FEATURE
+from src.services.speaker_identification import SpeakerIdentifier
+from src.services.voiceprints import VoiceprintIndex, voiceprint_embedding
+
+def _index(**voices) -> VoiceprintIndex:
+    """
+    A voiceprint index enrolled from clean synthetic recordings, name -> pitch
+    """
+    index = VoiceprintIndex()
+    index.names = list(voices)
+    index.matrix = np.array([
+        voiceprint_embedding([_voice(30, pitch, np.random.default_rng(seed))])[0]
+        for seed, pitch in enumerate(voices.values())
+    ])
+    return index
+
+def _labels(identifier: SpeakerIdentifier, n_speakers: int, seed: int) -> Counter:
+    audio, segments = generate_conversation(90, n_speakers, seed=seed)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        labels = identifier.identify_speakers(segments, audio)
+    return Counter(zip((segment["speaker"] for segment in segments), labels))
+
+@pytest.mark.parametrize("seed", range(3))
+def test_enrolled_rep_is_named_in_two_speaker_calls(seed):
+    # Synthetic calls give speaker_0 a 100 Hz voice
+    counts = _labels(SpeakerIdentifier(voiceprints=_index(Alice=100)), 2, seed)
+    assert {truth: label for truth, label in counts} == {"speaker_0": "Alice", "speaker_1": "Customer"}
+
+@pytest.mark.parametrize("seed", range(3))
+def test_unmatched_speakers_are_clustered_apart(seed):
+    counts = _labels(SpeakerIdentifier(voiceprints=_index(Alice=100)), 3, seed)
+    mapping = {truth: label for truth, label in counts}
+    assert len(mapping) == 3
+    assert mapping["speaker_0"] == "Alice"
+    assert {mapping["speaker_1"], mapping["speaker_2"]} == {"Customer", "Customer 2"}
+
+def test_unknown_voice_falls_back_to_roles():
+    counts = _labels(SpeakerIdentifier(voiceprints=_index(Bob=180)), 2, seed=5)
+    assert sorted(label for _, label in counts) == ["Customer", "Salesperson"]
+    assert len({truth for truth, _ in counts}) == 2
+
+def test_voiceprint_names_at_most_one_speaker():
+    index = _index(Alice=100)
+    features = np.zeros((4, index.matrix.shape[1]), dtype=np.float32)
+    features[:, PITCH_FEATURE] = [100, 101, 100, 101]
+    assert index.match(features, np.array([0, 1, 0, 1])) == {0: "Alice"}
@@ -0,0 +1,71 @@
+from datetime import date, datetime
+
+from src.models.database import Conversation, UserDailyStat
+from src.services.stats import ConversationStats
+
+def _analysis(duration: float, phases: dict, sentiments: dict) -> dict:
+    return {"summary": {"duration": duration, "phase_distribution": phases, "sentiment_summary": sentiments}}
+
+FIRST = _analysis(60.0, {"introduction": 20.0, "pitch": 40.0}, {"positive": 3, "neutral": 1})
+REVISED = _analysis(60.0, {"introduction": 10.0, "closing": 50.0}, {"positive": 2, "negative": 2})
+
+def _conversation(user_id, day: int) -> Conversation:
+    return Conversation(user_id=user_id, created_at=datetime(2026, 3, day, 12))
+
+def test_new_analyses_are_added_up(db):
+    stats = ConversationStats(db)
+    stats.record_analysis(_conversation(7, 2), None, FIRST)
+    stats.record_analysis(_conversation(7, 2), None, REVISED)
+    stats.record_analysis(_conversation(8, 3), None, FIRST)
+    db.commit()
+
+    assert stats.get_stats(7) == {
+        "total_conversations": 2,
+        "total_duration": 120.0,
+        "phase_distribution": {
+            "introduction": 30.0, "discovery": 0.0, "pitch": 40.0, "objection_handling": 0.0, "closing": 50.0
+        },
+        "sentiment_distribution": {"positive": 5, "neutral": 1, "negative": 2}
+    }
+    assert stats.get_stats(None)["total_conversations"] == 3
+    assert stats.get_stats(None, start_date=date(2026, 3, 3))["total_conversations"] == 1
+
+def test_replacing_an_analysis_applies_the_difference(db):
+    stats = ConversationStats(db)
+    conversation = _conversation(7, 2)
+    stats.record_analysis(conversation, None, FIRST)
+    stats.record_analysis(conversation, FIRST, REVISED)
+    db.commit()
+
+    result = stats.get_stats(7)
+    assert result["total_conversations"] == 1
+    assert result["phase_distribution"]["pitch"] == 0.0
+    assert result["phase_distribution"]["closing"] == 50.0
+    assert result["sentiment_distribution"] == {"positive": 2, "neutral": 0, "negative": 2}
+    # Unchanged metrics are not written again
+    rows = {row.metric: row.value for row in db.query(UserDailyStat)}
+    assert rows["conversations"] == 1.0 and rows["duration"] == 60.0
+
+def test_deleting_an_analysis_removes_its_totals(db):
+    stats = ConversationStats(db)
+    kept, deleted = _conversation(None, 2), _conversation(None, 2)
+    stats.record_analysis(kept, None, REVISED)
+    stats.record_analysis(deleted, None, FIRST)
+    stats.record_analysis(deleted, FIRST, None)
+    db.commit()
+
+    result = stats.get_stats(0)
+    assert result["total_conversations"] == 1
+    assert result["phase_distribution"]["pitch"] == 0.0
+    assert result["sentiment_distribution"]["neutral"] == 0
+
+def test_series_per_period(db):
+    stats = ConversationStats(db)
+    stats.record_analysis(_conversation(7, 2), None, FIRST)
+    stats.record_analysis(_conversation(7, 2), None, FIRST)
+    stats.record_analysis(_conversation(7, 9), None, REVISED)
+    db.commit()
+
+    series = stats.get_stats(7, period="day")["series"]
+    assert [(item["period"], item["total_conversations"]) for item in series] == [("2026-03-02", 2), ("2026-03-09", 1)]
+    assert series[1]["phase_distribution"]["pitch"] == 0.0
@@ -0,0 +1,69 @@
+import numpy as np
+import pytest
+
+from src.services.speaker_identification import SpeakerIdentifier
+from src.services.turn_taking import _turn_totals, analyze_turn_taking
+
+def _totals(rows, n_keys):
+    conversation, key, starts, ends, questions = (np.array(column) for column in zip(*rows))
+    return _turn_totals(
+        conversation.astype(np.int64), key.astype(np.int64),
+        starts.astype(np.float64), ends.astype(np.float64), questions.astype(np.float64), n_keys
+    )
+
+def test_turn_totals_per_key():
+    totals = _totals([
+        # conversation, key, start, end, questions
+        (1, 0, 0.0, 2.0, 1),
+        (1, 0, 2.5, 4.0, 0),   # same turn as the segment before
+        (1, 1, 3.5, 6.0, 1),   # interrupts 0.5 s before key 0 finished
+        (1, 0, 7.0, 8.0, 0),   # answers after a 1 s pause
+        (2, 1, 0.0, 1.0, 0),   # a new conversation is a new turn, not a response
+        (2, 0, 1.5, 2.0, 2),
+    ], 2)
+
+    assert totals["turn_count"] == 5
+    np.testing.assert_allclose(totals["turns"], [3, 2])
+    np.testing.assert_allclose(totals["talk_time"], [5.0, 3.5])
+    np.testing.assert_allclose(totals["longest_turn"], [4.0, 2.5])
+    np.testing.assert_allclose(totals["questions"], [3, 1])
+    np.testing.assert_allclose(totals["interruptions"], [0, 1])
+    np.testing.assert_allclose(totals["overlap"], [0.0, 0.5])
+    np.testing.assert_allclose(totals["latency"], [1.5, 0.0])
+    np.testing.assert_allclose(totals["responses"], [2, 0])
+    np.testing.assert_allclose(totals["gaps"], [-0.5, 1.0, 0.5])
+
+def test_turn_totals_without_segments():
+    totals = _turn_totals(*(np.zeros(0, dtype=dtype) for dtype in (np.int64, np.int64, float, float, float)), 3)
+    assert totals["turn_count"] == 0
+    np.testing.assert_allclose(totals["talk_time"], [0, 0, 0])
+
+SEGMENTS = [
+    {"text": " Hi, how are you?", "start": 0.0, "end": 2.0},
+    {"text": " Good, thanks.", "start": 2.0, "end": 3.5, "words": [
+        {"text": " Good,", "start": 2.4, "end": 2.8}, {"text": " thanks.", "start": 2.9, "end": 3.2}
+    ]},
+    {"text": " Great.", "start": 3.5, "end": 4.0},
+    {"text": " Me too?", "start": 4.5, "end": 5.0},
+]
+
+def test_analyze_turn_taking_uses_word_timestamps():
+    result = analyze_turn_taking(["Alice", "Customer", "Alice", "Customer 2"], SEGMENTS)
+
+    assert result["total_turns"] == 4
+    assert set(result["speakers"]) == {"Alice", "Customer", "Customer 2"}
+    customer = result["speakers"]["Customer"]
+    assert customer["talk_time"] == pytest.approx(0.8)
+    assert customer["avg_response_latency"] == pytest.approx(0.4)
+    assert result["speakers"]["Alice"]["questions"] == 1
+    assert result["interruptions"] == 0
+    assert result["response_latency"] == {"mean": 0.4, "median": 0.4}
+
+def test_speaker_identifier_keeps_the_two_role_result():
+    result = SpeakerIdentifier().analyze_turn_taking(["Salesperson", "Customer", "Salesperson", "Customer"], SEGMENTS)
+
+    assert result["total_turns"] == 4
+    assert result["salesperson_stats"]["total_turns"] == 2
+    assert result["salesperson_stats"]["total_duration"] == pytest.approx(2.5)
+    assert result["customer_stats"]["avg_duration"] == pytest.approx(0.65)
+    assert "Salesperson" in result["speakers"]
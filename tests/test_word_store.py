@@ -0,0 +1,62 @@
+import zlib
+from types import SimpleNamespace
+
+import pytest
+
+from src.services.word_store import conversation_words, pack_words, split_words, unpack_words
+
+SEGMENTS = [
+    {"text": " Hi there.", "start": 0.0, "end": 1.2, "words": [
+        {"text": " Hi", "start": 0.0, "end": 0.4, "confidence": 0.91},
+        {"text": " there.", "start": 0.5, "end": 1.2, "confidence": 0.87}
+    ]},
+    {"text": "", "start": 1.5, "end": 2.0, "words": []},
+    {"text": " Hi again", "start": 2.0, "end": 3.25, "words": [
+        {"text": " Hi", "start": 2.0, "end": 2.5},
+        {"text": " again", "start": 2.6, "end": 3.25, "confidence": 0.5, "tokens": [1, 2]}
+    ]}
+]
+
+def test_round_trip_keeps_words_per_segment():
+    assert unpack_words(pack_words(SEGMENTS)) == [
+        [
+            {"text": " Hi", "start": 0.0, "end": 0.4, "confidence": 0.91},
+            {"text": " there.", "start": 0.5, "end": 1.2, "confidence": 0.87}
+        ],
+        [],
+        [
+            # Missing confidences stay missing; other keys are dropped
+            {"text": " Hi", "start": 2.0, "end": 2.5},
+            {"text": " again", "start": 2.6, "end": 3.25, "confidence": 0.5}
+        ]
+    ]
+
+def test_large_vocabularies_use_wide_ids():
+    words = [{"text": f"w{index}", "start": index / 10, "end": index / 10 + 0.05} for index in range(70000)]
+    unpacked = unpack_words(pack_words([{"words": words}]))
+    assert [word["text"] for word in unpacked[0]] == [word["text"] for word in words]
+
+def test_unpack_rejects_other_blobs():
+    with pytest.raises(ValueError):
+        unpack_words(zlib.compress(b"XXXX" + bytes(13)))
+
+def test_split_words_moves_words_out_without_modifying_inputs():
+    transcript = {"text": " Hi there. Hi again", "segments": SEGMENTS}
+    analysis = {"segments": [{**segment, "classification": {}} for segment in SEGMENTS]}
+
+    stripped, stripped_analysis, blob = split_words(transcript, analysis)
+
+    assert all("words" not in segment for segment in stripped["segments"])
+    assert all("words" not in segment for segment in stripped_analysis["segments"])
+    assert "words" in transcript["segments"][0]
+    assert unpack_words(blob)[0][1]["text"] == " there."
+
+def test_split_words_without_words_returns_no_blob():
+    transcript = {"segments": [{"text": " Hi", "start": 0.0, "end": 1.0}]}
+    assert split_words(transcript, {})[2] is None
+
+def test_conversation_words_reads_packed_and_inline_words():
+    packed = SimpleNamespace(packed_words=pack_words(SEGMENTS), transcript={})
+    inline = SimpleNamespace(packed_words=None, transcript={"segments": SEGMENTS})
+    assert conversation_words(packed) == unpack_words(packed.packed_words)
+    assert conversation_words(inline) == [segment["words"] for segment in SEGMENTS]